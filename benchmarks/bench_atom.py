@@ -0,0 +1,72 @@
+"""compare feedparser with the incremental granule parser
+
+Usage::
+
+    python benchmarks/bench_atom.py [recorded-feed.atom ...]
+
+Without arguments, synthetic feeds of increasing size are used.
+"""
+import pathlib
+import sys
+import time
+
+from feeds import atom_feed
+
+from stac_fastapi.opensearx.webapi import atom, dialects
+
+chunk_size = 64 * 1024
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def translate(response):
+    n_results, items = dialects.translate_response(response)
+    return n_results, list(items)
+
+
+def with_feedparser(document):
+    return translate(atom.parse(document))
+
+
+def with_granule_parser(document):
+    parser = atom.GranuleParser()
+    for offset in range(0, len(document), chunk_size):
+        parser.feed(document[offset : offset + chunk_size])
+
+    return translate(parser.close())
+
+
+def main(paths):
+    if paths:
+        documents = {path: pathlib.Path(path).read_bytes() for path in paths}
+    else:
+        documents = {
+            f"synthetic ({n} entries)": atom_feed(n=n) for n in (10, 100, 1000)
+        }
+
+    print(f"{'feed':<40} {'feedparser':>12} {'incremental':>12} {'speedup':>8}")
+    for name, document in documents.items():
+        expected = with_feedparser(document)
+        actual = with_granule_parser(document)
+        if expected != actual:
+            raise RuntimeError(f"parsers disagree on {name}")
+
+        reference = best_of(lambda: with_feedparser(document), repeat=3)
+        new = best_of(lambda: with_granule_parser(document), repeat=3)
+
+        print(
+            f"{name:<40} {reference * 1000:>10.1f}ms {new * 1000:>10.1f}ms"
+            f" {reference / new:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
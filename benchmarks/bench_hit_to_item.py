@@ -0,0 +1,62 @@
+"""compare the pystac and the direct translation of search hits to items
+
+Usage::
+
+    python benchmarks/bench_hit_to_item.py [--config ifremer_config.json] [hits.json ...]
+
+The hit files contain a json list of hits, for example the ``hits.hits`` of a recorded
+search response. Without hit files, synthetic hits are used.
+"""
+import argparse
+import json
+import pathlib
+import time
+
+from hits import hits
+
+from stac_fastapi.opensearx.elasticsearch.dialects import Ifremer
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main(args):
+    config = json.loads(args.config.read_text()) if args.config else {}
+    dialect = Ifremer(session=None, **config)
+
+    if args.hits:
+        pages = {str(path): json.loads(path.read_text()) for path in args.hits}
+    else:
+        pages = {f"synthetic ({n} hits)": hits(n=n) for n in (10, 100, 1000, 10000)}
+
+    print(f"{'hits':<40} {'pystac':>12} {'direct':>12} {'speedup':>8}")
+    for name, page in pages.items():
+        expected = [dialect.hit_to_pystac_item(hit).to_dict() for hit in page]
+        if list(dialect.hits_to_items(page)) != expected:
+            raise RuntimeError(f"translations disagree on {name}")
+
+        reference = best_of(
+            lambda: [dialect.hit_to_pystac_item(hit).to_dict() for hit in page],
+            repeat=3,
+        )
+        new = best_of(lambda: list(dialect.hits_to_items(page)), repeat=3)
+
+        print(
+            f"{name:<40} {reference * 1000:>10.1f}ms {new * 1000:>10.1f}ms"
+            f" {reference / new:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("hits", nargs="*", type=pathlib.Path)
+    parser.add_argument("--config", type=pathlib.Path, default=None)
+
+    main(parser.parse_args())
@@ -0,0 +1,147 @@
+"""compare the latency of searches with different total hit tracking policies
+
+Usage::
+
+    OPENSEARX_BENCH_ES_URL=http://localhost:9200 \
+        python benchmarks/bench_track_total_hits.py COLLECTION [--pages 5] [--limit 100] \
+        [--record responses.json]
+    python benchmarks/bench_track_total_hits.py COLLECTION --replay responses.json
+
+Runs the same paged search against a live elasticsearch (for example a local
+instance loaded with a recorded index) once per policy, and reports the time
+elasticsearch spent (``took``) and the round-trip time per page.
+
+With ``--record``, the responses and round-trip latencies of each policy are saved,
+such that the benchmark can be repeated offline using ``--replay``: the recorded
+responses, including their ``took``, are returned after the recorded latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import statistics
+import sys
+import time
+
+from elasticsearch import AsyncElasticsearch
+from stac_fastapi.types.search import BaseSearchPostRequest
+
+from stac_fastapi.opensearx.elasticsearch.dialects import Ifremer
+
+policies = {"exact": True, "capped (10000)": 10000, "capped (1000)": 1000, "off": False}
+
+
+class RecordingSession:
+    """wrap the elasticsearch client to record the ``took`` of each search"""
+
+    def __init__(self, session):
+        self.session = session
+        self.took = []
+        self.calls = []
+
+    async def search(self, **kwargs):
+        start = time.perf_counter()
+        result = await self.session.search(**kwargs)
+        latency = time.perf_counter() - start
+
+        self.took.append(result["took"] / 1000)
+        self.calls.append({"latency": latency, "response": result})
+
+        return result
+
+
+class ReplaySession:
+    """replay recorded responses, per policy and in order, with their latency"""
+
+    def __init__(self, recorded):
+        self.recorded = recorded
+        self.policy = None
+        self.position = 0
+
+    def select(self, name):
+        self.policy = name
+        self.position = 0
+
+    async def search(self, **kwargs):
+        calls = self.recorded[self.policy]
+        call = calls[self.position % len(calls)]
+        self.position += 1
+
+        await asyncio.sleep(call["latency"])
+        return call["response"]
+
+
+async def run_policy(session, policy, request, pages):
+    recording = RecordingSession(session)
+    dialect = Ifremer(recording, track_total_hits=policy)
+
+    round_trips = []
+    token = None
+    for _ in range(pages):
+        start = time.perf_counter()
+        token, items, n_matched = await dialect.search(request, token=token)
+        list(items)
+        round_trips.append(time.perf_counter() - start)
+
+        if token is None:
+            break
+
+    return recording, round_trips, n_matched
+
+
+async def main(args):
+    if args.replay is not None:
+        session = ReplaySession(json.loads(args.replay.read_text()))
+    else:
+        url = os.environ.get("OPENSEARX_BENCH_ES_URL")
+        if url is None:
+            sys.exit(
+                "set OPENSEARX_BENCH_ES_URL to the url of the elasticsearch to use,"
+                " or pass --replay"
+            )
+        session = AsyncElasticsearch([url])
+
+    recorded = {}
+    request = BaseSearchPostRequest(collections=[args.collection], limit=args.limit)
+
+    print(
+        f"{'policy':<16} {'took (median)':>14} {'round-trip':>12} {'numberMatched':>14}"
+    )
+    try:
+        for name, policy in policies.items():
+            if args.replay is not None:
+                session.select(name)
+
+            recording, round_trips, n_matched = await run_policy(
+                session, policy, request, args.pages
+            )
+            recorded[name] = recording.calls
+            print(
+                f"{name:<16} {statistics.median(recording.took) * 1000:>12.1f}ms"
+                f" {statistics.median(round_trips) * 1000:>10.1f}ms"
+                f" {str(n_matched):>14}"
+            )
+    finally:
+        if args.replay is None:
+            await session.close()
+
+    if args.record is not None:
+        args.record.write_text(json.dumps(recorded))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("collection")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument(
+        "--record", type=pathlib.Path, help="save the responses to this file"
+    )
+    parser.add_argument(
+        "--replay",
+        type=pathlib.Path,
+        help="replay the responses saved in this file instead of searching",
+    )
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+"""compare two runs of ``benchmarks/loadtest.py``
+
+Usage::
+
+    python benchmarks/compare.py baseline.json new.json [--threshold 0.1]
+
+Prints the change of every metric, and exits with status 1 if the latency of any
+scenario got worse, or its throughput lower, by more than the threshold.
+"""
+import argparse
+import json
+import pathlib
+import sys
+
+# metric name and whether higher values are better
+metrics = {
+    "p50_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+    "peak_memory_mb": False,
+}
+gating = {"p50_ms", "p99_ms", "throughput_rps"}
+
+
+def index(report):
+    return {(r["app"], r["scenario"]): r for r in report["results"]}
+
+
+def main(args):
+    baseline = json.loads(args.baseline.read_text())
+    new = json.loads(args.new.read_text())
+
+    print(f"baseline: {baseline['commit']}  new: {new['commit']}")
+    print(
+        f"{'app':<14} {'scenario':<16} {'metric':<16} {'old':>10} {'new':>10} {'change':>8}"
+    )
+
+    regressions = []
+    old_results = index(baseline)
+    for key, result in index(new).items():
+        old = old_results.get(key)
+        if old is None:
+            continue
+
+        for metric, higher_is_better in metrics.items():
+            change = (result[metric] - old[metric]) / old[metric] if old[metric] else 0
+            worse = -change if higher_is_better else change
+            flag = " !" if metric in gating and worse > args.threshold else ""
+            if flag:
+                regressions.append((key, metric))
+
+            print(
+                f"{key[0]:<14} {key[1]:<16} {metric:<16}"
+                f" {old[metric]:>10.2f} {result[metric]:>10.2f} {change:>+7.1%}{flag}"
+            )
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline", type=pathlib.Path)
+    parser.add_argument("new", type=pathlib.Path)
+    parser.add_argument("--threshold", type=float, default=0.1)
+
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,170 @@
+"""a stand-in for the elasticsearch client
+
+Replays hits through the subset of the `AsyncElasticsearch` api used by the
+dialects: listing indices, aggregating the extents, searching with ``search_after``
+(optionally in a point in time), and getting single documents. The hits are either synthetic (see `hits`) or
+recorded: a json list of hits, for example the ``hits.hits`` of recorded search
+responses, sorted by the sort values.
+"""
+import asyncio
+import bisect
+import collections
+import datetime as dt
+import fnmatch
+import itertools
+import json
+
+from hits import hits
+
+from stac_fastapi.opensearx import geometry
+
+
+def epoch_millis(timestamp):
+    parsed = dt.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    return parsed.timestamp() * 1000
+
+
+def extents(documents):
+    """the extents aggregation of the dialect, by index"""
+    by_index = {}
+    for document in documents:
+        by_index.setdefault(document["_index"], []).append(document["_source"])
+
+    buckets = []
+    for index, sources in by_index.items():
+        lons, lats = [], []
+        for source in sources:
+            for position in geometry.positions(source["geometry"]):
+                lons.append(position[0])
+                lats.append(position[1])
+
+        starts = [epoch_millis(s["time_coverage_start"]) for s in sources]
+        ends = [epoch_millis(s["time_coverage_end"]) for s in sources]
+        buckets.append(
+            {
+                "key": index,
+                "doc_count": len(sources),
+                "start": {"value": min(starts)},
+                "end": {"value": max(ends)},
+                "bounds": {
+                    "bounds": {
+                        "top_left": {"lat": max(lats), "lon": min(lons)},
+                        "bottom_right": {"lat": min(lats), "lon": max(lons)},
+                    }
+                },
+            }
+        )
+
+    return {"collections": {"buckets": buckets}}
+
+
+class Indices:
+    def __init__(self, session):
+        self.session = session
+
+    async def indices(self, index="*", format="json"):
+        await asyncio.sleep(self.session.latency)
+        return [
+            {"index": name, "docs.count": str(self.session.counts[name])}
+            for name in self.session.indexes
+            if fnmatch.fnmatchcase(name, index)
+        ]
+
+
+class FakeElasticsearch:
+    """replay hits with a fixed latency per call
+
+    Parameters
+    ----------
+    documents : list of dict
+        The hits, sorted by their sort values.
+    latency : float
+        Number of seconds each call takes.
+    """
+
+    def __init__(self, documents, latency=0):
+        self.documents = documents
+        self.latency = latency
+
+        self.keys = [document["sort"] for document in documents]
+        self.by_id = {(d["_index"], d["_id"]): d for d in documents}
+        self.indexes = sorted({document["_index"] for document in documents})
+        self.counts = collections.Counter(document["_index"] for document in documents)
+        self.pits = {}
+        self.pit_ids = itertools.count()
+
+        self.cat = Indices(self)
+        self.calls = 0
+        self.aggregations = extents(documents)
+
+    @classmethod
+    def synthetic(cls, collection, n, latency=0):
+        return cls(hits(collection, n=n), latency=latency)
+
+    @classmethod
+    def recorded(cls, path, latency=0):
+        documents = json.loads(path.read_text())
+        return cls(sorted(documents, key=lambda doc: doc["sort"]), latency=latency)
+
+    async def search(
+        self,
+        *,
+        size=10,
+        search_after=None,
+        index=None,
+        pit=None,
+        track_total_hits=10000,
+        aggs=None,
+        **kwargs,
+    ):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+        if aggs is not None:
+            return {"took": 1, "hits": {"hits": []}, "aggregations": self.aggregations}
+
+        start = 0
+        if search_after is not None:
+            start = bisect.bisect_right(self.keys, list(search_after))
+
+        page = self.documents[start : start + size]
+        total = len(self.documents)
+        if track_total_hits is True or (
+            track_total_hits is not False and total <= track_total_hits
+        ):
+            total_hits = {"value": total, "relation": "eq"}
+        elif track_total_hits is False:
+            total_hits = None
+        else:
+            total_hits = {"value": track_total_hits, "relation": "gte"}
+
+        result = {"took": 1, "hits": {"hits": page}}
+        if total_hits is not None:
+            result["hits"]["total"] = total_hits
+        if pit is not None:
+            result["pit_id"] = pit["id"]
+
+        return result
+
+    async def get(self, index, id, _source_includes=None):
+        import elasticsearch
+
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+        document = self.by_id.get((index, id))
+        if document is None:
+            raise elasticsearch.NotFoundError(404, "not_found", {})
+
+        return {**document, "found": True}
+
+    async def open_point_in_time(self, index, keep_alive):
+        pit_id = f"pit-{next(self.pit_ids)}"
+        self.pits[pit_id] = index
+        return {"id": pit_id}
+
+    async def close_point_in_time(self, body):
+        self.pits.pop(body["id"], None)
+
+    async def close(self):
+        pass
@@ -0,0 +1,223 @@
+"""a stand-in for the ifremer opensearch api
+
+Serves ``/collections.{atom,json}`` and ``/granules.{atom,json}``, either from
+recorded responses or from synthetic feeds (see `feeds`). Recorded responses are
+read from a directory containing ``collections.<format>`` and
+``granules-<collection>-<page>.<format>``, where ``page`` is the zero-based
+``startPage`` parameter.
+
+Usage::
+
+    python benchmarks/fake_opensearch.py [--port 9590] [--total 10000] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import pathlib
+
+from aiohttp import web
+from feeds import atom_feed, entries, format_time
+
+default_collections = [
+    "avhrr_sst_metop_b-osisaf-l2p-v1.0",
+    "viirs_sst_npp-ospo-l2p-v2.61",
+]
+
+collection_entry = """  <entry>
+    <title>{name}</title>
+    <id>{name}</id>
+    <author><name>Ifremer</name></author>
+    <summary>{name}</summary>
+    <updated>2024-01-01T00:00:00Z</updated>
+    <dc:identifier>{name}</dc:identifier>
+    <echo:datasetId>{name}</echo:datasetId>
+    <echo:shortName>{name}</echo:shortName>
+    <echo:versionId>1.0</echo:versionId>
+    <echo:dataCenter>Ifremer</echo:dataCenter>
+    <echo:organization>Ifremer</echo:organization>
+    <echo:coordinateSystem>CARTESIAN</echo:coordinateSystem>
+  </entry>
+"""
+
+
+def collections_atom(names):
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom"'
+        ' xmlns:dc="http://purl.org/dc/elements/1.1/"'
+        ' xmlns:echo="https://cmr.earthdata.nasa.gov/search/site/docs/search/api.html">\n'
+        "  <title>Ifremer OpenSearch collections</title>\n"
+    ]
+    parts.extend(collection_entry.format(name=name) for name in names)
+    parts.append("</feed>\n")
+
+    return "".join(parts).encode()
+
+
+def collections_json(names):
+    def entry(name):
+        title_detail = {"type": "text/plain", "language": None, "value": name}
+        author = {"name": "Ifremer"}
+        return {
+            "id": name,
+            "guidislink": False,
+            "link": f"https://opensearch.ifremer.fr/{name}",
+            "author": "Ifremer",
+            "authors": [author],
+            "author_detail": author,
+            "title": name,
+            "title_detail": title_detail,
+            "summary": name,
+            "summary_detail": title_detail,
+            "updated": "2024-01-01T00:00:00Z",
+            "updated_parsed": "2024-01-01T00:00:00Z",
+            "dc_identifier": name,
+            "echo_datasetid": name,
+            "echo_shortname": name,
+            "echo_versionid": "1.0",
+            "echo_datacenter": "Ifremer",
+            "echo_organization": "Ifremer",
+            "echo_coordinatesystem": "CARTESIAN",
+        }
+
+    return json.dumps({"entries": [entry(name) for name in names]}).encode()
+
+
+def json_feed(collection, n, *, page, total):
+    """the json equivalent of `feeds.atom_feed`"""
+    start = page * n
+    count = max(0, min(n, total - start))
+
+    def entry(granule):
+        coordinates = [
+            [float(y), float(x)]
+            for y, x in zip(*[iter(granule["polygon"].split())] * 2)
+        ]
+        url = f"https://opensearch.ifremer.fr/granules.atom?uid={granule['name']}.nc"
+        return {
+            "id": url,
+            "updated": f"{granule['start']}/{granule['end']}",
+            "where": {
+                "type": "Polygon",
+                "coordinates": [[[x, y] for y, x in coordinates]],
+            },
+            "links": [
+                {
+                    "rel": "enclosure",
+                    "type": "application/x-netcdf",
+                    "href": f"https://data.ifremer.fr/{collection}/{granule['name']}.nc",
+                },
+            ],
+        }
+
+    document = {
+        "feed": {
+            "updated": format_time(dt.datetime(2024, 1, 1)),
+            "opensearch_totalresults": str(total),
+        },
+        "entries": [
+            entry(granule) for granule in entries(collection, count, start=start)
+        ],
+    }
+    return json.dumps(document).encode()
+
+
+media_types = {"atom": "application/atom+xml", "json": "application/json"}
+
+
+def create_app(
+    *, collections=default_collections, total=10000, latency=0, recorded=None
+):
+    """create the fake opensearch api
+
+    Parameters
+    ----------
+    collections : list of str
+        Names of the synthetic collections.
+    total : int
+        Number of granules of each synthetic collection.
+    latency : float
+        Number of seconds to wait before responding.
+    recorded : pathlib.Path, optional
+        Directory of recorded responses. Overrides the synthetic feeds.
+    """
+    stats = {"requests": 0}
+
+    def respond(body, format):
+        return web.Response(body=body, content_type=media_types[format])
+
+    async def collections_handler(request):
+        stats["requests"] += 1
+        format = request.match_info["format"]
+        await asyncio.sleep(latency)
+
+        if recorded is not None:
+            return respond((recorded / f"collections.{format}").read_bytes(), format)
+
+        if format == "atom":
+            return respond(collections_atom(collections), format)
+
+        return respond(collections_json(collections), format)
+
+    async def granules_handler(request):
+        stats["requests"] += 1
+        format = request.match_info["format"]
+        params = request.query
+        await asyncio.sleep(latency)
+
+        collection = params.get("datasetId", collections[0])
+        page = int(params.get("startPage", 0))
+        count = int(params.get("count", 10))
+
+        if recorded is not None:
+            path = recorded / f"granules-{collection}-{page}.{format}"
+            if not path.exists():
+                raise web.HTTPNotFound()
+            return respond(path.read_bytes(), format)
+
+        if format == "atom":
+            body = atom_feed(collection, n=count, page=page, total=total)
+        else:
+            body = json_feed(collection, count, page=page, total=total)
+
+        return respond(body, format)
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/collections.{format}", collections_handler)
+    app.router.add_get("/granules.{format}", granules_handler)
+
+    return app
+
+
+async def start(host="127.0.0.1", port=0, **options):
+    """start the fake api in the running event loop
+
+    Returns the runner, to be cleaned up by the caller, and the base url.
+    """
+    runner = web.AppRunner(create_app(**options), access_log=None)
+    await runner.setup()
+
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    _, port = runner.addresses[0][:2]
+
+    return runner, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9590)
+    parser.add_argument("--total", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--recorded", type=pathlib.Path, default=None)
+    args = parser.parse_args()
+
+    web.run_app(
+        create_app(total=args.total, latency=args.latency, recorded=args.recorded),
+        host=args.host,
+        port=args.port,
+    )
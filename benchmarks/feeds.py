@@ -0,0 +1,98 @@
+"""generate synthetic opensearch granule feeds resembling the ones of opensearch.ifremer.fr"""
+import datetime as dt
+import random
+from xml.sax.saxutils import escape
+
+feed_header = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"
+      xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:georss="http://www.georss.org/georss"
+      xmlns:gml="http://www.opengis.net/gml"
+      xmlns:dc="http://purl.org/dc/elements/1.1/">
+  <title>Ifremer OpenSearch granules</title>
+  <id>https://opensearch.ifremer.fr/granules.atom</id>
+  <updated>{updated}</updated>
+  <author><name>Ifremer</name></author>
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  <opensearch:startIndex>{start}</opensearch:startIndex>
+  <opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>
+"""
+
+entry_template = """  <entry>
+    <title>{name}</title>
+    <id>https://opensearch.ifremer.fr/granules.atom?uid={name}.nc</id>
+    <updated>{start}/{end}</updated>
+    <summary>{collection} granule {name}</summary>
+    <link rel="enclosure" type="application/x-netcdf" title="ftp" href="ftp://eftp1.ifremer.fr/{collection}/{name}.nc"/>
+    <link rel="alternate" type="application/x-netcdf" title="https" href="https://data.ifremer.fr/{collection}/{name}.nc"/>
+    <link rel="via" type="text/html" title="metadata" href="https://opensearch.ifremer.fr/granules.atom?uid={name}.nc"/>
+    <georss:polygon>{polygon}</georss:polygon>
+  </entry>
+"""
+
+feed_footer = "</feed>\n"
+
+
+def format_time(timestamp):
+    return f"{timestamp:%Y-%m-%dT%H:%M:%SZ}"
+
+
+def footprint(rng):
+    lat = rng.uniform(-80, 70)
+    lon = rng.uniform(-180, 160)
+    height = rng.uniform(1, 10)
+    width = rng.uniform(1, 20)
+
+    corners = [
+        (lat, lon),
+        (lat, lon + width),
+        (lat + height, lon + width),
+        (lat + height, lon),
+        (lat, lon),
+    ]
+    return " ".join(f"{y:.4f} {x:.4f}" for y, x in corners)
+
+
+def entries(collection, n, *, start=0, seed=0):
+    rng = random.Random(seed + start)
+    origin = dt.datetime(2020, 1, 1)
+
+    for index in range(start, start + n):
+        begin = origin + dt.timedelta(minutes=10 * index)
+        end = begin + dt.timedelta(minutes=10)
+        name = f"{begin:%Y%m%d%H%M%S}-{collection.upper()}-{index:08d}"
+
+        yield {
+            "name": escape(name),
+            "collection": escape(collection),
+            "start": format_time(begin),
+            "end": format_time(end),
+            "polygon": footprint(rng),
+        }
+
+
+def atom_feed(
+    collection="avhrr_sst_metop_b-osisaf-l2p-v1.0", n=1000, *, page=0, total=None
+):
+    """construct an atom feed containing ``n`` entries"""
+    if total is None:
+        total = n
+
+    start = page * n
+    count = max(0, min(n, total - start))
+
+    parts = [
+        feed_header.format(
+            updated=format_time(dt.datetime(2024, 1, 1)),
+            total=total,
+            start=start,
+            count=n,
+        )
+    ]
+    parts.extend(
+        entry_template.format(**entry)
+        for entry in entries(collection, count, start=start)
+    )
+    parts.append(feed_footer)
+
+    return "".join(parts).encode()
@@ -0,0 +1,59 @@
+"""generate synthetic elasticsearch hits resembling the ones of the naiad indices"""
+import datetime as dt
+import random
+
+prefix = "isi_cersat_naiad_"
+
+
+def footprint(rng):
+    lat = rng.uniform(-80, 70)
+    lon = rng.uniform(-180, 160)
+    height = rng.uniform(1, 10)
+    width = rng.uniform(1, 20)
+
+    ring = [
+        [lon, lat],
+        [lon + width, lat],
+        [lon + width, lat + height],
+        [lon, lat + height],
+        [lon, lat],
+    ]
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def format_time(timestamp):
+    return f"{timestamp:%Y-%m-%dT%H:%M:%SZ}"
+
+
+def hits(collection="avhrr_sst_metop_b-osisaf-l2p-v1.0", n=1000, *, start=0, seed=0):
+    """construct ``n`` search hits, sorted by time"""
+    rng = random.Random(seed + start)
+    origin = dt.datetime(2020, 1, 1)
+
+    result = []
+    for index in range(start, start + n):
+        begin = origin + dt.timedelta(minutes=10 * index)
+        end = begin + dt.timedelta(minutes=10)
+        name = f"{begin:%Y%m%d%H%M%S}-OSISAF-L2P_GHRSST-SSTsubskin-AVHRR_SST_METOP_B-sstmgr_metop01_{begin:%Y%m%d_%H%M%S}-v02.0-fv01.0.nc"
+
+        result.append(
+            {
+                "_index": prefix + collection,
+                "_type": "_doc",
+                "_id": name.removesuffix(".nc"),
+                "_score": None,
+                "_source": {
+                    "granule": name,
+                    "geometry": footprint(rng),
+                    "time_coverage_start": format_time(begin),
+                    "time_coverage_end": format_time(end),
+                },
+                "sort": [
+                    int(begin.replace(tzinfo=dt.timezone.utc).timestamp() * 1000),
+                    int(end.replace(tzinfo=dt.timezone.utc).timestamp() * 1000),
+                    name.removesuffix(".nc"),
+                ],
+            }
+        )
+
+    return result
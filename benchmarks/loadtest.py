@@ -0,0 +1,315 @@
+"""measure latency, throughput and memory of both apps against local stand-ins
+
+Usage::
+
+    python benchmarks/loadtest.py [--apps webapi elasticsearch] [--requests 200]
+        [--concurrency 8] [--latency 0.01] [--output results.json]
+
+The webapi app queries a fake opensearch server (see `fake_opensearch`) over http,
+and the elasticsearch app searches replayed hits (see `fake_elasticsearch`). The
+apps are called in-process through ASGI, such that only the apps themselves are
+measured.
+
+For every app and scenario, the median and 99th percentile of the latency, the
+throughput and the peak memory allocated during the scenario are reported as json,
+together with the commit and the options, such that runs can be compared using
+``benchmarks/compare.py``.
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import pathlib
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+import fake_opensearch
+from fake_elasticsearch import FakeElasticsearch
+
+collection = "avhrr_sst_metop_b-osisaf-l2p-v1.0"
+
+
+class Lifespan:
+    """drive the lifespan protocol of an ASGI app"""
+
+    def __init__(self, app):
+        self.app = app
+        self.messages = asyncio.Queue()
+        self.events = asyncio.Queue()
+        self.task = None
+
+    async def receive(self):
+        return await self.messages.get()
+
+    async def send(self, message):
+        await self.events.put(message)
+
+    async def event(self, name):
+        await self.messages.put({"type": f"lifespan.{name}"})
+        message = await self.events.get()
+        if not message["type"].endswith(".complete"):
+            raise RuntimeError(f"{name} failed: {message.get('message')}")
+
+    async def startup(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+        self.task = asyncio.create_task(self.app(scope, self.receive, self.send))
+        await self.event("startup")
+
+    async def shutdown(self):
+        await self.event("shutdown")
+        await self.task
+
+
+async def call(app, method, url, body=None):
+    """call an ASGI app, returning the status and the body of the response"""
+    parts = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "server": ("benchmark", 80),
+        "client": ("127.0.0.1", 12345),
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "root_path": "",
+        "query_string": parts.query.encode(),
+        "headers": [
+            (b"host", b"benchmark"),
+            (b"content-type", b"application/json"),
+        ],
+    }
+    request = {
+        "type": "http.request",
+        "body": json.dumps(body).encode() if body is not None else b"",
+    }
+    response = {"status": None, "body": []}
+
+    async def receive():
+        return request
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+
+    return response["status"], b"".join(response["body"])
+
+
+def next_link(document):
+    for link in document.get("links", []):
+        if link["rel"] == "next":
+            return link
+
+    return None
+
+
+async def walk(app, url, max_pages):
+    """follow the next links of a search"""
+    status, body = await call(app, "GET", url)
+    for _ in range(max_pages - 1):
+        link = next_link(json.loads(body))
+        if status != 200 or link is None:
+            break
+
+        status, body = await call(app, "GET", link["href"])
+
+    return status, body
+
+
+def scenarios(options):
+    limit = options.limit
+    search = f"/search?collections={collection}&limit={limit}"
+
+    return {
+        "collections": lambda app: call(app, "GET", "/collections"),
+        "search": lambda app: call(app, "GET", search),
+        "search (post)": lambda app: call(
+            app, "POST", "/search", {"collections": [collection], "limit": limit}
+        ),
+        "pagination walk": lambda app: walk(app, search, options.pages),
+    }
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def measure(app, scenario, options):
+    """run a scenario with bounded concurrency"""
+    # warm up caches and connection pools
+    for _ in range(options.warmup):
+        await scenario(app)
+
+    latencies = []
+    failures = 0
+    semaphore = asyncio.Semaphore(options.concurrency)
+
+    async def run_once():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            status, _ = await scenario(app)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_once() for _ in range(options.requests)))
+    elapsed = time.perf_counter() - start
+
+    # tracing allocations is slow, so memory is measured separately: the peak while
+    # serving one batch of concurrent requests
+    tracemalloc.start()
+    await asyncio.gather(*(scenario(app) for _ in range(options.concurrency)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "requests": options.requests,
+        "failures": failures,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "throughput_rps": options.requests / elapsed,
+        "peak_memory_mb": peak / 2**20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+async def webapi_app(options):
+    from stac_fastapi.opensearx.webapi.app import create_api
+
+    runner, url = await fake_opensearch.start(
+        total=options.total, latency=options.latency, recorded=options.recorded
+    )
+    api = create_api(url, format=options.format, log_level="warning")
+
+    return api.app, runner.cleanup
+
+
+async def elasticsearch_app(options):
+    from stac_fastapi.opensearx.elasticsearch.app import create_api
+
+    if options.hits is not None:
+        session = FakeElasticsearch.recorded(options.hits, latency=options.latency)
+    else:
+        session = FakeElasticsearch.synthetic(
+            collection, options.total, latency=options.latency
+        )
+
+    api = create_api(credentials={"host": "localhost"}, log_level="warning")
+
+    # replace the connection to the database
+    client = api.client
+    await client.session.close()
+    client.session = client.client.session = session
+
+    async def cleanup():
+        pass
+
+    return api.app, cleanup
+
+
+apps = {
+    "webapi": webapi_app,
+    "elasticsearch": elasticsearch_app,
+}
+
+
+async def run_app(name, options):
+    app, cleanup = await apps[name](options)
+    lifespan = Lifespan(app)
+    await lifespan.startup()
+
+    results = []
+    try:
+        for scenario_name, scenario in scenarios(options).items():
+            result = await measure(app, scenario, options)
+            results.append({"app": name, "scenario": scenario_name, **result})
+            print(
+                f"{name:<14} {scenario_name:<16} p50 {result['p50_ms']:8.2f}ms"
+                f"  p99 {result['p99_ms']:8.2f}ms"
+                f"  {result['throughput_rps']:8.1f} req/s"
+                f"  {result['peak_memory_mb']:7.1f} MiB",
+                file=sys.stderr,
+            )
+    finally:
+        await lifespan.shutdown()
+        await cleanup()
+
+    return results
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(options):
+    results = []
+    for name in options.apps:
+        results.extend(await run_app(name, options))
+
+    return {
+        "commit": commit(),
+        "date": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "options": {
+            key: str(value) if isinstance(value, pathlib.Path) else value
+            for key, value in vars(options).items()
+            if key != "output"
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apps", nargs="+", choices=sorted(apps), default=list(apps))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=5, help="pages per walk")
+    parser.add_argument(
+        "--total", type=int, default=10000, help="number of granules per collection"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.01,
+        help="latency of the stand-ins, in seconds",
+    )
+    parser.add_argument("--format", choices=["atom", "json"], default="atom")
+    parser.add_argument(
+        "--recorded",
+        type=pathlib.Path,
+        default=None,
+        help="directory of recorded opensearch responses",
+    )
+    parser.add_argument(
+        "--hits", type=pathlib.Path, default=None, help="json file of recorded hits"
+    )
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    options = parser.parse_args()
+
+    report = json.dumps(asyncio.run(main(options)), indent=2)
+    if options.output is not None:
+        options.output.write_text(report + "\n")
+    else:
+        print(report)
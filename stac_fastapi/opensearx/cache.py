@@ -0,0 +1,212 @@
+import asyncio
+import collections
+import time
+
+import attrs
+from attrs import validators
+
+
+@attrs.define
+class CollectionCache:
+    """Cache the collections of a backend in memory.
+
+    The collections are fetched using ``fetch``, an async function returning a list of
+    collections. They are kept for ``ttl`` seconds, and refreshed in the background
+    once less than ``refresh_margin`` seconds are left. Concurrent misses are coalesced
+    into a single call to ``fetch``.
+
+    If ``changed`` is given, it is called in the background at most every
+    ``check_interval`` seconds, and the collections are refreshed early if it
+    reports a change.
+
+    Parameters
+    ----------
+    fetch : callable
+        Async function returning a list of collections.
+    key : callable
+        Function extracting the collection id from a collection.
+    ttl : float
+        Number of seconds the collections are considered valid. If ``0``, every lookup
+        fetches the collections (concurrent lookups are still coalesced).
+    refresh_margin : float
+        Number of seconds before expiry at which to start a background refresh.
+    changed : callable, optional
+        Async function returning whether the collections changed since they were
+        fetched.
+    check_interval : float, default: 30
+        Minimum number of seconds between calls to ``changed``.
+    clock : callable
+        Monotonic clock returning seconds.
+    """
+
+    fetch = attrs.field()
+    key = attrs.field(default=lambda collection: collection["id"])
+    ttl = attrs.field(
+        default=300, validator=[validators.instance_of((int, float)), validators.ge(0)]
+    )
+    refresh_margin = attrs.field(
+        default=30, validator=[validators.instance_of((int, float)), validators.ge(0)]
+    )
+    changed = attrs.field(default=None)
+    check_interval = attrs.field(
+        default=30, validator=[validators.instance_of((int, float)), validators.gt(0)]
+    )
+    clock = attrs.field(default=time.monotonic)
+
+    entries = attrs.field(factory=dict, init=False)
+    expires = attrs.field(default=None, init=False)
+    inflight = attrs.field(default=None, init=False)
+    checked = attrs.field(default=None, init=False)
+    checking = attrs.field(default=None, init=False)
+
+    def is_valid(self, now):
+        return self.expires is not None and now < self.expires
+
+    def needs_refresh(self, now):
+        return self.expires is not None and now >= self.expires - self.refresh_margin
+
+    async def _load(self):
+        collections = await self.fetch()
+
+        self.entries = {self.key(col): col for col in collections}
+        self.expires = self.clock() + self.ttl
+        self.checked = self.clock()
+
+        return self.entries
+
+    def _start_load(self):
+        if self.inflight is None:
+            self.inflight = asyncio.ensure_future(self._load())
+            self.inflight.add_done_callback(self._finish_load)
+
+        return self.inflight
+
+    def _finish_load(self, future):
+        if self.inflight is future:
+            self.inflight = None
+
+        if not future.cancelled():
+            # retrieve the exception to avoid "exception was never retrieved" warnings
+            future.exception()
+
+    def needs_check(self, now):
+        return (
+            self.changed is not None
+            and self.checking is None
+            and self.inflight is None
+            and now - self.checked >= self.check_interval
+        )
+
+    async def _check(self):
+        if await self.changed():
+            self._start_load()
+
+    def _start_check(self):
+        self.checked = self.clock()
+        self.checking = asyncio.ensure_future(self._check())
+        self.checking.add_done_callback(self._finish_check)
+
+    def _finish_check(self, future):
+        if self.checking is future:
+            self.checking = None
+
+        if not future.cancelled():
+            future.exception()
+
+    async def mapping(self):
+        """the cached collections, indexed by id"""
+        now = self.clock()
+        if self.is_valid(now):
+            if self.needs_refresh(now):
+                self._start_load()
+            elif self.needs_check(now):
+                self._start_check()
+            return self.entries
+
+        return await asyncio.shield(self._start_load())
+
+    async def all(self):
+        """all cached collections"""
+        return list((await self.mapping()).values())
+
+    async def get(self, id):
+        """look up a single collection, returning ``None`` if it does not exist"""
+        return (await self.mapping()).get(id)
+
+    def invalidate(self):
+        self.expires = None
+
+    async def close(self):
+        if self.checking is not None:
+            self.checking.cancel()
+            self.checking = None
+
+        if self.inflight is None:
+            return
+
+        self.inflight.cancel()
+        self.inflight = None
+
+
+@attrs.define
+class LRUCache:
+    """A bounded mapping that evicts the least recently used entries.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries. If ``0``, nothing is cached.
+    ttl : float, optional
+        Number of seconds entries are considered valid. If ``None``, entries only
+        expire by eviction.
+    clock : callable
+        Monotonic clock returning seconds.
+    """
+
+    maxsize = attrs.field(
+        default=1024, validator=[validators.instance_of(int), validators.ge(0)]
+    )
+    ttl = attrs.field(
+        default=None,
+        validator=validators.optional(
+            [validators.instance_of((int, float)), validators.gt(0)]
+        ),
+    )
+    clock = attrs.field(default=time.monotonic)
+
+    entries = attrs.field(factory=collections.OrderedDict, init=False)
+    hits = attrs.field(default=0, init=False)
+    misses = attrs.field(default=0, init=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires, value = entry
+        if expires is not None and self.clock() >= expires:
+            del self.entries[key]
+            self.misses += 1
+            return default
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        self.entries[key] = (expires, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
@@ -1,13 +1,16 @@
 import argparse
-import json
-import os
 import pathlib
-from urllib.parse import urlsplit
 
-from .app import create_api
+from .. import serializers, serve
 from .dialects import dialects
+from .settings import Settings
 
-parser = argparse.ArgumentParser()
+parser = argparse.ArgumentParser(
+    description=(
+        "Serve a stac api for an elasticsearch database. Options that are not given"
+        " are read from OPENSEARX_* environment variables."
+    )
+)
 parser.add_argument(
     "--credentials",
     type=pathlib.Path,
@@ -16,7 +19,9 @@ parser.add_argument(
 )
 parser.add_argument(
     "--use-socks-proxy",
-    action="store_true",
+    action="store_const",
+    const=True,
+    default=None,
     help=" ".join(
         [
             "use a socks proxy to connect to the database.",
@@ -27,7 +32,7 @@ parser.add_argument(
 parser.add_argument(
     "--dialect",
     choices=sorted(dialects),
-    default="ifremer",
+    default=None,
     help="dialect of the elasticsearch database",
 )
 parser.add_argument(
@@ -37,62 +42,91 @@ parser.add_argument(
     help="path to the configuration of the dialect (a json file)",
 )
 parser.add_argument(
-    "--host", default="127.0.0.1", help="address of the new stac server"
+    "--collection-cache-ttl",
+    default=None,
+    type=int,
+    help=(
+        "number of seconds to cache the list of collections and their extents for"
+        " (0 to disable). Searches are pruned using the cached extents, so items"
+        " ingested outside of them can be missed for up to this long."
+    ),
 )
 parser.add_argument(
-    "--port", default=9588, type=int, help="port of the new stac server"
+    "--stream-responses",
+    action="store_const",
+    const=True,
+    default=None,
+    help="stream search results instead of building the full response in memory",
+)
+parser.add_argument(
+    "--validate-items",
+    action="store_const",
+    const=True,
+    default=None,
+    help="construct and validate items using pystac (slow, for debugging only)",
+)
+parser.add_argument(
+    "--no-request-coalescing",
+    dest="coalesce_requests",
+    action="store_const",
+    const=False,
+    default=None,
+    help="don't coalesce identical concurrent searches into a single request",
+)
+parser.add_argument(
+    "--prefetch-depth",
+    default=None,
+    type=int,
+    help=(
+        "maximum number of pages to fetch ahead of clients paging through"
+        " searches (0 to disable)"
+    ),
+)
+parser.add_argument(
+    "--prefetch-ttl",
+    default=None,
+    type=float,
+    help="number of seconds to keep pages fetched ahead",
+)
+parser.add_argument(
+    "--point-in-time",
+    dest="point_in_time_keep_alive",
+    type=int,
+    default=None,
+    metavar="KEEP_ALIVE",
+    help=(
+        "page through searches using point in time contexts, kept alive for"
+        " KEEP_ALIVE seconds between pages"
+    ),
+)
+parser.add_argument(
+    "--track-total-hits",
+    type=str,
+    default=None,
+    help=(
+        "how to count the total number of hits: 'off', 'exact', or the maximum"
+        " number of hits to count. numberMatched is only reported for exact counts."
+    ),
+)
+parser.add_argument(
+    "--json-backend",
+    choices=sorted(serializers.backends),
+    default=None,
+    help="json implementation to use (default: the fastest one installed)",
 )
-parser.add_argument("--log-level", default="info", help="verbosity of the server")
-
-args = parser.parse_args()
-if args.credentials:
-    if args.credentials.suffix == ".json":
-        credentials = json.loads(args.credentials.read_text())
-    else:
-        credentials = credentials.read_text()
-else:
-    # from environment variables
-    url = os.environ.get("OPENSEARX_BACKEND_URL")
-    user = os.environ.get("OPENSEARX_BACKEND_USER")
-    passwd = os.environ.get("OPENSEARX_BACKEND_PASSWORD")
 
-    if url is None:
-        raise ValueError(
-            "cannot find the backend url. Pass either --credentials or set OPENSEARX_BACKEND_URL"
-        )
+serve.add_server_arguments(parser)
 
-    parts = urlsplit(url)
 
-    if user is None or passwd is None:
-        auth = None
-    else:
-        auth = f"{user}:{passwd}"
+def main(argv=None):
+    options = vars(parser.parse_args(argv))
+    options["app_host"] = options.pop("host")
+    options["app_port"] = options.pop("port")
 
-    credentials = {
-        "host": parts.hostname,
-        "port": parts.port,
-        "use_ssl": True,
-        "http_auth": auth,
-    }
+    # every worker reads the settings from the environment
+    serve.export(options)
+    serve.run("stac_fastapi.opensearx.elasticsearch.app:create_app", Settings())
 
-api = create_api(
-    credentials=credentials,
-    dialect=args.dialect,
-    dialect_config_path=args.dialect_config,
-    host=args.host,
-    port=args.port,
-    use_socks_proxy=args.use_socks_proxy,
-)
-# app is used by uvicorn
-app = api.app
 
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(
-        "stac_fastapi.opensearx.elasticsearch.__main__:app",
-        host=args.host,
-        port=args.port,
-        log_level=args.log_level,
-        reload=True,
-    )
+    main()
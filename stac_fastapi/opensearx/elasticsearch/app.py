@@ -1,8 +1,11 @@
 from stac_fastapi.api.app import StacApi
-from stac_fastapi.extensions.core import PaginationExtension
+from stac_fastapi.extensions.core import FieldsExtension, PaginationExtension
 from stac_fastapi.types import config
 
+from .. import log, serializers, timing
+from ..log import logger
 from .core import ElasticsearchClient
+from .settings import Settings
 
 
 def create_api(
@@ -13,25 +16,70 @@ def create_api(
     dialect="ifremer",
     dialect_config_path=None,
     use_socks_proxy=False,
+    collection_cache_ttl=300,
+    stream_responses=False,
+    validate_items=False,
+    point_in_time_keep_alive=None,
+    track_total_hits=10000,
+    token_secret=None,
+    prefetch_depth=0,
+    prefetch_ttl=30,
+    coalesce_requests=True,
+    json_backend=None,
+    metrics=False,
+    log_level="info",
 ):
     settings = config.ApiSettings(app_host=host, app_port=port)
 
+    if json_backend is not None:
+        serializers.use(json_backend)
+
     client = ElasticsearchClient(
         credentials=credentials,
         dialect=dialect,
         use_socks_proxy=use_socks_proxy,
         dialect_config_path=dialect_config_path,
+        collection_cache_ttl=collection_cache_ttl,
+        stream_responses=stream_responses,
+        validate_items=validate_items,
+        point_in_time_keep_alive=point_in_time_keep_alive,
+        track_total_hits=track_total_hits,
+        token_secret=token_secret,
+        prefetch_depth=prefetch_depth,
+        prefetch_ttl=prefetch_ttl,
+        coalesce_requests=coalesce_requests,
     )
     extensions = [
         PaginationExtension(),
+        FieldsExtension(),
     ]
     api = StacApi(
         settings,
         client=client,
         extensions=extensions,
         pagination_extension=PaginationExtension,
+        response_class=serializers.JSONResponse,
     )
 
+    if metrics:
+        from ..metrics import Metrics
+
+        recorder = Metrics(backend="elasticsearch", stats=client.stats)
+        recorder.mount(api.app)
+    else:
+        recorder = None
+
+    api.app.add_middleware(timing.TimingMiddleware, metrics=recorder)
+
+    listener = None
+
+    @api.app.on_event("startup")
+    async def app_startup():
+        """configure logging"""
+        nonlocal listener
+
+        listener = log.setup_logging(log_level)
+
     @api.app.on_event("shutdown")
     async def app_shutdown():
         """shutdown the client to close the session
@@ -40,4 +88,47 @@ def create_api(
         """
         await client.close()
 
+        if listener is not None:
+            listener.stop()
+
     return api
+
+
+def create_app(settings=None):
+    """create the app from settings
+
+    If not given, the settings are read from the environment. Used as the app
+    factory of the server.
+    """
+    if settings is None:
+        settings = Settings()
+
+    if settings.token_secret is None:
+        logger.warning(
+            "OPENSEARX_TOKEN_SECRET is not set: pagination tokens are signed with a"
+            " random secret, so they are rejected by other worker processes and"
+            " after restarts. Set it to the same value for all workers."
+        )
+
+    api = create_api(
+        credentials=settings.database_credentials(),
+        host=settings.app_host,
+        port=settings.app_port,
+        dialect=settings.dialect,
+        dialect_config_path=settings.dialect_config,
+        use_socks_proxy=settings.use_socks_proxy,
+        collection_cache_ttl=settings.collection_cache_ttl,
+        stream_responses=settings.stream_responses,
+        validate_items=settings.validate_items,
+        point_in_time_keep_alive=settings.point_in_time_keep_alive,
+        prefetch_depth=settings.prefetch_depth,
+        prefetch_ttl=settings.prefetch_ttl,
+        coalesce_requests=settings.coalesce_requests,
+        track_total_hits=settings.track_total_hits,
+        token_secret=settings.token_secret,
+        json_backend=settings.json_backend,
+        metrics=settings.metrics,
+        log_level=settings.log_level,
+    )
+
+    return api.app
@@ -0,0 +1,163 @@
+import string
+
+import attrs
+
+# attributes of the scene that can be used in link patterns
+scene_fields = ("filename", "year", "day_of_year")
+
+
+def compile_pattern(pattern):
+    """translate a link pattern into a format string without attribute lookups
+
+    ``"/data/{scene.year}/{scene.filename}"`` becomes ``"/data/{year}/{filename}"``,
+    which can be filled using ``str.format_map`` on a dict of scene fields.
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(pattern):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+
+        prefix, _, name = field.partition(".")
+        if prefix != "scene" or name not in scene_fields:
+            raise ValueError(
+                f"invalid field {field!r} in pattern {pattern!r}, expected one of:"
+                f" {', '.join(f'scene.{name}' for name in scene_fields)}"
+            )
+
+        conversion = f"!{conversion}" if conversion else ""
+        spec = f":{spec}" if spec else ""
+        parts.append(f"{{{name}{conversion}{spec}}}")
+
+    return "".join(parts)
+
+
+comparisons = {
+    "contains": lambda value: lambda filename: value in filename,
+}
+
+
+def compile_condition(condition):
+    """compile a condition into a predicate on the filename"""
+    if not condition:
+        return None
+
+    unknown = [comparison for comparison in condition if comparison not in comparisons]
+    if unknown:
+        raise ValueError(
+            f"unknown comparisons in condition {condition!r}: {', '.join(unknown)}."
+            f" Expected one of: {', '.join(comparisons)}"
+        )
+
+    predicates = [comparisons[comp](value) for comp, value in condition.items()]
+    if len(predicates) == 1:
+        return predicates[0]
+
+    return lambda filename: all(predicate(filename) for predicate in predicates)
+
+
+@attrs.frozen
+class LinkTemplate:
+    name = attrs.field()
+    template = attrs.field()
+    fields = attrs.field(factory=dict)
+
+    @classmethod
+    def from_dict(cls, link):
+        link = dict(link)
+        try:
+            name = link.pop("name")
+            pattern = link.pop("pattern")
+        except KeyError as e:
+            raise ValueError(f"link is missing the {e.args[0]!r} key: {link}") from e
+
+        return cls(name=name, template=compile_pattern(pattern), fields=link)
+
+    def fill(self, scene):
+        link = {"name": self.name, **self.fields}
+        link["href"] = self.template.format_map(scene)
+
+        return link
+
+
+@attrs.frozen
+class PatternGroup:
+    condition = attrs.field()
+    links = attrs.field()
+
+    @classmethod
+    def from_dict(cls, pattern):
+        return cls(
+            condition=compile_condition(pattern.get("condition")),
+            links=tuple(LinkTemplate.from_dict(link) for link in pattern["links"]),
+        )
+
+    def matches(self, filename):
+        return self.condition is None or self.condition(filename)
+
+
+@attrs.frozen
+class CollectionPatterns:
+    """the compiled file patterns of a single collection"""
+
+    groups = attrs.field()
+
+    @classmethod
+    def from_list(cls, patterns):
+        return cls(
+            groups=tuple(PatternGroup.from_dict(pattern) for pattern in patterns)
+        )
+
+    def select(self, filename):
+        if len(self.groups) == 1 and self.groups[0].condition is None:
+            return self.groups[0]
+
+        matching = [group for group in self.groups if group.matches(filename)]
+        if len(matching) != 1:
+            raise ValueError(f"patterns do not match filename exactly once: {filename}")
+
+        return matching[0]
+
+    def links(self, scene):
+        """construct the links of a single scene"""
+        group = self.select(scene["filename"])
+        return [template.fill(scene) for template in group.links]
+
+    def assets(self, scenes):
+        """construct the assets of a page of scenes
+
+        Returns a list of asset dicts, in the same order as ``scenes``.
+        """
+        return [
+            {
+                template.name: {"href": template.template.format_map(scene)}
+                for template in self.select(scene["filename"]).links
+            }
+            for scene in scenes
+        ]
+
+
+def compile_filepatterns(filepatterns):
+    """compile the file patterns of all collections
+
+    Collections with an empty list of patterns get no assets, like collections
+    without patterns.
+
+    Raises
+    ------
+    ValueError
+        If any pattern is invalid.
+    """
+    compiled = {}
+    for collection, patterns in filepatterns.items():
+        if not patterns:
+            continue
+
+        try:
+            compiled[collection] = CollectionPatterns.from_list(patterns)
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(
+                f"invalid file patterns for collection {collection!r}: {e}"
+            ) from e
+
+    return compiled
@@ -3,6 +3,8 @@ import os
 import aiohttp
 from elasticsearch import AIOHttpConnection
 
+from ..pools import connector_stats
+
 
 class ProxyAIOHttpConnection(AIOHttpConnection):
     """
@@ -43,3 +45,24 @@ class ProxyAIOHttpConnection(AIOHttpConnection):
             response_class=ESClientResponse,
             connector=connector,
         )
+
+
+def pool_stats(session):
+    """statistics of the connection pool of an elasticsearch client"""
+    pool = session.transport.connection_pool
+    connections = getattr(pool, "connections", [])
+    stats = {
+        "connections": len(connections),
+        "dead": pool.dead.qsize() if hasattr(pool, "dead") else 0,
+    }
+
+    # each connection of the async transport has its own aiohttp session
+    for connection in connections:
+        http_session = getattr(connection, "session", None)
+        if http_session is None:
+            continue
+
+        for name, value in connector_stats(http_session.connector).items():
+            stats[name] = stats.get(name, 0) + value
+
+    return stats
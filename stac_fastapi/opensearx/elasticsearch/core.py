@@ -4,12 +4,40 @@ from typing import List, Optional, Union
 import attrs
 from attrs import validators
 from elasticsearch import AsyncElasticsearch
+from stac_fastapi.extensions.core.fields.request import PostFieldsExtension
+from stac_fastapi.types import errors
 from stac_fastapi.types import stac as stac_types
 from stac_fastapi.types.core import AsyncBaseCoreClient, NumType
 from stac_fastapi.types.search import BaseSearchPostRequest
 
-from . import pagination
-from .dialects import dialects
+from .. import prefetch, serializers, singleflight, streaming, timing
+from ..cache import CollectionCache
+from . import extents, pagination
+from .connection import pool_stats
+from .dialects import dialects, parse_track_total_hits
+from .pit import PointInTimeManager
+from .tokens import TokenCodec
+
+
+def parse_fields(fields):
+    """convert the fields parameter of GET requests to the fields of POST requests
+
+    Fields prefixed with ``-`` are excluded, all others are included.
+    """
+    if not fields:
+        return None
+
+    include = {field.removeprefix("+") for field in fields if not field.startswith("-")}
+    exclude = {field.removeprefix("-") for field in fields if field.startswith("-")}
+
+    return PostFieldsExtension(include=include, exclude=exclude)
+
+
+def matched_fields(n_matched):
+    if n_matched is None:
+        return {}
+
+    return {"numberMatched": n_matched}
 
 
 # TODO: make this an async client once elasticsearch-dsl supports async
@@ -31,8 +59,28 @@ class ElasticsearchClient(AsyncBaseCoreClient):
             raise ValueError(f"{value} does not exist or is not a file.")
 
     use_socks_proxy = attrs.field(default=False)
+    collection_cache_ttl = attrs.field(
+        default=300, validator=[validators.instance_of(int), validators.ge(0)]
+    )
+    stream_responses = attrs.field(default=False)
+    validate_items = attrs.field(default=False)
+    track_total_hits = attrs.field(default=10000, converter=parse_track_total_hits)
+    token_secret = attrs.field(default=None, repr=False)
+    point_in_time_keep_alive = attrs.field(
+        default=None,
+        validator=validators.optional([validators.instance_of(int), validators.gt(0)]),
+    )
+    prefetch_depth = attrs.field(
+        default=0, validator=[validators.instance_of(int), validators.ge(0)]
+    )
+    prefetch_ttl = attrs.field(default=30, validator=validators.gt(0))
+    coalesce_requests = attrs.field(default=True)
 
     client = attrs.field(default=None, init=False)
+    collection_cache = attrs.field(default=None, init=False)
+    pit = attrs.field(default=None, init=False)
+    prefetcher = attrs.field(default=None, init=False)
+    single_flight = attrs.field(default=None, init=False)
 
     def __attrs_post_init__(self):
         if self.credentials is None:
@@ -41,6 +89,7 @@ class ElasticsearchClient(AsyncBaseCoreClient):
         options = {
             "hosts": [self.credentials],
             "timeout": self.timeout,
+            "serializer": serializers.elasticsearch_serializer(),
         }
         if self.use_socks_proxy:
             from .connection import ProxyAIOHttpConnection
@@ -56,16 +105,177 @@ class ElasticsearchClient(AsyncBaseCoreClient):
             dialect_config = json.loads(self.dialect_config_path.read_text())
         else:
             dialect_config = {}
-        self.client = dialect_class(self.session, **dialect_config)
+        if self.point_in_time_keep_alive is not None:
+            self.pit = PointInTimeManager(
+                self.session, keep_alive=self.point_in_time_keep_alive
+            )
+
+        self.client = dialect_class(
+            self.session,
+            validate_items=self.validate_items,
+            pit=self.pit,
+            track_total_hits=self.track_total_hits,
+            tokens=(
+                TokenCodec(self.token_secret)
+                if self.token_secret is not None
+                else TokenCodec()
+            ),
+            **dialect_config,
+        )
+
+        if self.prefetch_depth > 0:
+            self.prefetcher = prefetch.Prefetcher(
+                max_depth=self.prefetch_depth, ttl=self.prefetch_ttl
+            )
+        if self.coalesce_requests:
+            self.single_flight = singleflight.SingleFlight()
+
+        # the extents used to prune searches are refreshed as soon as documents
+        # are added or removed
+        self.collection_cache = CollectionCache(
+            fetch=self.client.collections,
+            key=lambda col: col.id,
+            ttl=self.collection_cache_ttl,
+            refresh_margin=self.collection_cache_ttl // 10,
+            changed=self.client.changed,
+            check_interval=max(self.collection_cache_ttl / 10, 1),
+        )
 
     async def close(self):
+        await self.collection_cache.close()
+        if self.prefetcher is not None:
+            await self.prefetcher.close()
         self.client = None
 
         await self.session.close()
         self.session = None
 
+    def stats(self):
+        """statistics of the connection pool and the caches"""
+        caches = {"queries": self.client.queries.cache}
+        if self.prefetcher is not None:
+            caches["prefetch"] = self.prefetcher
+
+        stats = {
+            "pool": pool_stats(self.session),
+            "caches": {
+                name: {"hits": cache.hits, "misses": cache.misses}
+                for name, cache in caches.items()
+            },
+        }
+        if self.single_flight is not None:
+            stats["single_flight"] = {
+                "calls": self.single_flight.calls,
+                "saved": self.single_flight.saved,
+            }
+
+        return stats
+
+    async def fetch(self, key, search_request, *, token, fields, excluded):
+        """search the database, coalescing identical concurrent searches"""
+        if self.single_flight is None:
+            return await self.client.search(
+                search_request, token=token, fields=fields, excluded=excluded
+            )
+
+        # share the hits, such that every waiter translates them lazily
+        new_token, hits, n_matched, query = await self.single_flight.do(
+            (key, token),
+            lambda: self.client.search_hits(
+                search_request, token=token, fields=fields, excluded=excluded
+            ),
+        )
+
+        return new_token, self.client.translate(hits, query), n_matched
+
+    async def prune(self, search_request):
+        """leave the collections whose extent can't overlap a search out of it
+
+        Returns the search request without the collections that can't match, and
+        the collections to exclude from a search over all collections (``None`` if
+        all of them may match). Returns ``None`` if no collection is left.
+
+        Unknown collections are kept, such that the database reports them or, for
+        searches over all collections, searches indexes created since the
+        collections were cached. Without a collection cache, looking up the extents
+        would cost more than it saves, so nothing is pruned.
+
+        The extents are cached, so results can be stale: items ingested outside the
+        cached extent of a collection (for example backfilled granules) are missed
+        until the extents are refreshed. They are refreshed early once the number
+        of documents of an index changes, which is checked in the background every
+        tenth of the cache ttl, and at the latest after one cache ttl.
+        """
+        if self.collection_cache_ttl == 0:
+            return search_request, None
+
+        bounds = extents.search_bounds(search_request)
+        if not search_request.collections and bounds == (None, None, None):
+            return search_request, None
+
+        collections = await self.collection_cache.mapping()
+
+        def overlaps(name):
+            return name not in collections or extents.overlaps(
+                collections[name].extent, *bounds
+            )
+
+        if not search_request.collections:
+            excluded = [name for name in sorted(collections) if not overlaps(name)]
+            return search_request, excluded or None
+
+        remaining = [name for name in search_request.collections if overlaps(name)]
+        if not remaining:
+            return None
+        elif len(remaining) == len(search_request.collections):
+            return search_request, None
+
+        return search_request.copy(update={"collections": remaining}), None
+
+    async def search(self, request, search_request, *, token, fields=None):
+        """search, reading ahead the next page if enabled
+
+        Searches outside of the extents of the searched collections are answered
+        without contacting the database.
+        """
+        timing.label(collections=search_request.collections)
+
+        pruned = await self.prune(search_request)
+        if pruned is None:
+            return None, [], 0
+        search_request, excluded = pruned
+
+        key = (
+            search_request.json(exclude={"page", "token", "fields"}),
+            fields.json() if fields is not None else None,
+            tuple(excluded) if excluded is not None else None,
+        )
+        if self.prefetcher is None:
+            return await self.fetch(
+                key, search_request, token=token, fields=fields, excluded=excluded
+            )
+
+        def step(token):
+            async def fetch():
+                return await self.fetch(
+                    key, search_request, token=token, fields=fields, excluded=excluded
+                )
+
+            return (key, token), fetch
+
+        def follow(result):
+            new_token, _, _ = result
+            if new_token is None:
+                return None
+
+            return step(new_token)
+
+        return await self.prefetcher.page(
+            prefetch.walk_id(request, key), *step(token), follow
+        )
+
     async def all_collections(self, **kwargs) -> stac_types.Collections:
-        collections = await self.client.collections()
+        collections = await self.collection_cache.all()
         return stac_types.Collections(
             collections=[col.to_dict() for col in collections],
             links=[],
@@ -74,18 +284,59 @@ class ElasticsearchClient(AsyncBaseCoreClient):
     async def get_collection(
         self, collection_id: str, **kwargs
     ) -> stac_types.Collection:
-        collection = await self.client.collection(collection_id)
+        collection = await self.collection_cache.get(collection_id)
+        if collection is None:
+            raise errors.NotFoundError(f"could not find collection {collection_id!r}")
+
         return collection.to_dict()
 
     async def get_item(
         self, item_id: str, collection_id: str, **kwargs
     ) -> stac_types.Item:
-        pass
+        timing.label(collections=[collection_id])
+
+        return await self.client.item(collection_id, item_id)
 
     async def item_collection(
-        self, collection_id: str, limit: int = 10, token: str = None, **kwargs
+        self,
+        collection_id: str,
+        bbox: Optional[List[NumType]] = None,
+        datetime: Optional[Union[str, datetime]] = None,
+        limit: int = 10,
+        token: str = None,
+        **kwargs,
     ) -> stac_types.ItemCollection:
-        pass
+        request = kwargs["request"]
+
+        # fail early on unknown collections
+        await self.get_collection(collection_id)
+
+        token = request.query_params.get("token", token)
+
+        options = {
+            "collections": [collection_id],
+            "bbox": bbox,
+            "datetime": datetime,
+            "limit": limit,
+        }
+        clean = {key: value for key, value in options.items() if value is not None}
+        search_request = BaseSearchPostRequest(**clean)
+
+        new_token, items, n_matched = await self.search(
+            request, search_request, token=token
+        )
+
+        links = pagination.generate_get_pagination_links(
+            request.url,
+            token=new_token,
+        )
+
+        return streaming.item_collection(
+            items,
+            links,
+            stream=self.stream_responses,
+            **matched_fields(n_matched),
+        )
 
     async def get_search(
         self,
@@ -115,16 +366,20 @@ class ElasticsearchClient(AsyncBaseCoreClient):
         clean = {key: value for key, value in options.items() if value is not None}
         search_request = BaseSearchPostRequest(**clean)
 
-        new_token, items = await self.client.search(search_request, token=token)
+        new_token, items, n_matched = await self.search(
+            request, search_request, token=token, fields=parse_fields(fields)
+        )
 
         links = pagination.generate_get_pagination_links(
             request.url,
             token=new_token,
         )
 
-        return stac_types.ItemCollection(
-            features=[item.to_dict() for item in items],
-            links=links,
+        return streaming.item_collection(
+            items,
+            links,
+            stream=self.stream_responses,
+            **matched_fields(n_matched),
         )
 
     async def post_search(
@@ -136,14 +391,21 @@ class ElasticsearchClient(AsyncBaseCoreClient):
 
         token = params.get("token")
 
-        new_token, items = await self.client.search(search_request, token=token)
+        new_token, items, n_matched = await self.search(
+            request,
+            search_request,
+            token=token,
+            fields=getattr(search_request, "fields", None),
+        )
 
         links = pagination.generate_post_pagination_links(
             request.url,
             token=new_token,
         )
 
-        return stac_types.ItemCollection(
-            features=[item.to_dict() for item in items],
-            links=links,
+        return streaming.item_collection(
+            items,
+            links,
+            stream=self.stream_responses,
+            **matched_fields(n_matched),
         )
@@ -1,24 +1,21 @@
-import base64
+import datetime as dt
 import itertools
-from datetime import datetime
 
 import attrs
-import dateutil
-import more_itertools
+import dateutil.parser
+import elasticsearch
 import pystac
 from stac_fastapi.types import errors
 from stac_fastapi.types import stac as stac_types
 
+from .. import geometry, timing
+from ..log import logger
+from . import extents
+from .assets import compile_filepatterns
+from .query import QueryBuilder
+from .tokens import TokenCodec
 
-def drop_none(iterable):
-    yield from (item for item in iterable if item is not None)
-
-
-def bbox_from_geometry(geometry):
-    from odc.geo import Geometry
-
-    geom = Geometry(geometry)
-    return geom.geom.bounds
+stac_version = pystac.get_stac_version()
 
 
 def bbox_to_envelope_geometry(bbox):
@@ -31,30 +28,68 @@ def bbox_to_envelope_geometry(bbox):
     return {"type": "envelope", "coordinates": envelope}
 
 
-def decode_search_after(token):
-    if token is None:
+def parse_track_total_hits(value):
+    """parse a total hit tracking policy: ``off``, ``exact``, or a maximum count"""
+    if isinstance(value, (bool, int)):
+        policy = value
+    elif value == "off":
+        policy = False
+    elif value == "exact":
+        policy = True
+    else:
+        try:
+            policy = int(value)
+        except ValueError:
+            raise ValueError(
+                f"invalid total hit tracking policy: {value!r}."
+                " Expected 'off', 'exact', or a positive integer."
+            ) from None
+
+    if not isinstance(policy, bool) and policy <= 0:
+        raise ValueError(f"the maximum count has to be positive, got {policy}")
+
+    return policy
+
+
+def number_matched(hits):
+    """the total number of hits, if it was counted exactly"""
+    total = hits.get("total")
+    if total is None or total["relation"] != "eq":
         return None
 
-    return base64.urlsafe_b64decode(token.encode()).decode().split(",")
+    return total["value"]
 
 
-def encode_search_after(search_after):
-    joined = ",".join(str(_) for _ in search_after)
+def doc_counts(indices):
+    return {index["index"]: index.get("docs.count") for index in indices}
 
-    return base64.urlsafe_b64encode(joined.encode()).decode()
 
+def year_and_day_of_year(timestamp):
+    """extract the year and the day of year from a ISO 8601 timestamp
 
-@attrs.define
-class SceneInfo:
-    filename = attrs.field()
-    year = attrs.field()
-    day_of_year = attrs.field()
+    Falls back to `dateutil` for timestamps that don't start with a ``YYYY-MM-DD`` date.
+    """
+    try:
+        date = dt.date.fromisoformat(timestamp[:10])
+    except ValueError:
+        date = dateutil.parser.parse(timestamp).date()
+
+    return f"{date.year:04d}", f"{date.timetuple().tm_yday:03d}"
 
 
 @attrs.define
 class Ifremer:
     session = attrs.field()
     filepatterns = attrs.field(factory=dict)
+    validate_items = attrs.field(default=False)
+    pit = attrs.field(default=None)
+    track_total_hits = attrs.field(default=10000, converter=parse_track_total_hits)
+    tokens = attrs.field(factory=TokenCodec)
+    pre_filter_shard_size = attrs.field(default=1)
+
+    compiled_patterns = attrs.field(init=False)
+    queries = attrs.field(init=False)
+    doc_counts = attrs.field(factory=dict, init=False)
 
     prefix = "isi_cersat_naiad_"
 
@@ -62,90 +97,146 @@ class Ifremer:
     spatial_field_name = "geometry"
     sort = list(temporal_field_names) + ["_id"]
 
+    # the source fields needed to construct each part of an item
+    source_fields = {
+        "geometry": ("geometry",),
+        "bbox": ("geometry",),
+        "assets": ("granule", "time_coverage_start"),
+        "properties": ("time_coverage_start", "time_coverage_end"),
+    }
+
+    @property
+    def index_pattern(self):
+        return self.prefix + "*"
+
+    @property
+    def item_source(self):
+        return sorted(set(itertools.chain.from_iterable(self.source_fields.values())))
+
+    def __attrs_post_init__(self):
+        # fail early on invalid patterns
+        self.compiled_patterns = compile_filepatterns(self.filepatterns)
+        self.queries = QueryBuilder(self)
+
     def clean_index_name(self, name):
         return name.removeprefix(self.prefix)
 
-    def index_to_collection(self, index) -> stac_types.Collection:
+    def index_to_collection(self, index, extent=None) -> stac_types.Collection:
         id = self.clean_index_name(index["index"])
 
-        spatial_extent = pystac.SpatialExtent([[-180, -90, 180, 90]])
-        temporal_extent = pystac.TemporalExtent(
-            [[datetime(1900, 1, 1), datetime(2100, 1, 1)]]
-        )
-
         collection = pystac.Collection(
             id=id,
             description=id,
-            extent=pystac.Extent(
-                spatial=spatial_extent,
-                temporal=temporal_extent,
-            ),
+            extent=extent if extent is not None else extents.default_extent(),
             title=id,
         )
         collection.links = []
 
         return collection
 
-    def temporal_filter(self, range_):
-        if not range_:
-            return []
+    def exclude_indexes_clause(self, indexes):
+        return {"bool": {"must_not": [{"terms": {"_index": indexes}}]}}
 
-        # Items have a date range, and the query can have these forms:
-        # - a single datetime: in that case find any items that contain that datetime
-        # - a interval: find any items that are entirely contained within that item
-        if "/" in range_:
-            start, end = range_.split("/")
-        else:
-            start, end = range_, range_
-
-        if start != "..":
-            yield {"range": {self.temporal_field_names[0]: {"gte": start}}}
-
-        if end != "..":
-            yield {"range": {self.temporal_field_names[1]: {"lte": end}}}
-
-    def spatial_filter(self, bbox, intersects):
-        if bbox:
-            yield {
-                "geo_shape": {
-                    self.spatial_field_name: {
-                        "shape": bbox_to_envelope_geometry(bbox),
-                        "relation": "within",
-                    }
+    def ids_clause(self, ids):
+        return {"ids": {"values": ids}}
+
+    # Items have a date range, and the query can have these forms:
+    # - a single datetime: in that case find any items that contain that datetime
+    # - a interval: find any items that are entirely contained within that item
+    def start_clause(self, start):
+        return {"range": {self.temporal_field_names[0]: {"gte": start}}}
+
+    def end_clause(self, end):
+        return {"range": {self.temporal_field_names[1]: {"lte": end}}}
+
+    def bbox_clause(self, bbox):
+        return {
+            "geo_shape": {
+                self.spatial_field_name: {
+                    "shape": bbox_to_envelope_geometry(bbox),
+                    "relation": "within",
                 }
             }
-        elif intersects:
-            yield {
-                "geo_shape": {
-                    self.spatial_field_name: {
-                        "shape": {
-                            "type": intersects.type,
-                            "coordinates": intersects.coordinates,
-                        },
-                        "relation": "intersects",
-                    }
+        }
+
+    def intersects_clause(self, intersects):
+        return {
+            "geo_shape": {
+                self.spatial_field_name: {
+                    "shape": {
+                        "type": intersects.type,
+                        "coordinates": intersects.coordinates,
+                    },
+                    "relation": "intersects",
                 }
             }
-        else:
-            yield None
+        }
 
-    def item_id_filter(self, ids):
-        if not ids:
-            yield None
-        else:
-            yield {"ids": {"values": ids}}
+    def extents_aggregation(self, n_indexes):
+        start, end = self.temporal_field_names
+
+        return {
+            "collections": {
+                "terms": {"field": "_index", "size": max(n_indexes, 1)},
+                "aggs": {
+                    "start": {"min": {"field": start}},
+                    "end": {"max": {"field": end}},
+                    "bounds": {"geo_bounds": {"field": self.spatial_field_name}},
+                },
+            }
+        }
+
+    async def extents(self, n_indexes):
+        """compute the extents of all collections using a single aggregation
+
+        Returns a mapping of index names to extents. If the aggregation fails, the
+        error is logged and the mapping is empty.
+        """
+        try:
+            with timing.stage("upstream", exclude=["parse"]):
+                result = await self.session.search(
+                    index=self.index_pattern,
+                    size=0,
+                    track_total_hits=False,
+                    aggs=self.extents_aggregation(n_indexes),
+                )
+        except elasticsearch.TransportError as e:
+            logger.warning("could not compute the extents of the collections: %s", e)
+            return {}
+
+        buckets = result.get("aggregations", {}).get("collections", {}).get("buckets")
+        return {
+            bucket["key"]: extents.bucket_to_extent(bucket) for bucket in buckets or []
+        }
 
     async def collections(self) -> stac_types.Collections:
         """
         collections will be stored in index information in the future, but at the moment,
         there's only the names.
 
-        As such, we will pull only the collection name from the database and fill in dummy
-        values for everything else.
+        As such, we will pull only the collection name from the database, compute the
+        extents from the items, and fill in dummy values for everything else.
         """
         # collections are stored in indices
-        indices = await self.session.cat.indices(format="json")
-        return [self.index_to_collection(index) for index in indices]
+        indices = await self.session.cat.indices(
+            index=self.index_pattern, format="json"
+        )
+        self.doc_counts = doc_counts(indices)
+        index_extents = await self.extents(len(indices))
+
+        return [
+            self.index_to_collection(index, index_extents.get(index["index"]))
+            for index in indices
+        ]
+
+    async def changed(self):
+        """whether documents were added to or removed from any index since the
+        collections were listed, such that the extents may be outdated"""
+        indices = await self.session.cat.indices(
+            index=self.index_pattern, format="json"
+        )
+
+        return doc_counts(indices) != self.doc_counts
 
     async def collection(self, name) -> stac_types.Collection:
         """get a specific collection by name
@@ -155,69 +246,70 @@ class Ifremer:
         """
         collections = {col.id: col for col in await self.collections()}
         col = collections.get(name)
-        if name is None:
+        if col is None:
             raise errors.NotFoundError(f"could not find collection {name!r}")
 
         return col
 
-    def fname_to_assets(self, collection, scene_info):
-        comparisons = {
-            "contains": lambda s: s in scene_info.filename,
-        }
+    def fname_to_links(self, collection, scene):
+        patterns = self.compiled_patterns.get(collection)
+        if patterns is None:
+            return []
 
-        def check_condition(condition):
-            if not condition:
-                return True
+        return patterns.links(scene)
 
-            return all(comparisons[comp](value) for comp, value in condition.items())
+    def fname_to_assets(self, collection, scene):
+        links = self.fname_to_links(collection, scene)
+        return {link["name"]: pystac.Asset(href=link["href"]) for link in links}
 
-        def fill_link(pattern):
-            link = pattern.copy()
-            file_pattern = link.pop("pattern")
-            link["href"] = file_pattern.format(scene=scene_info)
+    def scene(self, hit):
+        """extract the fields available to the file patterns"""
+        source = hit["_source"]
+        year, day_of_year = year_and_day_of_year(source["time_coverage_start"])
 
-            return link
+        return {
+            "filename": source.get("granule", hit["_id"]),
+            "year": year,
+            "day_of_year": day_of_year,
+        }
 
-        patterns = self.filepatterns.get(collection)
-        if not patterns:
-            return {}
+    def page_assets(self, hits):
+        """construct the assets for a page of hits
 
-        link_patterns = [
-            pattern["links"]
-            for pattern in patterns
-            if check_condition(pattern.get("condition"))
-        ]
-        if len(link_patterns) != 1:
-            raise ValueError(
-                f"patterns do not match filename exactly once: {scene_info.filename}"
-            )
+        The hits are grouped by collection, such that the patterns of each collection
+        are only looked up once.
+        """
+        indices_by_collection = {}
+        for index, hit in enumerate(hits):
+            collection = self.clean_index_name(hit["_index"])
+            indices_by_collection.setdefault(collection, []).append(index)
+
+        assets = [None] * len(hits)
+        for collection, indices in indices_by_collection.items():
+            patterns = self.compiled_patterns.get(collection)
+            if patterns is None:
+                collection_assets = [{} for _ in indices]
+            else:
+                collection_assets = patterns.assets(
+                    [self.scene(hits[index]) for index in indices]
+                )
+
+            for index, item_assets in zip(indices, collection_assets):
+                assets[index] = item_assets
 
-        links = [fill_link(link) for link in more_itertools.one(link_patterns)]
-        assets = {link["name"]: pystac.Asset(href=link["href"]) for link in links}
         return assets
 
-    def hit_to_item(self, hit):
+    def hit_to_pystac_item(self, hit):
         collection = self.clean_index_name(hit["_index"])
-        id_ = hit["_id"]
-
         source = hit["_source"]
-        fname = source.get("granule", id_)
-
-        timestamp = dateutil.parser.parse(source["time_coverage_start"])
-
-        scene_info = SceneInfo(
-            filename=fname,
-            year=timestamp.strftime("%Y"),
-            day_of_year=timestamp.strftime("%j"),
-        )
 
-        assets = self.fname_to_assets(collection, scene_info)
+        assets = self.fname_to_assets(collection, self.scene(hit))
 
         return pystac.Item(
-            id=id_,
+            id=hit["_id"],
             geometry=source["geometry"],
             datetime=None,
-            bbox=bbox_from_geometry(source["geometry"]),
+            bbox=geometry.bbox(source["geometry"]),
             properties={
                 "start_datetime": source["time_coverage_start"],
                 "end_datetime": source["time_coverage_end"],
@@ -225,55 +317,176 @@ class Ifremer:
             assets=assets,
         )
 
-    def search_query(self, search_request):
-        if search_request.collections:
-            indexes = [self.prefix + name for name in search_request.collections]
-        else:
-            indexes = "_all"
-
-        query = {
-            "bool": {
-                "filter": list(
-                    drop_none(
-                        itertools.chain(
-                            self.item_id_filter(search_request.ids),
-                            self.temporal_filter(search_request.datetime),
-                            self.spatial_filter(
-                                search_request.bbox, search_request.intersects
-                            ),
-                        )
-                    )
-                ),
-            }
+    def item_dict(self, hit, assets, bbox):
+        # the source only contains the fields of the requested parts
+        source = hit["_source"]
+
+        return {
+            "type": "Feature",
+            "stac_version": stac_version,
+            "stac_extensions": [],
+            "id": hit["_id"],
+            "geometry": source.get("geometry"),
+            "bbox": bbox,
+            "properties": {
+                "start_datetime": source.get("time_coverage_start"),
+                "end_datetime": source.get("time_coverage_end"),
+                "datetime": None,
+            },
+            "links": [],
+            "assets": assets,
         }
-        if not query["bool"]["filter"]:
-            # get all results
-            query = None
 
-        return indexes, query
+    def hit_to_item(self, hit):
+        """translate a search hit to a STAC item dict
 
-    async def search(self, search_request, token):
-        # TODO: use `elasticsearch_dsl`, then extract the query using `.to_dict()`
-        indexes, query = self.search_query(search_request)
+        If ``validate_items`` is set, the item is constructed and validated using
+        `pystac`. This is much slower, so it should only be used for debugging.
+        """
+        if self.validate_items:
+            item = self.hit_to_pystac_item(hit)
+            item.validate()
+
+            return item.to_dict()
 
-        search_after = decode_search_after(token)
+        collection = self.clean_index_name(hit["_index"])
+        links = self.fname_to_links(collection, self.scene(hit))
 
-        result = await self.session.search(
-            index=indexes,
-            query=query,
-            size=search_request.limit,
-            track_total_hits=True,
-            sort=self.sort,
-            search_after=search_after,
+        return self.item_dict(
+            hit,
+            {link["name"]: {"href": link["href"]} for link in links},
+            geometry.bbox(hit["_source"]["geometry"]),
         )
 
+    def hits_to_items(self, hits, parts=None):
+        """lazily translate a page of search hits to STAC item dicts
+
+        If given, only the ``parts`` of the items are constructed.
+        """
+        if self.validate_items:
+            yield from (self.hit_to_item(hit) for hit in hits)
+            return
+
+        if parts is None or "assets" in parts:
+            assets = self.page_assets(hits)
+        else:
+            assets = [{}] * len(hits)
+
+        if parts is None or "bbox" in parts:
+            bboxes = geometry.bboxes(hit["_source"].get("geometry") for hit in hits)
+        else:
+            bboxes = [None] * len(hits)
+
+        for hit, item_assets, bbox in zip(hits, assets, bboxes):
+            yield self.item_dict(hit, item_assets, bbox)
+
+    async def item(self, collection, item_id):
+        """look up a single item by id"""
+        try:
+            with timing.stage("upstream", exclude=["parse"]):
+                hit = await self.session.get(
+                    index=self.prefix + collection,
+                    id=item_id,
+                    _source_includes=self.item_source,
+                )
+        except elasticsearch.NotFoundError as e:
+            raise errors.NotFoundError(
+                f"could not find item {item_id!r} in collection {collection!r}"
+            ) from e
+
+        return self.hit_to_item(hit)
+
+    async def search(self, search_request, token, fields=None, excluded=None):
+        """search for items, one page at a time
+
+        Returns the token of the next page, the items (translated lazily) and the
+        number of matched items. See `search_hits` for the parameters.
+        """
+        new_token, hits, n_matched, query = await self.search_hits(
+            search_request, token, fields=fields, excluded=excluded
+        )
+
+        return new_token, self.translate(hits, query), n_matched
+
+    def translate(self, hits, query):
+        """lazily translate the hits of a query to items"""
+        items = self.hits_to_items(hits, parts=query.parts)
+        if query.projection is not None:
+            items = map(query.projection, items)
+
+        return items
+
+    async def search_hits(self, search_request, token, fields=None, excluded=None):
+        """search for the hits of a page, without translating them to items
+
+        Pages are requested using ``search_after``. If a `PointInTimeManager` is
+        configured, the first page opens a point in time that is used for all
+        following pages, such that the pages stay consistent while the index changes.
+
+        The total number of hits is counted according to ``track_total_hits``, and
+        only returned if the count is exact. ``fields`` are the fields of the fields
+        extension, and ``excluded`` are left out of searches over all collections (see
+        `QueryBuilder.build`).
+
+        With ``pre_filter_shard_size``, shards that can't match the filters are
+        skipped before searching.
+        """
+
+        # reject invalid tokens before doing anything else
+        search_after, pit_id = self.tokens.decode(token)
+
+        query = self.queries.build(search_request, fields=fields, excluded=excluded)
+
+        opened = self.pit is not None and pit_id is None
+        if self.pit is not None:
+            if opened:
+                pit_id = await self.pit.open(query.indexes)
+            target = {"pit": self.pit.pit(pit_id)}
+        else:
+            target = {"index": query.indexes}
+
+        if not self.validate_items:
+            target["_source"] = query.source
+        if self.pre_filter_shard_size is not None:
+            target["pre_filter_shard_size"] = self.pre_filter_shard_size
+
+        try:
+            with timing.stage("upstream", exclude=["parse"]):
+                result = await self.session.search(
+                    query=query.query,
+                    size=search_request.limit,
+                    track_total_hits=self.track_total_hits,
+                    sort=self.sort,
+                    search_after=search_after,
+                    **target,
+                )
+        except elasticsearch.NotFoundError as e:
+            if self.pit is None:
+                raise
+            raise errors.InvalidQueryParameter(
+                "the point in time of the token expired, restart the search"
+            ) from e
+
         hits = result["hits"]
         all_hits = hits["hits"]
 
-        new_token = encode_search_after(all_hits[-1]["sort"]) if all_hits else None
-        items = [self.hit_to_item(hit) for hit in hits["hits"]]
+        if self.pit is not None:
+            # the id of a point in time may change between searches
+            new_pit_id = result.get("pit_id", pit_id)
+        else:
+            new_pit_id = None
+
+        if len(all_hits) < search_request.limit:
+            # last page. Points in time from tokens are left to expire, such that
+            # the page can be requested again, but ones that were never handed out
+            # can be closed right away.
+            new_token = None
+            if opened:
+                await self.pit.close(new_pit_id)
+        else:
+            new_token = self.tokens.encode(all_hits[-1]["sort"], pit_id=new_pit_id)
 
-        return new_token, items
+        return new_token, all_hits, number_matched(hits), query
 
 
 dialects = {
@@ -0,0 +1,108 @@
+import datetime as dt
+
+import dateutil.parser
+import pystac
+
+from .. import geometry
+from .query import split_datetime
+
+global_bbox = [-180.0, -90.0, 180.0, 90.0]
+
+
+def from_epoch_millis(value):
+    if value is None:
+        return None
+
+    return dt.datetime.fromtimestamp(value / 1000, tz=dt.timezone.utc)
+
+
+def parse_datetime(value):
+    if value is None:
+        return None
+
+    parsed = dateutil.parser.isoparse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt.timezone.utc)
+
+    return parsed
+
+
+def bucket_to_extent(bucket):
+    """construct the extent of a collection from the aggregations over its index
+
+    Expects the ``start`` (min), ``end`` (max) and ``bounds`` (geo_bounds)
+    sub-aggregations. Missing values (for example of empty indexes) result in a global
+    bounding box and open time intervals.
+    """
+    bounds = bucket.get("bounds", {}).get("bounds")
+    if bounds is not None:
+        top_left, bottom_right = bounds["top_left"], bounds["bottom_right"]
+        bbox = [
+            top_left["lon"],
+            bottom_right["lat"],
+            bottom_right["lon"],
+            top_left["lat"],
+        ]
+    else:
+        bbox = global_bbox
+
+    start = from_epoch_millis(bucket.get("start", {}).get("value"))
+    end = from_epoch_millis(bucket.get("end", {}).get("value"))
+
+    return pystac.Extent(
+        spatial=pystac.SpatialExtent([bbox]),
+        temporal=pystac.TemporalExtent([[start, end]]),
+    )
+
+
+def default_extent():
+    """the extent of collections with unknown extent"""
+    return pystac.Extent(
+        spatial=pystac.SpatialExtent([global_bbox]),
+        temporal=pystac.TemporalExtent([[None, None]]),
+    )
+
+
+def search_bounds(search_request):
+    """the time interval and bounding box of a search, ``None`` where unbounded"""
+    start, end = split_datetime(search_request.datetime)
+
+    if search_request.bbox:
+        bbox = list(search_request.bbox)
+        if len(bbox) == 6:
+            bbox = [bbox[0], bbox[1], bbox[3], bbox[4]]
+    elif search_request.intersects is not None:
+        bbox = geometry.bbox(
+            {
+                "type": search_request.intersects.type,
+                "coordinates": search_request.intersects.coordinates,
+            }
+        )
+    else:
+        bbox = None
+
+    return parse_datetime(start), parse_datetime(end), bbox
+
+
+def overlaps(extent, start, end, bbox):
+    """whether a search bounded by ``start``, ``end`` and ``bbox`` can match items
+    within ``extent``
+
+    Extents are cached, and new items most often extend them in time. Thus, the end
+    of the extent is treated as open. Other changes are only picked up once the
+    extent is refreshed. Bounding boxes crossing the antimeridian are never
+    considered disjoint.
+    """
+    extent_start, _ = extent.temporal.intervals[0]
+    if end is not None and extent_start is not None and end < extent_start:
+        return False
+
+    if bbox is None:
+        return True
+
+    west, south, east, north = extent.spatial.bboxes[0]
+    x0, y0, x1, y1 = bbox
+    if west > east or x0 > x1:
+        return True
+
+    return not (x0 > east or x1 < west or y0 > north or y1 < south)
@@ -1,3 +1,7 @@
+from .. import timing
+
+
+@timing.timed("pagination")
 def generate_get_pagination_links(url, *, token):
     # to generate pagination links, we need:
     # - the url
@@ -6,7 +10,7 @@ def generate_get_pagination_links(url, *, token):
     if token is None:
         return []
 
-    new_url = url.replace_query_params(token=token)
+    new_url = url.include_query_params(token=token)
 
     next_link = {
         "rel": "next",
@@ -17,6 +21,7 @@ def generate_get_pagination_links(url, *, token):
     return [next_link]
 
 
+@timing.timed("pagination")
 def generate_post_pagination_links(url, *, token):
     if token is None:
         return []
@@ -0,0 +1,49 @@
+import attrs
+import elasticsearch
+from attrs import validators
+
+
+@attrs.define
+class PointInTimeManager:
+    """Open point-in-time contexts.
+
+    Once the id of a context has been handed out in a token, the context is never
+    closed explicitly: the last page of a search may be requested again, shared
+    between coalesced or prefetched searches, or requested from a different worker
+    process. Instead, every search extends the context by ``keep_alive``, and
+    elasticsearch expires contexts that haven't been used for that long.
+
+    Parameters
+    ----------
+    session : elasticsearch.AsyncElasticsearch
+        The elasticsearch client.
+    keep_alive : int
+        Number of seconds a point in time is kept alive after each page.
+    """
+
+    session = attrs.field()
+    keep_alive = attrs.field(
+        default=60, validator=[validators.instance_of(int), validators.gt(0)]
+    )
+
+    @property
+    def keep_alive_param(self):
+        return f"{self.keep_alive}s"
+
+    def pit(self, pit_id):
+        """the ``pit`` parameter of a search using ``pit_id``"""
+        return {"id": pit_id, "keep_alive": self.keep_alive_param}
+
+    async def open(self, indexes):
+        response = await self.session.open_point_in_time(
+            index=indexes, keep_alive=self.keep_alive_param
+        )
+
+        return response["id"]
+
+    async def close(self, pit_id):
+        try:
+            await self.session.close_point_in_time(body={"id": pit_id})
+        except elasticsearch.NotFoundError:
+            # already expired
+            pass
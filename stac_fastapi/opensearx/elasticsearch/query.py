@@ -0,0 +1,225 @@
+import attrs
+
+from ..cache import LRUCache
+
+# fields of the fields extension that are returned even if not requested
+always_included = frozenset({"id", "type"})
+
+
+def split_datetime(datetime):
+    """split a datetime or interval into its bounds, ``None`` for open ends"""
+    if not datetime:
+        return None, None
+
+    if "/" in datetime:
+        start, end = datetime.split("/")
+    else:
+        start, end = datetime, datetime
+
+    return (start if start != ".." else None), (end if end != ".." else None)
+
+
+def split_path(path):
+    key, _, subkey = path.partition(".")
+    return key, subkey
+
+
+@attrs.frozen
+class Projection:
+    """select parts of items, following the semantics of the fields extension
+
+    Paths are either top-level keys (``"geometry"``) or nested keys
+    (``"properties.start_datetime"``). If ``include`` is empty, everything not in
+    ``exclude`` is returned.
+    """
+
+    include = attrs.field(converter=frozenset)
+    exclude = attrs.field(converter=frozenset)
+
+    @classmethod
+    def from_fields(cls, fields):
+        """construct a projection from the fields of a search request
+
+        Returns ``None`` if all fields are requested.
+        """
+        if fields is None:
+            return None
+
+        include = set(fields.include or ())
+        exclude = set(fields.exclude or ())
+        if not include and not exclude:
+            return None
+
+        return cls(include=include - exclude, exclude=exclude - always_included)
+
+    def parts(self, all_parts):
+        """the top-level keys of an item that survive the projection"""
+        if self.include:
+            parts = {split_path(path)[0] for path in self.include | always_included}
+        else:
+            parts = set(all_parts)
+
+        return {part for part in parts if part not in self.exclude}
+
+    def __call__(self, item):
+        if self.include:
+            projected = {}
+            for path in self.include | always_included:
+                key, subkey = split_path(path)
+                if key not in item:
+                    continue
+
+                if not subkey:
+                    projected[key] = item[key]
+                elif isinstance(item[key], dict) and subkey in item[key]:
+                    nested = projected.setdefault(key, {})
+                    if nested is not item[key]:
+                        nested[subkey] = item[key][subkey]
+        else:
+            projected = dict(item)
+
+        for path in self.exclude:
+            key, subkey = split_path(path)
+            if not subkey:
+                projected.pop(key, None)
+            elif isinstance(projected.get(key), dict):
+                projected[key] = {
+                    name: value
+                    for name, value in projected[key].items()
+                    if name != subkey
+                }
+
+        return projected
+
+
+@attrs.frozen
+class Skeleton:
+    """the parts of a query that only depend on the shape of the request"""
+
+    indexes = attrs.field()
+    filters = attrs.field()
+    source = attrs.field()
+    parts = attrs.field()
+
+
+@attrs.frozen
+class Query:
+    indexes = attrs.field()
+    query = attrs.field()
+    source = attrs.field()
+    parts = attrs.field()
+    projection = attrs.field()
+
+
+@attrs.define
+class QueryBuilder:
+    """Build elasticsearch queries in filter context.
+
+    Everything that only depends on the shape of a request – the searched
+    collections, the kinds of filters and the requested fields – is compiled once
+    and cached. Only the fields needed to construct the requested parts of the items
+    are requested from elasticsearch.
+
+    Parameters
+    ----------
+    dialect
+        The dialect providing the index names, the filter clauses and the source
+        fields of each part of an item.
+    cache_size : int, default: 256
+        Maximum number of cached skeletons.
+    """
+
+    dialect = attrs.field()
+    cache_size = attrs.field(default=256)
+
+    cache = attrs.field(init=False)
+
+    @cache.default
+    def _create_cache(self):
+        return LRUCache(maxsize=self.cache_size)
+
+    def compile(self, collections, shape, projection):
+        has_ids, has_start, has_end, has_bbox, has_intersects = shape
+        dialect = self.dialect
+
+        if collections:
+            indexes = [dialect.prefix + name for name in collections]
+        else:
+            indexes = dialect.index_pattern
+
+        filters = []
+        if has_ids:
+            filters.append(lambda request, start, end: dialect.ids_clause(request.ids))
+        if has_start:
+            filters.append(lambda request, start, end: dialect.start_clause(start))
+        if has_end:
+            filters.append(lambda request, start, end: dialect.end_clause(end))
+        if has_bbox:
+            filters.append(
+                lambda request, start, end: dialect.bbox_clause(request.bbox)
+            )
+        elif has_intersects:
+            filters.append(
+                lambda request, start, end: dialect.intersects_clause(
+                    request.intersects
+                )
+            )
+
+        parts = frozenset(
+            projection.parts(dialect.source_fields)
+            if projection is not None
+            else dialect.source_fields
+        )
+        source = sorted(
+            {field for part in parts for field in dialect.source_fields.get(part, ())}
+        )
+
+        return Skeleton(
+            indexes=indexes, filters=tuple(filters), source=source, parts=parts
+        )
+
+    def build(self, search_request, fields=None, excluded=None):
+        """build the query for a search request
+
+        ``fields`` are the fields of the fields extension, if any. ``excluded``
+        are collections to leave out of searches over all collections. They are
+        excluded by a filter rather than by listing the other indexes, such that
+        indexes created since the collections were listed are still searched, the
+        request line stays short, and shards of excluded indexes are skipped while
+        pre-filtering.
+        """
+        start, end = split_datetime(search_request.datetime)
+        projection = Projection.from_fields(fields)
+
+        collections = (
+            tuple(search_request.collections) if search_request.collections else None
+        )
+        shape = (
+            bool(search_request.ids),
+            start is not None,
+            end is not None,
+            bool(search_request.bbox),
+            search_request.intersects is not None,
+        )
+
+        key = (collections, shape, projection)
+        skeleton = self.cache.get(key)
+        if skeleton is None:
+            skeleton = self.compile(collections, shape, projection)
+            self.cache.put(key, skeleton)
+
+        clauses = [make(search_request, start, end) for make in skeleton.filters]
+        if excluded and not collections:
+            clauses.append(
+                self.dialect.exclude_indexes_clause(
+                    [self.dialect.prefix + name for name in excluded]
+                )
+            )
+
+        return Query(
+            indexes=skeleton.indexes,
+            query={"bool": {"filter": clauses}} if clauses else None,
+            source=skeleton.source,
+            parts=skeleton.parts,
+            projection=projection,
+        )
@@ -0,0 +1,64 @@
+import json
+import pathlib
+from typing import Optional
+from urllib.parse import urlsplit
+
+from pydantic import validator
+
+from ..settings import ServerSettings
+from .dialects import parse_track_total_hits
+
+
+class Settings(ServerSettings):
+    """settings of the elasticsearch api, see `create_api`
+
+    The database is either configured by a credentials file, or by
+    ``OPENSEARX_BACKEND_URL``, ``OPENSEARX_BACKEND_USER`` and
+    ``OPENSEARX_BACKEND_PASSWORD``.
+    """
+
+    credentials: Optional[pathlib.Path] = None
+    backend_url: Optional[str] = None
+    backend_user: Optional[str] = None
+    backend_password: Optional[str] = None
+    use_socks_proxy: bool = False
+
+    dialect: str = "ifremer"
+    dialect_config: Optional[pathlib.Path] = None
+    validate_items: bool = False
+    point_in_time_keep_alive: Optional[int] = None
+    track_total_hits: str = "10000"
+    token_secret: Optional[str] = None
+
+    @validator("track_total_hits")
+    def _valid_track_total_hits(cls, value):
+        parse_track_total_hits(value)
+
+        return value
+
+    def database_credentials(self):
+        if self.credentials is not None:
+            if self.credentials.suffix == ".json":
+                return json.loads(self.credentials.read_text())
+            else:
+                return self.credentials.read_text()
+
+        if self.backend_url is None:
+            raise ValueError(
+                "cannot find the backend url. Pass either --credentials or set"
+                " OPENSEARX_BACKEND_URL"
+            )
+
+        parts = urlsplit(self.backend_url)
+
+        if self.backend_user is None or self.backend_password is None:
+            auth = None
+        else:
+            auth = f"{self.backend_user}:{self.backend_password}"
+
+        return {
+            "host": parts.hostname,
+            "port": parts.port,
+            "use_ssl": True,
+            "http_auth": auth,
+        }
@@ -0,0 +1,186 @@
+"""compact, signed pagination tokens
+
+A token contains the sort values of the last hit of a page and, optionally, the id
+of a point in time. The values keep their type, so they can be passed to
+``search_after`` as-is. The layout is::
+
+    version (u8) | flags (u8) | [pit id (str)] | count (u8) | values | signature
+
+where each value is a type tag (u8) followed by the value: a signed 64-bit integer,
+a double, or a string prefixed by its length (u16). All numbers are big-endian.
+The signature is a truncated HMAC-SHA256 of everything before it.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+import struct
+
+import attrs
+from stac_fastapi.types import errors
+
+version = 1
+signature_size = 16
+
+has_pit = 0b1
+
+tag_none = 0
+tag_int = 1
+tag_float = 2
+tag_str = 3
+
+header = struct.Struct(">BB")
+length = struct.Struct(">H")
+count = struct.Struct(">B")
+int_value = struct.Struct(">q")
+float_value = struct.Struct(">d")
+tag = struct.Struct(">B")
+
+
+def default_secret():
+    """the secret from the ``OPENSEARX_TOKEN_SECRET`` environment variable
+
+    Falls back to a random secret, which means tokens are only valid for the
+    process that created them.
+    """
+    secret = os.environ.get("OPENSEARX_TOKEN_SECRET")
+    if secret is None:
+        return secrets.token_bytes(32)
+
+    return secret
+
+
+def to_bytes(secret):
+    if isinstance(secret, str):
+        return secret.encode()
+
+    return secret
+
+
+def pack_str(value):
+    encoded = value.encode()
+    return length.pack(len(encoded)) + encoded
+
+
+def pack_value(value):
+    if value is None:
+        return tag.pack(tag_none)
+    elif isinstance(value, bool):
+        raise TypeError("cannot encode booleans")
+    elif isinstance(value, int):
+        return tag.pack(tag_int) + int_value.pack(value)
+    elif isinstance(value, float):
+        return tag.pack(tag_float) + float_value.pack(value)
+    elif isinstance(value, str):
+        return tag.pack(tag_str) + pack_str(value)
+    else:
+        raise TypeError(f"cannot encode sort values of type {type(value).__name__}")
+
+
+def unpack_str(data, offset):
+    (size,) = length.unpack_from(data, offset)
+    offset += length.size
+    if offset + size > len(data):
+        raise ValueError("truncated string")
+
+    return data[offset : offset + size].decode(), offset + size
+
+
+def unpack_value(data, offset):
+    (value_tag,) = tag.unpack_from(data, offset)
+    offset += tag.size
+
+    if value_tag == tag_none:
+        return None, offset
+    elif value_tag == tag_int:
+        return int_value.unpack_from(data, offset)[0], offset + int_value.size
+    elif value_tag == tag_float:
+        return float_value.unpack_from(data, offset)[0], offset + float_value.size
+    elif value_tag == tag_str:
+        return unpack_str(data, offset)
+    else:
+        raise ValueError(f"unknown type tag: {value_tag}")
+
+
+@attrs.define
+class TokenCodec:
+    """Encode and decode signed pagination tokens.
+
+    Parameters
+    ----------
+    secret : str or bytes
+        The key used to sign the tokens. All processes serving the same api need to
+        use the same secret. By default, read from the ``OPENSEARX_TOKEN_SECRET``
+        environment variable.
+    """
+
+    secret = attrs.field(factory=default_secret, converter=to_bytes, repr=False)
+
+    def sign(self, payload):
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()[:signature_size]
+
+    def encode(self, search_after, pit_id=None):
+        if len(search_after) > 255:
+            raise ValueError("too many sort values")
+
+        parts = [header.pack(version, has_pit if pit_id is not None else 0)]
+        if pit_id is not None:
+            parts.append(pack_str(pit_id))
+        parts.append(count.pack(len(search_after)))
+        parts.extend(pack_value(value) for value in search_after)
+
+        payload = b"".join(parts)
+        token = payload + self.sign(payload)
+
+        return base64.urlsafe_b64encode(token).rstrip(b"=").decode()
+
+    def decode(self, token):
+        """decode a token into the sort values and the point in time id
+
+        Raises `InvalidQueryParameter` if the token is malformed or was not signed
+        using the same secret.
+        """
+        if token is None:
+            return None, None
+
+        try:
+            data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except (binascii.Error, ValueError) as e:
+            raise errors.InvalidQueryParameter(f"invalid token: {token}") from e
+
+        if len(data) < header.size + count.size + signature_size:
+            raise errors.InvalidQueryParameter(f"invalid token: {token}")
+
+        payload, signature = data[:-signature_size], data[-signature_size:]
+        if not hmac.compare_digest(self.sign(payload), signature):
+            raise errors.InvalidQueryParameter(f"invalid token: {token}")
+
+        try:
+            return self.parse(payload)
+        except (struct.error, UnicodeDecodeError, ValueError) as e:
+            raise errors.InvalidQueryParameter(f"invalid token: {token}") from e
+
+    def parse(self, payload):
+        token_version, flags = header.unpack_from(payload, 0)
+        if token_version != version:
+            raise ValueError(f"unsupported token version: {token_version}")
+        offset = header.size
+
+        pit_id = None
+        if flags & has_pit:
+            pit_id, offset = unpack_str(payload, offset)
+
+        (n_values,) = count.unpack_from(payload, offset)
+        offset += count.size
+
+        search_after = []
+        for _ in range(n_values):
+            value, offset = unpack_value(payload, offset)
+            search_after.append(value)
+
+        if offset != len(payload):
+            raise ValueError("trailing data")
+
+        return search_after, pit_id
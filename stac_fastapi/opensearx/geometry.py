@@ -0,0 +1,104 @@
+import itertools
+
+import numpy as np
+
+
+def positions(geometry):
+    """the positions of a geojson (or elasticsearch envelope) geometry, flattened"""
+    type_ = geometry["type"].lower()
+    coordinates = geometry.get("coordinates")
+
+    if type_ == "point":
+        return [coordinates]
+    elif type_ in ("linestring", "multipoint", "envelope", "box"):
+        return list(coordinates)
+    elif type_ in ("polygon", "multilinestring"):
+        return list(itertools.chain.from_iterable(coordinates))
+    elif type_ == "multipolygon":
+        return [
+            position for polygon in coordinates for ring in polygon for position in ring
+        ]
+    elif type_ == "geometrycollection":
+        return [
+            position
+            for member in geometry["geometries"]
+            for position in positions(member)
+        ]
+    else:
+        raise ValueError(f"unknown geometry type: {geometry['type']}")
+
+
+def as_array(positions):
+    try:
+        array = np.array(positions, dtype="float64")
+    except ValueError:
+        # mixed dimensions
+        array = np.array([position[:2] for position in positions], dtype="float64")
+
+    return array.reshape(-1, array.shape[-1] if array.size else 2)[:, :2]
+
+
+def bboxes(geometries):
+    """compute the bounding boxes of many geometries at once
+
+    Geometries crossing the antimeridian get a bounding box with ``west > east``,
+    following the STAC / geojson convention. Missing or empty geometries get a
+    bounding box of ``None``.
+
+    Parameters
+    ----------
+    geometries : iterable of dict or None
+        The geometries. Can be any geojson geometry or an elasticsearch envelope.
+
+    Returns
+    -------
+    bboxes : list of list of float or None
+        The bounding boxes as ``[west, south, east, north]``.
+    """
+    flattened = [positions(geom) if geom is not None else [] for geom in geometries]
+    counts = np.array([len(geom) for geom in flattened], dtype="int64")
+
+    result = [None] * len(flattened)
+    non_empty = np.flatnonzero(counts)
+    if non_empty.size == 0:
+        return result
+
+    coords = as_array(list(itertools.chain.from_iterable(flattened)))
+    offsets = np.concatenate([[0], np.cumsum(counts[non_empty])[:-1]])
+
+    lower = np.minimum.reduceat(coords, offsets, axis=0)
+    upper = np.maximum.reduceat(coords, offsets, axis=0)
+
+    # geometries spanning more than half of the globe might be crossing the
+    # antimeridian: compare with the extent of the longitudes shifted to [0, 360).
+    # Positions on the antimeridian itself are ambiguous, so they are ignored.
+    west, east = lower[:, 0], upper[:, 0]
+    candidates = (east - west) > 180
+    if candidates.any():
+        longitudes = coords[:, 0]
+        shifted = np.where(
+            np.abs(longitudes) == 180,
+            np.nan,
+            np.where(longitudes < 0, longitudes + 360, longitudes),
+        )
+        shifted_west = np.fmin.reduceat(shifted, offsets)
+        shifted_east = np.fmax.reduceat(shifted, offsets)
+
+        crossing = candidates & ((shifted_east - shifted_west) < 180)
+        west = np.where(crossing, shifted_west, west)
+        east = np.where(
+            crossing,
+            np.where(shifted_east > 180, shifted_east - 360, shifted_east),
+            east,
+        )
+
+    bounds = np.stack([west, lower[:, 1], east, upper[:, 1]], axis=1).tolist()
+    for index, bbox in zip(non_empty.tolist(), bounds):
+        result[index] = bbox
+
+    return result
+
+
+def bbox(geometry):
+    """compute the bounding box of a single geometry"""
+    return bboxes([geometry])[0]
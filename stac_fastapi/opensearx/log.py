@@ -0,0 +1,68 @@
+import logging
+import logging.handlers
+import queue
+
+logger = logging.getLogger("stac_fastapi.opensearx")
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """queue handler that leaves formatting to the listener thread
+
+    The default `QueueHandler` formats the message before putting it into the queue,
+    which means the formatting happens on the event loop. Since the queue never leaves
+    the process, the record can be passed on as-is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """format records as the message followed by ``key=value`` pairs
+
+    The pairs are taken from the ``fields`` attribute of the record, which can be set
+    using ``extra={"fields": {...}}``.
+    """
+
+    def format(self, record):
+        message = super().format(record)
+
+        fields = getattr(record, "fields", None)
+        if not fields:
+            return message
+
+        formatted = " ".join(
+            f"{key}={format_value(value)}" for key, value in fields.items()
+        )
+        return f"{message} {formatted}"
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return f"{value:.6f}"
+
+    return str(value)
+
+
+def setup_logging(level="info"):
+    """send the log records of this package through a queue to stderr
+
+    Returns the queue listener, which has to be stopped on shutdown.
+    """
+    records = queue.SimpleQueue()
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        StructuredFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    listener = logging.handlers.QueueListener(
+        records, handler, respect_handler_level=True
+    )
+
+    logger.handlers = [DeferredQueueHandler(records)]
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+    listener.start()
+
+    return listener
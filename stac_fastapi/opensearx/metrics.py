@@ -0,0 +1,194 @@
+"""export metrics in the prometheus format
+
+Requires ``prometheus_client``. If the ``PROMETHEUS_MULTIPROC_DIR`` environment
+variable is set, the metrics of all worker processes are aggregated (see the
+documentation of ``prometheus_client`` on multiprocess mode), except for the pool
+and cache statistics, which are reported by the worker serving the scrape.
+"""
+import os
+
+import attrs
+import prometheus_client
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.responses import Response
+
+latency_buckets = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+
+
+# collectors are registered by identity
+@attrs.define(eq=False)
+class StatsCollector:
+    """collect the pool and cache statistics of a client on each scrape"""
+
+    backend = attrs.field()
+    stats = attrs.field()
+
+    def collect(self):
+        stats = self.stats()
+
+        pool = GaugeMetricFamily(
+            "opensearx_pool",
+            "connections of the pool used to query the backend",
+            labels=["backend", "stat"],
+        )
+        for name, value in stats.get("pool", {}).items():
+            pool.add_metric([self.backend, name], value)
+        yield pool
+
+        hits = CounterMetricFamily(
+            "opensearx_cache_hits",
+            "number of lookups answered by a cache",
+            labels=["backend", "cache"],
+        )
+        misses = CounterMetricFamily(
+            "opensearx_cache_misses",
+            "number of lookups not answered by a cache",
+            labels=["backend", "cache"],
+        )
+        for name, cache in stats.get("caches", {}).items():
+            hits.add_metric([self.backend, name], cache["hits"])
+            misses.add_metric([self.backend, name], cache["misses"])
+        yield hits
+        yield misses
+
+        coalesced = stats.get("single_flight")
+        if coalesced is not None:
+            calls = CounterMetricFamily(
+                "opensearx_upstream_calls",
+                "number of searches sent to the backend",
+                labels=["backend"],
+            )
+            calls.add_metric([self.backend], coalesced["calls"])
+            yield calls
+
+            saved = CounterMetricFamily(
+                "opensearx_upstream_calls_saved",
+                "number of searches answered by an identical search in flight",
+                labels=["backend"],
+            )
+            saved.add_metric([self.backend], coalesced["saved"])
+            yield saved
+
+
+@attrs.define
+class Metrics:
+    """Record request metrics and serve them on a route.
+
+    Passed to `timing.TimingMiddleware`, which reports every request. The duration
+    of the stages of each request is recorded per backend, stage and collection.
+
+    Parameters
+    ----------
+    backend : str
+        Name of the backend, used as a label.
+    stats : callable, optional
+        Returns the pool and cache statistics of the client, see `StatsCollector`.
+    max_collections : int, default: 100
+        Maximum number of collections used as labels. Others are reported as
+        ``"other"``, to keep the number of series bounded.
+    """
+
+    backend = attrs.field()
+    stats = attrs.field(default=None)
+    max_collections = attrs.field(default=100)
+
+    registry = attrs.field(init=False)
+    requests = attrs.field(init=False)
+    stages = attrs.field(init=False)
+    in_flight = attrs.field(init=False)
+    collections = attrs.field(factory=set, init=False)
+
+    def __attrs_post_init__(self):
+        multiprocess_mode = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+        # in multiprocess mode, the values are written to files and collected from
+        # there, so they have to be registered nowhere
+        self.registry = prometheus_client.CollectorRegistry(auto_describe=True)
+        registry = None if multiprocess_mode else self.registry
+
+        self.requests = prometheus_client.Histogram(
+            "opensearx_request_duration_seconds",
+            "duration of requests",
+            ["backend", "route", "method", "status"],
+            buckets=latency_buckets,
+            registry=registry,
+        )
+        self.stages = prometheus_client.Histogram(
+            "opensearx_stage_duration_seconds",
+            "time spent in the stages of requests",
+            ["backend", "stage", "collection"],
+            buckets=latency_buckets,
+            registry=registry,
+        )
+        self.in_flight = prometheus_client.Gauge(
+            "opensearx_requests_in_flight",
+            "number of requests being served",
+            ["backend"],
+            registry=registry,
+            multiprocess_mode="livesum",
+        )
+
+        if multiprocess_mode:
+            multiprocess.MultiProcessCollector(self.registry)
+        if self.stats is not None:
+            self.registry.register(StatsCollector(self.backend, self.stats))
+
+    def collection_label(self, collections):
+        if not collections:
+            return "all"
+        elif len(collections) > 1:
+            return "multiple"
+
+        [collection] = collections
+        if collection in self.collections:
+            return collection
+        elif len(self.collections) < self.max_collections:
+            self.collections.add(collection)
+            return collection
+
+        return "other"
+
+    def request_started(self, scope):
+        self.in_flight.labels(self.backend).inc()
+
+    def request_finished(self, scope, status, total, timings):
+        self.in_flight.labels(self.backend).dec()
+
+        if scope["path"] == "/metrics":
+            return
+
+        route = getattr(scope.get("route"), "path", "unmatched")
+
+        self.requests.labels(
+            self.backend, route, scope["method"], str(status or 500)
+        ).observe(total)
+
+        collection = self.collection_label(timings.labels.get("collections"))
+        for stage, seconds in timings.stages.items():
+            self.stages.labels(self.backend, stage, collection).observe(seconds)
+
+    async def endpoint(self, request):
+        return Response(
+            prometheus_client.generate_latest(self.registry),
+            media_type=prometheus_client.CONTENT_TYPE_LATEST,
+        )
+
+    def mount(self, app):
+        """add the ``/metrics`` route to an app"""
+        app.add_route("/metrics", self.endpoint, include_in_schema=False)
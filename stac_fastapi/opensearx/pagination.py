@@ -4,6 +4,8 @@ from urllib.parse import urlunsplit
 
 from starlette.datastructures import QueryParams
 
+from . import timing
+
 rels = ["prev", "self", "next"]
 
 
@@ -37,6 +39,7 @@ def get_link(rel, url, page, total_pages, limit):
     }
 
 
+@timing.timed("pagination")
 def generate_get_pagination_links(request, *, page, n_results, limit):
     total_pages = math.ceil(n_results / limit)
 
@@ -87,6 +90,7 @@ def post_link(rel, url, page, total_pages, limit):
     }
 
 
+@timing.timed("pagination")
 def generate_post_pagination_links(request, *, page, n_results, limit):
     total_pages = math.ceil(n_results / limit)
 
@@ -96,3 +100,37 @@ def generate_post_pagination_links(request, *, page, n_results, limit):
         for rel in rels
     ]
     return [link for link in links if link]
+
+
+@timing.timed("pagination")
+def generate_get_token_pagination_links(request, *, token):
+    if token is None:
+        return []
+
+    new_url = request.url.include_query_params(token=token)
+
+    return [
+        {
+            "rel": "next",
+            "href": str(new_url),
+            "method": "GET",
+        }
+    ]
+
+
+@timing.timed("pagination")
+def generate_post_token_pagination_links(request, *, token):
+    if token is None:
+        return []
+
+    return [
+        {
+            "rel": "next",
+            "href": post_url(request.url),
+            "method": "POST",
+            "body": {
+                "token": token,
+            },
+            "merge": True,
+        }
+    ]
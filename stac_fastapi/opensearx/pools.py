@@ -0,0 +1,14 @@
+def connector_stats(connector):
+    """statistics of the connection pool of an aiohttp session"""
+    if connector is None or connector.closed:
+        return {}
+
+    # aiohttp does not expose these, so this relies on its internals
+    acquired = getattr(connector, "_acquired", ())
+    idle = getattr(connector, "_conns", {})
+
+    return {
+        "limit": connector.limit,
+        "in_use": len(acquired),
+        "idle": sum(len(conns) for conns in idle.values()),
+    }
@@ -0,0 +1,216 @@
+import asyncio
+import collections
+import time
+
+import attrs
+from attrs import validators
+
+from . import timing
+from .log import logger
+
+
+def client_id(request):
+    """identify the client of a request
+
+    Behind a reverse proxy, all requests come from the same address, so the
+    original client is taken from the ``X-Forwarded-For`` header, if present.
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+
+    if request.client is None:
+        return None
+
+    return request.client.host
+
+
+def walk_id(request, search):
+    """identify a walk through the pages of ``search`` by the client of a request
+
+    Read-ahead adapts to each walk, such that an abandoned walk does not affect
+    the other searches of the same client.
+    """
+    return client_id(request), search
+
+
+@attrs.define
+class Entry:
+    task = attrs.field()
+    created = attrs.field()
+
+
+@attrs.define
+class ClientState:
+    depth = attrs.field()
+    last_seen = attrs.field()
+    buffer = attrs.field(factory=collections.OrderedDict)
+
+
+def discard_exception(task):
+    # failed prefetches are retried in the foreground, so only log the error
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("prefetch failed: %r", task.exception())
+
+
+@attrs.define
+class Prefetcher:
+    """Read ahead the next pages of paginated searches.
+
+    After a page has been served, the next page is fetched in the background and
+    kept in a small buffer, keyed by whatever identifies the next page (the search
+    and the page number or token). If the client requests it, it is served from the
+    buffer.
+
+    The number of pages read ahead adapts to each client, which is usually a walk
+    through a search (see `walk_id`): every buffered page a client uses increases
+    it (up to ``max_depth``), and every page dropped unused decreases it, down to a
+    single page. Clients that have not been seen for ``ttl`` seconds are forgotten.
+
+    Parameters
+    ----------
+    max_depth : int, default: 2
+        Maximum number of pages read ahead per client.
+    ttl : float, default: 30
+        Number of seconds buffered pages are kept.
+    max_clients : int, default: 256
+        Maximum number of clients to keep buffers for. The least recently seen
+        clients are dropped first.
+    clock : callable
+        Monotonic clock returning seconds.
+    """
+
+    max_depth = attrs.field(
+        default=2, validator=[validators.instance_of(int), validators.ge(1)]
+    )
+    ttl = attrs.field(default=30, validator=validators.gt(0))
+    max_clients = attrs.field(
+        default=256, validator=[validators.instance_of(int), validators.ge(1)]
+    )
+    clock = attrs.field(default=time.monotonic)
+
+    clients = attrs.field(factory=collections.OrderedDict, init=False)
+    hits = attrs.field(default=0, init=False)
+    misses = attrs.field(default=0, init=False)
+
+    def state(self, client):
+        now = self.clock()
+        self.expire(now)
+
+        state = self.clients.get(client)
+        if state is None:
+            state = self.clients[client] = ClientState(depth=1, last_seen=now)
+
+        state.last_seen = now
+        self.clients.move_to_end(client)
+
+        while len(self.clients) > self.max_clients:
+            _, evicted = self.clients.popitem(last=False)
+            self.drop(evicted)
+
+        return state
+
+    def drop(self, state):
+        for entry in state.buffer.values():
+            entry.task.cancel()
+        state.buffer.clear()
+
+    def expire(self, now):
+        for client, state in list(self.clients.items()):
+            for key, entry in list(state.buffer.items()):
+                if now - entry.created >= self.ttl:
+                    entry.task.cancel()
+                    del state.buffer[key]
+                    # keep reading ahead a single page, such that a client that
+                    # abandoned a walk (or clients sharing an address) can recover
+                    state.depth = max(state.depth - 1, 1)
+
+            if not state.buffer and now - state.last_seen >= self.ttl:
+                del self.clients[client]
+
+    async def take(self, client, key):
+        """the buffered result for ``key``, or ``None``"""
+        state = self.state(client)
+        entry = state.buffer.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        try:
+            result = await entry.task
+        except asyncio.CancelledError:
+            if entry.task.cancelled():
+                self.misses += 1
+                return None
+            raise
+        except Exception:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        state.depth = min(state.depth + 1, self.max_depth)
+        logger.debug("serving prefetched page for %s", client)
+
+        return result
+
+    def read_ahead(self, client, key, fetch, follow):
+        """fetch the page ``key`` in the background
+
+        ``fetch`` is called without arguments and returns the page. ``follow`` is
+        called with a page and returns the key and the fetch function of the page
+        after it, or ``None`` if it is the last page. Depending on the depth of the
+        client, that page is read ahead as well.
+        """
+        state = self.state(client)
+
+        entry = state.buffer.get(key)
+        if entry is not None:
+            # pending pages continue the chain once they are done
+            task = entry.task
+            if task.done() and not task.cancelled() and task.exception() is None:
+                step = follow(task.result())
+                if step is not None:
+                    self.read_ahead(client, *step, follow)
+            return
+
+        if len(state.buffer) >= state.depth:
+            return
+
+        async def run():
+            # don't record the stages of the page in the timings of the request
+            timing.current.set(None)
+            result = await fetch()
+
+            step = follow(result)
+            if step is not None:
+                self.read_ahead(client, *step, follow)
+
+            return result
+
+        task = asyncio.create_task(run())
+        task.add_done_callback(discard_exception)
+        state.buffer[key] = Entry(task=task, created=self.clock())
+
+    async def page(self, client, key, fetch, follow):
+        """serve a page, from the buffer if possible, and read ahead the next one"""
+        result = await self.take(client, key)
+        if result is None:
+            result = await fetch()
+
+        step = follow(result)
+        if step is not None:
+            self.read_ahead(client, *step, follow)
+
+        return result
+
+    async def close(self):
+        tasks = [
+            entry.task
+            for state in self.clients.values()
+            for entry in state.buffer.values()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.clients.clear()
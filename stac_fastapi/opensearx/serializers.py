@@ -0,0 +1,119 @@
+import json
+
+import attrs
+from starlette import responses
+
+from . import timing
+
+
+def stdlib_backend():
+    def dumps(obj):
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    return JsonBackend(name="json", dumps=dumps, loads=json.loads)
+
+
+def orjson_backend():
+    import orjson
+
+    options = orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj):
+        return orjson.dumps(obj, option=options)
+
+    return JsonBackend(name="orjson", dumps=dumps, loads=orjson.loads)
+
+
+def msgspec_backend():
+    import msgspec
+
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    return JsonBackend(name="msgspec", dumps=encoder.encode, loads=decoder.decode)
+
+
+# in order of preference
+backends = {
+    "orjson": orjson_backend,
+    "msgspec": msgspec_backend,
+    "json": stdlib_backend,
+}
+
+
+@attrs.frozen
+class JsonBackend:
+    """A json implementation.
+
+    ``dumps`` encodes objects to compact json as bytes, and ``loads`` decodes json
+    from bytes or str.
+    """
+
+    name = attrs.field()
+    dumps = attrs.field()
+    loads = attrs.field()
+
+
+def get_backend(name=None):
+    """construct a json backend
+
+    If ``name`` is ``None``, the fastest installed backend is chosen.
+    """
+    if name is not None:
+        factory = backends.get(name)
+        if factory is None:
+            raise ValueError(
+                f"unknown json backend {name!r}, expected one of"
+                f" {{{', '.join(repr(b) for b in backends)}}}"
+            )
+
+        return factory()
+
+    for factory in backends.values():
+        try:
+            return factory()
+        except ImportError:
+            pass
+
+
+current = get_backend()
+
+
+def use(name=None):
+    """switch the json backend used by this package"""
+    global current
+
+    current = get_backend(name)
+
+
+def dumps(obj):
+    return current.dumps(obj)
+
+
+def loads(data):
+    return current.loads(data)
+
+
+class JSONResponse(responses.JSONResponse):
+    """json response encoded using the current backend"""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def elasticsearch_serializer():
+    """a serializer for the elasticsearch transport using the current backend"""
+    from elasticsearch.serializer import JSONSerializer
+
+    class Serializer(JSONSerializer):
+        def loads(self, s):
+            with timing.stage("parse"):
+                return loads(s)
+
+        def dumps(self, data):
+            if isinstance(data, (str, bytes)):
+                return data
+
+            return dumps(data).decode()
+
+    return Serializer()
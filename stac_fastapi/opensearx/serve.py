@@ -0,0 +1,123 @@
+"""run the apis in production
+
+The command line interfaces export their options as environment variables and
+start uvicorn with an app factory, such that every worker process constructs the
+app from the same settings. The factories can also be used with other process
+managers, for example::
+
+    OPENSEARX_TOKEN_SECRET=... uvicorn --factory --workers 4 \\
+        stac_fastapi.opensearx.elasticsearch.app:create_app
+    OPENSEARX_TOKEN_SECRET=... gunicorn -k uvicorn.workers.UvicornWorker \\
+        'stac_fastapi.opensearx.elasticsearch.app:create_app()'
+
+with the settings passed as ``OPENSEARX_*`` environment variables. Pagination
+tokens of the elasticsearch api are signed, so all workers have to share the
+secret in ``OPENSEARX_TOKEN_SECRET``. The command line interfaces generate one
+if it is not set.
+"""
+import json
+import os
+import secrets
+
+env_prefix = "OPENSEARX_"
+
+
+def add_server_arguments(parser):
+    """add the options of the server to an argument parser"""
+    parser.add_argument("--host", default=None, help="address of the new stac server")
+    parser.add_argument(
+        "--port", default=None, type=int, help="port of the new stac server"
+    )
+    parser.add_argument(
+        "--workers",
+        default=None,
+        type=int,
+        help="number of worker processes (0 for one per cpu, default: 1)",
+    )
+    parser.add_argument(
+        "--loop",
+        choices=["auto", "asyncio", "uvloop"],
+        default=None,
+        help="event loop implementation (default: uvloop, if installed)",
+    )
+    parser.add_argument(
+        "--http",
+        choices=["auto", "h11", "httptools"],
+        default=None,
+        help="http implementation (default: httptools, if installed)",
+    )
+    parser.add_argument(
+        "--graceful-shutdown-timeout",
+        default=None,
+        type=float,
+        help="number of seconds to wait for running requests on shutdown",
+    )
+    parser.add_argument(
+        "--reload",
+        action="store_const",
+        const=True,
+        default=None,
+        help="restart the server when the code changes (for development only)",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_const",
+        const=True,
+        default=None,
+        help="serve prometheus metrics on /metrics (requires prometheus_client)",
+    )
+    parser.add_argument("--log-level", default=None, help="verbosity of the server")
+
+
+def to_env(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, (list, dict, set)):
+        return json.dumps(list(value) if isinstance(value, set) else value)
+
+    return str(value)
+
+
+def export(options):
+    """export options to the environment, using the names of the settings
+
+    Options that are ``None`` are not exported, such that the environment or the
+    defaults of the settings apply.
+    """
+    for name, value in options.items():
+        if value is None:
+            continue
+
+        os.environ[f"{env_prefix}{name.upper()}"] = to_env(value)
+
+
+def run(factory, settings):
+    """run the app constructed by ``factory`` using uvicorn
+
+    Parameters
+    ----------
+    factory : str
+        Import string of the app factory.
+    settings : ServerSettings
+        The settings of the server. They have to be in the environment as well,
+        since each worker constructs its own app.
+    """
+    import uvicorn
+
+    workers = settings.workers or os.cpu_count() or 1
+    if not os.environ.get(f"{env_prefix}TOKEN_SECRET"):
+        # pagination tokens must be accepted by every worker, and across reloads
+        os.environ[f"{env_prefix}TOKEN_SECRET"] = secrets.token_hex(32)
+
+    uvicorn.run(
+        factory,
+        factory=True,
+        host=settings.app_host,
+        port=settings.app_port,
+        workers=workers if not settings.reload else None,
+        reload=settings.reload,
+        loop=settings.loop,
+        http=settings.http,
+        log_level=settings.log_level,
+        timeout_graceful_shutdown=settings.graceful_shutdown_timeout,
+    )
@@ -0,0 +1,34 @@
+from typing import Literal, Optional
+
+from stac_fastapi.types import config
+
+from . import serve
+
+
+class ServerSettings(config.ApiSettings):
+    """Settings shared by all apis.
+
+    Read from ``OPENSEARX_*`` environment variables, for example
+    ``OPENSEARX_APP_PORT`` or ``OPENSEARX_WORKERS``.
+    """
+
+    app_host: str = "127.0.0.1"
+    app_port: int = 9588
+    reload: bool = False
+
+    workers: int = 1
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    graceful_shutdown_timeout: Optional[float] = 30
+    log_level: str = "info"
+
+    collection_cache_ttl: int = 300
+    stream_responses: bool = False
+    prefetch_depth: int = 0
+    prefetch_ttl: float = 30
+    coalesce_requests: bool = True
+    json_backend: Optional[str] = None
+    metrics: bool = False
+
+    class Config:
+        env_prefix = serve.env_prefix
@@ -0,0 +1,44 @@
+import asyncio
+
+import attrs
+
+
+def retrieve_exception(task):
+    # the exception is raised in the waiters, if there are any left
+    if not task.cancelled():
+        task.exception()
+
+
+@attrs.define
+class SingleFlight:
+    """Coalesce identical concurrent calls.
+
+    While a call for a key is in flight, other calls for the same key wait for its
+    result instead of calling again. Results are shared between all callers, so they
+    must not be modified.
+
+    The call runs in its own task, such that cancelling one of the callers does not
+    affect the others.
+    """
+
+    inflight = attrs.field(factory=dict, init=False)
+
+    # number of calls that were made
+    calls = attrs.field(default=0, init=False)
+    # number of calls that were avoided by waiting for an identical one
+    saved = attrs.field(default=0, init=False)
+
+    async def do(self, key, call):
+        """call ``call`` without arguments, unless a call for ``key`` is in flight"""
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(call())
+            task.add_done_callback(retrieve_exception)
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+
+            self.inflight[key] = task
+            self.calls += 1
+        else:
+            self.saved += 1
+
+        return await asyncio.shield(task)
@@ -0,0 +1,98 @@
+import time
+
+from starlette.responses import Response, StreamingResponse
+
+from . import timing
+from .serializers import dumps
+
+media_type = "application/geo+json"
+
+# number of bytes to accumulate before sending a chunk
+chunk_size = 64 * 1024
+
+
+def encode_item_collection(features, links, fields, timings=None):
+    """encode a item collection as json, one feature at a time
+
+    The envelope is written first, then the features in the order they are produced
+    by ``features``, and finally the links and any additional fields.
+
+    The time spent producing and encoding the features is recorded in ``timings``, if
+    given. The context of the request is not available while the response is sent,
+    so the timings have to be passed explicitly.
+    """
+    if timings is None:
+        timings = timing.Timings()
+
+    buffer = bytearray(b'{"type":"FeatureCollection","features":[')
+
+    features = iter(features)
+    index = 0
+    while True:
+        start = time.perf_counter()
+        feature = next(features, None)
+        encode_start = time.perf_counter()
+        timings.add("translate", encode_start - start)
+        if feature is None:
+            break
+
+        if index != 0:
+            buffer += b","
+        buffer += dumps(feature)
+        index += 1
+        timings.add("serialize", time.perf_counter() - encode_start)
+
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    buffer += b'],"links":'
+    buffer += dumps(links)
+    for name, value in fields.items():
+        buffer += b"," + dumps(name) + b":" + dumps(value)
+    buffer += b"}"
+
+    yield bytes(buffer)
+
+
+def item_collection(features, links, *, stream=False, **fields):
+    """construct a item collection
+
+    Parameters
+    ----------
+    features : iterable of dict
+        The features of the item collection. Can be lazy.
+    links : list of dict
+        The links of the item collection.
+    stream : bool, default: False
+        If true, return a chunked response that encodes features while ``features``
+        is consumed. Otherwise, materialize the features and encode them at once.
+    **fields
+        Additional top-level fields.
+
+    Returns
+    -------
+    item_collection : Response or StreamingResponse
+    """
+    if stream:
+        return StreamingResponse(
+            encode_item_collection(
+                features, links, fields, timings=timing.current_timings()
+            ),
+            media_type=media_type,
+        )
+
+    with timing.stage("translate"):
+        features = list(features)
+
+    with timing.stage("serialize"):
+        content = dumps(
+            {
+                "type": "FeatureCollection",
+                "features": features,
+                "links": links,
+                **fields,
+            }
+        )
+
+    return Response(content, media_type=media_type)
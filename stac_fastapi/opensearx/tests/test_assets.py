@@ -0,0 +1,64 @@
+import pytest
+
+from stac_fastapi.opensearx.elasticsearch import assets
+
+filepatterns = {
+    "collection": [
+        {
+            "condition": {"contains": "_A_"},
+            "links": [
+                {"name": "ftp", "pattern": "ftp://a/{scene.year}/{scene.filename}"},
+            ],
+        },
+        {
+            "condition": {"contains": "_B_"},
+            "links": [
+                {
+                    "name": "https",
+                    "pattern": "https://b/{scene.day_of_year}/{scene.filename}",
+                    "title": "b",
+                },
+            ],
+        },
+    ],
+}
+
+
+def test_compile_pattern():
+    assert (
+        assets.compile_pattern("/{scene.year}/{{x}}/{scene.filename}")
+        == "/{year}/{{x}}/{filename}"
+    )
+
+
+@pytest.mark.parametrize(
+    "pattern", ["{scene.month}", "{year}", "{scene.filename.upper}"]
+)
+def test_compile_pattern_invalid(pattern):
+    with pytest.raises(ValueError):
+        assets.compile_pattern(pattern)
+
+
+def test_compile_filepatterns():
+    compiled = assets.compile_filepatterns(filepatterns)["collection"]
+
+    scene_a = {"filename": "x_A_y.nc", "year": "2020", "day_of_year": "001"}
+    scene_b = {"filename": "x_B_y.nc", "year": "2020", "day_of_year": "001"}
+
+    assert compiled.links(scene_b) == [
+        {"name": "https", "title": "b", "href": "https://b/001/x_B_y.nc"}
+    ]
+    assert compiled.assets([scene_a, scene_b]) == [
+        {"ftp": {"href": "ftp://a/2020/x_A_y.nc"}},
+        {"https": {"href": "https://b/001/x_B_y.nc"}},
+    ]
+
+    with pytest.raises(ValueError, match="exactly once"):
+        compiled.links({"filename": "x_C_y.nc", "year": "2020", "day_of_year": "001"})
+
+
+def test_compile_filepatterns_invalid():
+    invalid = {"collection": [{"condition": {"startswith": "x"}, "links": []}]}
+
+    with pytest.raises(ValueError, match="collection"):
+        assets.compile_filepatterns(invalid)
@@ -0,0 +1,97 @@
+import pytest
+from stac_fastapi.types import errors
+
+from stac_fastapi.opensearx.webapi import atom
+
+feed = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"
+      xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:georss="http://www.georss.org/georss"
+      xmlns:gml="http://www.opengis.net/gml">
+  <title>granules</title>
+  <opensearch:totalResults>42</opensearch:totalResults>
+  <entry>
+    <title>granule-1</title>
+    <id>https://opensearch.example.com/granules.atom?uid=granule-1.nc</id>
+    <updated>2020-01-01T00:00:00Z/2020-01-01T00:10:00Z</updated>
+    <link rel="enclosure" href="ftp://example.com/granule-1.nc"/>
+    <link href="https://example.com/granule-1.nc"/>
+    <georss:polygon>10 20 10 30 15 30 15 20 10 20</georss:polygon>
+  </entry>
+  <entry>
+    <title>granule-2</title>
+    <id>https://opensearch.example.com/granules.atom?uid=granule-2.nc</id>
+    <updated>2020-01-01T00:10:00Z/2020-01-01T00:20:00Z</updated>
+    <georss:where>
+      <gml:Polygon>
+        <gml:exterior>
+          <gml:LinearRing>
+            <gml:posList>10 20 10 30 15 30 15 20 10 20</gml:posList>
+          </gml:LinearRing>
+        </gml:exterior>
+      </gml:Polygon>
+    </georss:where>
+  </entry>
+</feed>
+"""
+
+expected_coordinates = (
+    [(20.0, 10.0), (30.0, 10.0), (30.0, 15.0), (20.0, 15.0), (20.0, 10.0)],
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, len(feed)])
+def test_granule_parser(chunk_size):
+    parser = atom.GranuleParser()
+
+    emitted = []
+    for offset in range(0, len(feed), chunk_size):
+        emitted.extend(parser.feed(feed[offset : offset + chunk_size]))
+    result = parser.close()
+
+    assert result["feed"] == {"opensearch_totalresults": "42"}
+    assert result["entries"] == emitted
+
+    first, second = result["entries"]
+    assert (
+        first["id"] == "https://opensearch.example.com/granules.atom?uid=granule-1.nc"
+    )
+    assert first["updated"] == "2020-01-01T00:00:00Z/2020-01-01T00:10:00Z"
+    assert first["links"] == [
+        {
+            "rel": "enclosure",
+            "type": "text/html",
+            "href": "ftp://example.com/granule-1.nc",
+        },
+        {
+            "rel": "alternate",
+            "type": "text/html",
+            "href": "https://example.com/granule-1.nc",
+        },
+    ]
+    assert first["where"] == {"type": "Polygon", "coordinates": expected_coordinates}
+    assert second["where"] == {"type": "Polygon", "coordinates": expected_coordinates}
+
+
+def test_granule_parser_matches_feedparser():
+    feedparser = pytest.importorskip("feedparser")
+
+    expected = feedparser.parse(feed)
+    actual = atom.parse_granules(feed)
+
+    assert actual["feed"]["opensearch_totalresults"] == (
+        expected["feed"]["opensearch_totalresults"]
+    )
+    for actual_entry, expected_entry in zip(actual["entries"], expected["entries"]):
+        for key in ["id", "updated"]:
+            assert actual_entry[key] == expected_entry[key]
+        assert actual_entry["links"] == expected_entry.get("links", [])
+
+        assert actual_entry["where"]["coordinates"] == (
+            expected_entry["where"]["coordinates"]
+        )
+
+
+def test_granule_parser_invalid():
+    with pytest.raises(errors.StacApiError):
+        atom.parse_granules(b"<feed><entry></feed>")
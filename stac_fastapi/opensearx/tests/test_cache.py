@@ -0,0 +1,136 @@
+import asyncio
+
+from stac_fastapi.opensearx.cache import CollectionCache, LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Backend:
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [{"id": "a", "call": self.calls}, {"id": "b", "call": self.calls}]
+
+
+def test_coalesce_concurrent_misses():
+    backend = Backend(delay=0.01)
+    cache = CollectionCache(fetch=backend.fetch)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("a") for _ in range(10)))
+
+    results = asyncio.run(run())
+
+    assert backend.calls == 1
+    assert all(result == {"id": "a", "call": 1} for result in results)
+
+
+def test_ttl():
+    clock = Clock()
+    backend = Backend()
+    cache = CollectionCache(fetch=backend.fetch, ttl=10, refresh_margin=2, clock=clock)
+
+    async def run():
+        assert [col["id"] for col in await cache.all()] == ["a", "b"]
+        assert await cache.get("c") is None
+
+        clock.now = 5
+        await cache.get("a")
+        assert backend.calls == 1
+
+        # within the refresh margin: serve the cached value, refresh in the background
+        clock.now = 9
+        assert (await cache.get("a"))["call"] == 1
+        await cache.inflight
+        assert backend.calls == 2
+        assert (await cache.get("a"))["call"] == 2
+
+        # expired
+        clock.now = 30
+        assert (await cache.get("a"))["call"] == 3
+
+    asyncio.run(run())
+
+
+def test_disabled():
+    backend = Backend()
+    cache = CollectionCache(fetch=backend.fetch, ttl=0)
+
+    async def run():
+        await cache.get("a")
+        await cache.get("a")
+
+    asyncio.run(run())
+
+    assert backend.calls == 2
+
+
+def test_changed():
+    clock = Clock()
+    backend = Backend()
+    changes = []
+
+    async def changed():
+        changes.append(clock.now)
+        return len(changes) > 1
+
+    cache = CollectionCache(
+        fetch=backend.fetch,
+        ttl=100,
+        refresh_margin=0,
+        changed=changed,
+        check_interval=10,
+        clock=clock,
+    )
+
+    async def run():
+        await cache.get("a")
+
+        clock.now = 5
+        await cache.get("a")
+        assert not changes
+
+        # unchanged: keep the cached collections
+        clock.now = 10
+        await cache.get("a")
+        await cache.checking
+        assert changes == [10] and backend.calls == 1
+
+        # changed: refresh early
+        clock.now = 20
+        await cache.get("a")
+        await cache.checking
+        await cache.inflight
+        assert changes == [10, 20] and backend.calls == 2
+
+        await cache.close()
+
+    asyncio.run(run())
+
+
+def test_lru_cache():
+    clock = Clock()
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    # "b" is the least recently used entry
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    clock.now += 10
+    assert cache.get("a") is None
+    assert len(cache) == 1
@@ -0,0 +1,130 @@
+import asyncio
+import datetime as dt
+
+import pystac
+from stac_fastapi.types.search import BaseSearchPostRequest
+
+from stac_fastapi.opensearx.cache import CollectionCache
+from stac_fastapi.opensearx.elasticsearch.core import ElasticsearchClient
+from stac_fastapi.opensearx.elasticsearch.dialects import Ifremer
+
+
+def collection(id, year):
+    start = dt.datetime(year, 1, 1, tzinfo=dt.timezone.utc)
+    end = dt.datetime(year, 12, 31, tzinfo=dt.timezone.utc)
+
+    return pystac.Collection(
+        id=id,
+        description=id,
+        extent=pystac.Extent(
+            spatial=pystac.SpatialExtent([[-180, -90, 180, 90]]),
+            temporal=pystac.TemporalExtent([[start, end]]),
+        ),
+    )
+
+
+class Dialect:
+    def __init__(self):
+        self.searches = []
+
+    async def collections(self):
+        return [collection("a", 2020), collection("b", 2021), collection("c", 2022)]
+
+    async def search(self, search_request, token, fields=None, excluded=None):
+        self.searches.append((search_request.collections, excluded))
+        return None, [], 0
+
+
+def search(options):
+    async def run():
+        client = ElasticsearchClient(
+            credentials="http://localhost:9200", coalesce_requests=False
+        )
+        dialect = client.client = Dialect()
+        client.collection_cache = CollectionCache(
+            fetch=dialect.collections, key=lambda col: col.id
+        )
+        try:
+            result = await client.search(
+                None, BaseSearchPostRequest(**options), token=None
+            )
+        finally:
+            await client.close()
+
+        return result, dialect.searches
+
+    return asyncio.run(run())
+
+
+def test_search_pruned():
+    result, searches = search({"datetime": "../2021-06-01T00:00:00Z"})
+    assert searches == [(None, ["c"])]
+
+    # indexes created since the collections were cached are still searched
+    _, searches = search({"datetime": "../2019-01-01T00:00:00Z"})
+    assert searches == [(None, ["a", "b", "c"])]
+
+    # all collections may match, including items newer than the cached extents
+    _, searches = search({"datetime": "2030-01-01T00:00:00Z/.."})
+    assert searches == [(None, None)]
+
+    _, searches = search(
+        {"collections": ["a", "c", "unknown"], "datetime": "../2021-01-01T00:00:00Z"}
+    )
+    assert searches == [(["a", "unknown"], None)]
+
+
+def test_search_outside_extents():
+    result, searches = search(
+        {"collections": ["a", "b"], "datetime": "../2019-01-01T00:00:00Z"}
+    )
+
+    assert result == (None, [], 0)
+    assert searches == []
+
+
+class SearchSession:
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+
+        source = {
+            "time_coverage_start": "2020-01-01T00:00:00Z",
+            "time_coverage_end": "2020-01-01T01:00:00Z",
+            "geometry": {"type": "Point", "coordinates": [1.0, 2.0]},
+        }
+        hits = [
+            {"_index": "isi_cersat_naiad_a", "_id": f"g{n}", "_source": source}
+            for n in range(2)
+        ]
+        return {"hits": {"hits": hits}}
+
+
+def test_search_coalesced():
+    session = SearchSession()
+
+    async def run():
+        client = ElasticsearchClient(
+            credentials="http://localhost:9200", collection_cache_ttl=0
+        )
+        client.client = Ifremer(session)
+        request = BaseSearchPostRequest(collections=["a"], limit=10)
+        try:
+            results = await asyncio.gather(
+                *(client.search(None, request, token=None) for _ in range(2))
+            )
+        finally:
+            await client.close()
+
+        return results
+
+    results = asyncio.run(run())
+
+    assert session.calls == 1
+    for _, items, _ in results:
+        # every waiter translates the shared hits lazily
+        assert not isinstance(items, list)
+        assert [item["id"] for item in items] == ["g0", "g1"]
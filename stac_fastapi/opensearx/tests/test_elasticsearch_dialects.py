@@ -0,0 +1,245 @@
+import asyncio
+
+import elasticsearch
+import pytest
+from stac_fastapi.types import errors
+from stac_fastapi.types.search import BaseSearchPostRequest
+
+from stac_fastapi.opensearx.elasticsearch.dialects import (
+    Ifremer,
+    number_matched,
+    parse_track_total_hits,
+)
+from stac_fastapi.opensearx.elasticsearch.pit import PointInTimeManager
+
+
+class Session:
+    def __init__(self, documents):
+        self.documents = documents
+        self.calls = []
+
+    async def get(self, index, id, _source_includes=None):
+        self.calls.append((index, id))
+
+        source = self.documents.get((index, id))
+        if source is None:
+            raise elasticsearch.NotFoundError(404, "not_found", {})
+
+        return {"_index": index, "_id": id, "found": True, "_source": source}
+
+
+def test_item():
+    source = {
+        "time_coverage_start": "2020-01-01T00:00:00Z",
+        "time_coverage_end": "2020-01-01T01:00:00Z",
+        "geometry": {"type": "Point", "coordinates": [1.0, 2.0]},
+    }
+    session = Session({("isi_cersat_naiad_a", "granule-1"): source})
+    dialect = Ifremer(session)
+
+    item = asyncio.run(dialect.item("a", "granule-1"))
+    assert item["id"] == "granule-1"
+    assert item["bbox"] == [1.0, 2.0, 1.0, 2.0]
+    assert session.calls == [("isi_cersat_naiad_a", "granule-1")]
+
+    with pytest.raises(errors.NotFoundError):
+        asyncio.run(dialect.item("a", "missing"))
+
+
+def hit(index, id, day):
+    start = f"2020-01-{day:02d}T00:00:00Z"
+    return {
+        "_index": index,
+        "_id": id,
+        "_source": {
+            "time_coverage_start": start,
+            "time_coverage_end": start,
+            "geometry": {"type": "Point", "coordinates": [0.0, 0.0]},
+        },
+        "sort": [start, start, id],
+    }
+
+
+class SearchSession:
+    def __init__(self, hits):
+        self.hits = hits
+        self.searches = []
+        self.opened = []
+        self.closed = []
+
+    async def open_point_in_time(self, index, keep_alive):
+        self.opened.append((index, keep_alive))
+        return {"id": f"pit-{len(self.opened)}"}
+
+    async def close_point_in_time(self, body):
+        self.closed.append(body["id"])
+
+    async def search(self, *, size, search_after=None, pit=None, **kwargs):
+        self.searches.append({"pit": pit, "search_after": search_after, **kwargs})
+
+        start = 0
+        if search_after is not None:
+            ids = [hit["_id"] for hit in self.hits]
+            start = ids.index(search_after[-1]) + 1
+
+        result = {"hits": {"hits": self.hits[start : start + size]}}
+        if pit is not None:
+            result["pit_id"] = pit["id"]
+
+        return result
+
+
+def test_search_point_in_time():
+    index = "isi_cersat_naiad_a"
+    session = SearchSession([hit(index, f"g{day}", day) for day in range(1, 4)])
+    pit = PointInTimeManager(session, keep_alive=30)
+    dialect = Ifremer(session, pit=pit)
+    request = BaseSearchPostRequest(collections=["a"], limit=2)
+
+    async def run():
+        token, items, _ = await dialect.search(request, token=None)
+        first = [item["id"] for item in items]
+
+        new_token, items, _ = await dialect.search(request, token=token)
+        second = [item["id"] for item in items]
+
+        # the last page can be requested again
+        _, items, _ = await dialect.search(request, token=token)
+        again = [item["id"] for item in items]
+
+        return token, first, new_token, second, again
+
+    token, first, new_token, second, again = asyncio.run(run())
+
+    assert first == ["g1", "g2"] and second == again == ["g3"]
+    assert dialect.tokens.decode(token) == (
+        ["2020-01-02T00:00:00Z"] * 2 + ["g2"],
+        "pit-1",
+    )
+    assert new_token is None
+
+    assert session.opened == [([index], "30s")]
+    assert all(
+        s["pit"] == {"id": "pit-1", "keep_alive": "30s"} for s in session.searches
+    )
+    assert all("index" not in s for s in session.searches)
+    # the point in time is left to expire
+    assert session.closed == []
+
+
+def test_search_point_in_time_single_page():
+    session = SearchSession([hit("isi_cersat_naiad_a", "g1", 1)])
+    dialect = Ifremer(session, pit=PointInTimeManager(session, keep_alive=30))
+    request = BaseSearchPostRequest(collections=["a"], limit=2)
+
+    token, _, _ = asyncio.run(dialect.search(request, token=None))
+
+    # no token refers to the point in time, so it is closed right away
+    assert token is None
+    assert session.closed == ["pit-1"]
+
+
+@pytest.mark.parametrize(
+    ["value", "expected"],
+    [("off", False), ("exact", True), ("500", 500), (False, False), (100, 100)],
+)
+def test_parse_track_total_hits(value, expected):
+    policy = parse_track_total_hits(value)
+
+    assert policy == expected and type(policy) is type(expected)
+
+
+@pytest.mark.parametrize("value", ["all", "0", -1])
+def test_parse_track_total_hits_invalid(value):
+    with pytest.raises(ValueError):
+        parse_track_total_hits(value)
+
+
+@pytest.mark.parametrize(
+    ["hits", "expected"],
+    [
+        ({"total": {"value": 12, "relation": "eq"}}, 12),
+        ({"total": {"value": 10000, "relation": "gte"}}, None),
+        ({}, None),
+    ],
+)
+def test_number_matched(hits, expected):
+    assert number_matched(hits) == expected
+
+
+class CollectionsSession:
+    def __init__(self, aggregations=None):
+        self.aggregations = aggregations
+        self.searches = []
+        self.cat = self
+        self.count = "1"
+
+    async def indices(self, index, format="json"):
+        self.pattern = index
+        return [
+            {"index": "isi_cersat_naiad_a", "docs.count": self.count},
+            {"index": "isi_cersat_naiad_b", "docs.count": "0"},
+        ]
+
+    async def search(self, **kwargs):
+        self.searches.append(kwargs)
+        if self.aggregations is None:
+            raise elasticsearch.TransportError(500, "error", {})
+
+        return {"hits": {"hits": []}, "aggregations": self.aggregations}
+
+
+def test_collections_extents():
+    bucket = {
+        "key": "isi_cersat_naiad_a",
+        "start": {"value": 1577836800000.0},
+        "end": {"value": 1577923200000.0},
+        "bounds": {
+            "bounds": {
+                "top_left": {"lat": 10.0, "lon": -20.0},
+                "bottom_right": {"lat": -5.0, "lon": 30.0},
+            }
+        },
+    }
+    session = CollectionsSession({"collections": {"buckets": [bucket]}})
+    dialect = Ifremer(session)
+
+    collections = {col.id: col for col in asyncio.run(dialect.collections())}
+
+    [search] = session.searches
+    assert session.pattern == search["index"] == "isi_cersat_naiad_*"
+    assert search["size"] == 0
+    assert search["aggs"]["collections"]["terms"]["size"] == 2
+
+    extent = collections["a"].extent.to_dict()
+    assert extent["spatial"]["bbox"] == [[-20.0, -5.0, 30.0, 10.0]]
+    assert extent["temporal"]["interval"] == [
+        ["2020-01-01T00:00:00Z", "2020-01-02T00:00:00Z"]
+    ]
+
+    # indexes without items
+    extent = collections["b"].extent.to_dict()
+    assert extent["spatial"]["bbox"] == [[-180.0, -90.0, 180.0, 90.0]]
+    assert extent["temporal"]["interval"] == [[None, None]]
+
+    # the extents are outdated once documents are added
+    assert not asyncio.run(dialect.changed())
+    session.count = "2"
+    assert asyncio.run(dialect.changed())
+
+
+def test_collections_extents_failed():
+    dialect = Ifremer(CollectionsSession())
+
+    collections = asyncio.run(dialect.collections())
+
+    assert [col.id for col in collections] == ["a", "b"]
+    assert collections[0].extent.temporal.intervals == [[None, None]]
+
+
+def test_empty_filepatterns():
+    dialect = Ifremer(None, filepatterns={"a": []})
+
+    [item] = dialect.hits_to_items([hit("isi_cersat_naiad_a", "g1", 1)])
+
+    assert item["assets"] == {}
@@ -0,0 +1,56 @@
+import datetime as dt
+
+import pystac
+import pytest
+from stac_fastapi.types.search import BaseSearchPostRequest
+
+from stac_fastapi.opensearx.elasticsearch import extents
+
+extent = pystac.Extent(
+    spatial=pystac.SpatialExtent([[0.0, 0.0, 10.0, 10.0]]),
+    temporal=pystac.TemporalExtent(
+        [
+            [
+                dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc),
+                dt.datetime(2020, 2, 1, tzinfo=dt.timezone.utc),
+            ]
+        ]
+    ),
+)
+
+
+@pytest.mark.parametrize(
+    ["options", "expected"],
+    (
+        ({}, True),
+        ({"datetime": "2020-01-15T00:00:00Z"}, True),
+        # newer items may have been ingested since the extent was computed
+        ({"datetime": "2020-02-02T00:00:00Z/.."}, True),
+        ({"datetime": "../2019-12-31T00:00:00Z"}, False),
+        ({"datetime": "2019-01-01T00:00:00Z/2020-01-02T00:00:00Z"}, True),
+        ({"bbox": [5, 5, 20, 20]}, True),
+        ({"bbox": [11, 0, 20, 10]}, False),
+        ({"bbox": [-10, -10, -1, -1]}, False),
+        (
+            {
+                "intersects": {
+                    "type": "Point",
+                    "coordinates": [20, 20],
+                }
+            },
+            False,
+        ),
+    ),
+)
+def test_overlaps(options, expected):
+    search_request = BaseSearchPostRequest(**options)
+    bounds = extents.search_bounds(search_request)
+
+    assert extents.overlaps(extent, *bounds) is expected
+
+
+def test_overlaps_open_extent():
+    search_request = BaseSearchPostRequest(datetime="2020-02-02T00:00:00Z/..")
+    bounds = extents.search_bounds(search_request)
+
+    assert extents.overlaps(extents.default_extent(), *bounds)
@@ -0,0 +1,143 @@
+import pytest
+from stac_fastapi.extensions.core.fields.request import PostFieldsExtension
+from stac_fastapi.types.search import BaseSearchPostRequest
+
+from stac_fastapi.opensearx.elasticsearch.dialects import Ifremer
+from stac_fastapi.opensearx.elasticsearch.query import Projection, split_datetime
+
+item = {
+    "type": "Feature",
+    "id": "granule-1",
+    "geometry": {"type": "Point", "coordinates": [0, 0]},
+    "bbox": [0, 0, 0, 0],
+    "properties": {"start_datetime": "a", "end_datetime": "b", "datetime": None},
+    "assets": {"ftp": {"href": "ftp://example.com/granule-1.nc"}},
+}
+
+
+@pytest.mark.parametrize(
+    ["datetime", "expected"],
+    [
+        (None, (None, None)),
+        ("2020-01-01T00:00:00Z", ("2020-01-01T00:00:00Z", "2020-01-01T00:00:00Z")),
+        ("../2020-01-01T00:00:00Z", (None, "2020-01-01T00:00:00Z")),
+        ("2020-01-01T00:00:00Z/..", ("2020-01-01T00:00:00Z", None)),
+    ],
+)
+def test_split_datetime(datetime, expected):
+    assert split_datetime(datetime) == expected
+
+
+@pytest.mark.parametrize(
+    ["include", "exclude", "expected"],
+    [
+        (
+            {"properties.start_datetime"},
+            set(),
+            {
+                "type": "Feature",
+                "id": "granule-1",
+                "properties": {"start_datetime": "a"},
+            },
+        ),
+        (
+            set(),
+            {"geometry", "assets", "properties.datetime"},
+            {
+                "type": "Feature",
+                "id": "granule-1",
+                "bbox": [0, 0, 0, 0],
+                "properties": {"start_datetime": "a", "end_datetime": "b"},
+            },
+        ),
+        (
+            {"assets", "properties"},
+            {"assets", "id"},
+            {"type": "Feature", "id": "granule-1", "properties": item["properties"]},
+        ),
+    ],
+)
+def test_projection(include, exclude, expected):
+    projection = Projection.from_fields(
+        PostFieldsExtension(include=include, exclude=exclude)
+    )
+
+    assert projection(item) == expected
+    # the original item is left untouched
+    assert set(item["properties"]) == {"start_datetime", "end_datetime", "datetime"}
+
+
+def test_build_query():
+    dialect = Ifremer(session=None)
+    request = BaseSearchPostRequest(
+        collections=["a"],
+        ids=["granule-1"],
+        bbox=[0, 0, 1, 1],
+        datetime="2020-01-01T00:00:00Z/..",
+    )
+
+    query = dialect.queries.build(request)
+
+    assert query.indexes == ["isi_cersat_naiad_a"]
+    assert query.query["bool"]["filter"] == [
+        {"ids": {"values": ["granule-1"]}},
+        {"range": {"time_coverage_start": {"gte": "2020-01-01T00:00:00Z"}}},
+        dialect.bbox_clause([0, 0, 1, 1]),
+    ]
+    assert query.source == [
+        "geometry",
+        "granule",
+        "time_coverage_end",
+        "time_coverage_start",
+    ]
+    assert query.projection is None
+
+
+def test_build_query_cached():
+    dialect = Ifremer(session=None)
+    fields = PostFieldsExtension(include={"id", "geometry"})
+
+    first = dialect.queries.build(
+        BaseSearchPostRequest(collections=["a"], datetime="2020-01-01T00:00:00Z"),
+        fields=fields,
+    )
+    second = dialect.queries.build(
+        BaseSearchPostRequest(collections=["a"], datetime="2021-01-01T00:00:00Z"),
+        fields=fields,
+    )
+
+    assert len(dialect.queries.cache) == 1
+    assert first.source == second.source == ["geometry"]
+    assert first.parts == {"id", "type", "geometry"}
+    assert second.query["bool"]["filter"][0] == {
+        "range": {"time_coverage_start": {"gte": "2021-01-01T00:00:00Z"}}
+    }
+
+
+def test_build_query_all():
+    query = Ifremer(session=None).queries.build(BaseSearchPostRequest())
+
+    assert query.indexes == "isi_cersat_naiad_*"
+    assert query.query is None
+
+
+def test_build_query_excluded():
+    dialect = Ifremer(session=None)
+    request = BaseSearchPostRequest(datetime="2020-01-01T00:00:00Z/..")
+
+    query = dialect.queries.build(request, excluded=["a", "b"])
+    assert query.indexes == "isi_cersat_naiad_*"
+    assert query.query["bool"]["filter"][-1] == {
+        "bool": {
+            "must_not": [
+                {"terms": {"_index": ["isi_cersat_naiad_a", "isi_cersat_naiad_b"]}}
+            ]
+        }
+    }
+
+    # explicitly requested collections are not restricted further
+    query = dialect.queries.build(
+        BaseSearchPostRequest(collections=["a"]), excluded=["b"]
+    )
+    assert query.indexes == ["isi_cersat_naiad_a"]
+    assert query.query is None
@@ -0,0 +1,65 @@
+import pytest
+
+from stac_fastapi.opensearx import geometry
+
+square = [[0, 0], [2, 0], [2, 1], [0, 1], [0, 0]]
+
+
+@pytest.mark.parametrize(
+    ["geom", "expected"],
+    (
+        pytest.param(
+            {"type": "Point", "coordinates": [1, 2]}, [1, 2, 1, 2], id="point"
+        ),
+        pytest.param(
+            {"type": "Polygon", "coordinates": [square]}, [0, 0, 2, 1], id="polygon"
+        ),
+        pytest.param(
+            {
+                "type": "MultiPolygon",
+                "coordinates": [
+                    [square],
+                    [[[5, 5, 1], [6, 5, 1], [6, 7, 1], [5, 5, 1]]],
+                ],
+            },
+            [0, 0, 6, 7],
+            id="multipolygon",
+        ),
+        pytest.param(
+            {"type": "envelope", "coordinates": [[-10, 20], [10, -20]]},
+            [-10, -20, 10, 20],
+            id="envelope",
+        ),
+        pytest.param(
+            {
+                "type": "Polygon",
+                "coordinates": [[[170, 0], [-170, 0], [-170, 5], [170, 5], [170, 0]]],
+            },
+            [170, 0, -170, 5],
+            id="antimeridian",
+        ),
+        pytest.param(
+            {
+                "type": "Polygon",
+                "coordinates": [
+                    [[-180, -90], [180, -90], [180, 90], [-180, 90], [-180, -90]]
+                ],
+            },
+            [-180, -90, 180, 90],
+            id="global",
+        ),
+        pytest.param(None, None, id="missing"),
+    ),
+)
+def test_bbox(geom, expected):
+    assert geometry.bbox(geom) == expected
+
+
+def test_bboxes():
+    geometries = [
+        {"type": "Polygon", "coordinates": [square]},
+        None,
+        {"type": "Point", "coordinates": [-1, -2]},
+    ]
+
+    assert geometry.bboxes(geometries) == [[0, 0, 2, 1], None, [-1, -2, -1, -2]]
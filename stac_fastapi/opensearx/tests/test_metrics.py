@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from starlette.responses import PlainTextResponse
+
+from stac_fastapi.opensearx import timing
+
+pytest.importorskip("prometheus_client")
+
+
+def stats():
+    return {
+        "pool": {"limit": 100, "in_use": 2},
+        "caches": {"items": {"hits": 3, "misses": 1}},
+        "single_flight": {"calls": 5, "saved": 2},
+    }
+
+
+async def app(scope, receive, send):
+    timing.label(collections=["a"])
+    timing.record("upstream", 0.5)
+
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def test_metrics():
+    from stac_fastapi.opensearx.metrics import Metrics
+
+    metrics = Metrics(backend="webapi", stats=stats)
+    scope = {"type": "http", "method": "GET", "path": "/search", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    asyncio.run(timing.TimingMiddleware(app, metrics=metrics)(scope, receive, send))
+
+    sample = metrics.registry.get_sample_value
+    assert (
+        sample(
+            "opensearx_stage_duration_seconds_count",
+            {"backend": "webapi", "stage": "upstream", "collection": "a"},
+        )
+        == 1
+    )
+    assert sample("opensearx_requests_in_flight", {"backend": "webapi"}) == 0
+    assert sample("opensearx_pool", {"backend": "webapi", "stat": "in_use"}) == 2
+    assert (
+        sample("opensearx_cache_hits_total", {"backend": "webapi", "cache": "items"})
+        == 3
+    )
+    assert sample("opensearx_upstream_calls_saved_total", {"backend": "webapi"}) == 2
+
+
+def test_collection_label():
+    from stac_fastapi.opensearx.metrics import Metrics
+
+    metrics = Metrics(backend="webapi", max_collections=1)
+
+    assert metrics.collection_label(None) == "all"
+    assert metrics.collection_label(["a", "b"]) == "multiple"
+    assert metrics.collection_label(["a"]) == "a"
+    assert metrics.collection_label(["b"]) == "other"
@@ -0,0 +1,190 @@
+import asyncio
+
+from stac_fastapi.types.search import BaseSearchPostRequest
+from starlette.requests import Request
+
+from stac_fastapi.opensearx.prefetch import Prefetcher, client_id
+from stac_fastapi.opensearx.webapi.core import OpensearxApiClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Pages:
+    """pages of a search, each pointing to the next one"""
+
+    def __init__(self, n_pages):
+        self.n_pages = n_pages
+        self.fetched = []
+
+    def step(self, page):
+        async def fetch():
+            self.fetched.append(page)
+            await asyncio.sleep(0)
+            return page
+
+        return page, fetch
+
+    def follow(self, page):
+        if page >= self.n_pages:
+            return None
+
+        return self.step(page + 1)
+
+
+async def walk(prefetcher, pages, client="client", n_pages=None):
+    served = []
+    for page in range(1, (n_pages or pages.n_pages) + 1):
+        served.append(await prefetcher.page(client, *pages.step(page), pages.follow))
+        # give the read-ahead a chance to run
+        await asyncio.sleep(0.01)
+
+    return served
+
+
+def test_read_ahead():
+    prefetcher = Prefetcher(max_depth=2)
+    pages = Pages(5)
+
+    async def run():
+        served = await walk(prefetcher, pages)
+        await prefetcher.close()
+
+        return served
+
+    assert asyncio.run(run()) == [1, 2, 3, 4, 5]
+    # every page is only fetched once
+    assert sorted(pages.fetched) == [1, 2, 3, 4, 5]
+
+
+def test_adaptive_depth():
+    clock = Clock()
+    prefetcher = Prefetcher(max_depth=3, ttl=10, clock=clock)
+    pages = Pages(10)
+
+    async def run():
+        await walk(prefetcher, pages, n_pages=3)
+        depth = prefetcher.clients["client"].depth
+        buffered = len(prefetcher.clients["client"].buffer)
+
+        # the client stops paging: the buffered pages are dropped
+        clock.now = 5
+        await prefetcher.page("client", *pages.step(1), lambda page: None)
+        clock.now = 10
+        await prefetcher.page("client", *pages.step(1), lambda page: None)
+        dropped = prefetcher.clients["client"].depth
+
+        # new walks are still read ahead
+        await prefetcher.page("client", *pages.step(5), pages.follow)
+        await asyncio.sleep(0.01)
+        resumed = list(prefetcher.clients["client"].buffer)
+
+        # idle clients are forgotten
+        clock.now = 20
+        await prefetcher.page("other", *pages.step(1), lambda page: None)
+        forgotten = "client" not in prefetcher.clients
+
+        await prefetcher.close()
+
+        return depth, buffered, dropped, resumed, forgotten
+
+    depth, buffered, dropped, resumed, forgotten = asyncio.run(run())
+
+    assert depth == 3 and buffered == 3
+    assert dropped == 1
+    assert resumed == [6]
+    assert forgotten
+
+
+def test_separate_clients():
+    prefetcher = Prefetcher(max_depth=1, max_clients=1)
+    pages = Pages(3)
+
+    async def run():
+        await prefetcher.page("a", *pages.step(1), pages.follow)
+        await prefetcher.page("b", *pages.step(1), pages.follow)
+        await asyncio.sleep(0.01)
+        clients = list(prefetcher.clients)
+
+        await prefetcher.close()
+
+        return clients
+
+    assert asyncio.run(run()) == ["b"]
+
+
+class PagedClient(OpensearxApiClient):
+    async def search(self, search_request, *, page):
+        self.pages.append(page)
+        items = ({"id": f"item-{page}-{i}"} for i in range(search_request.limit))
+
+        return 5, items
+
+
+def make_request(headers=()):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/search",
+        "query_string": b"",
+        "headers": list(headers),
+        "client": ("192.0.2.1", 1234),
+    }
+    return Request(scope)
+
+
+def test_client_id():
+    assert client_id(make_request()) == "192.0.2.1"
+
+    forwarded = [(b"x-forwarded-for", b"198.51.100.7, 192.0.2.1")]
+    assert client_id(make_request(forwarded)) == "198.51.100.7"
+
+
+def test_search_page():
+    client = PagedClient(prefetch_depth=1)
+    client.pages = []
+    search_request = BaseSearchPostRequest(collections=["a"], limit=2)
+
+    async def run():
+        results = []
+        for page in (1, 2, 3):
+            n_results, items = await client.search_page(
+                make_request(), search_request, page=page
+            )
+            results.append((n_results, [item["id"] for item in items]))
+            await asyncio.sleep(0.01)
+
+        await client.close()
+
+        return results
+
+    results = asyncio.run(run())
+
+    assert [ids[0] for _, ids in results] == ["item-1-0", "item-2-0", "item-3-0"]
+    assert client.pages == [1, 2, 3]
+
+
+def test_search_page_separate_walks():
+    client = PagedClient(prefetch_depth=1)
+    client.pages = []
+    abandoned = BaseSearchPostRequest(collections=["a"], limit=2)
+    search_request = BaseSearchPostRequest(collections=["b"], limit=2)
+
+    async def run():
+        # the read-ahead page of an abandoned walk does not block other walks of the
+        # same client
+        await client.search_page(make_request(), abandoned, page=1)
+        await asyncio.sleep(0.01)
+        await client.search_page(make_request(), search_request, page=1)
+        await asyncio.sleep(0.01)
+
+        await client.close()
+
+    asyncio.run(run())
+
+    assert client.pages == [1, 2, 1, 2]
@@ -0,0 +1,167 @@
+import asyncio
+import datetime as dt
+import sqlite3
+
+from stac_fastapi.opensearx.webapi.core import OpensearxApiClient
+from stac_fastapi.opensearx.webapi.response_cache import (
+    CachedResponse,
+    HistoricalTTL,
+    ResponseCache,
+    SqliteStore,
+    cache_key,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key():
+    assert cache_key("/granules.atom", {"b": 1, "a": "x"}) == cache_key(
+        "/granules.atom", {"a": "x", "b": "1"}
+    )
+
+
+def test_store_and_expire():
+    clock = Clock()
+    cache = ResponseCache(maxsize=2, ttl=10, clock=clock)
+    key = cache_key("/granules.atom", {"page": 1})
+
+    async def run():
+        await cache.store_response(key, {"ETag": '"v1"'}, b"body")
+        entry = await cache.get(key)
+        assert entry.body == b"body" and entry.is_fresh(clock())
+
+        clock.now += 10
+        entry = await cache.get(key)
+        assert not entry.is_fresh(clock())
+        assert entry.conditional_headers() == {"If-None-Match": '"v1"'}
+
+        refreshed = await cache.revalidated(key, entry, {})
+        assert refreshed.is_fresh(clock()) and refreshed.etag == '"v1"'
+
+    asyncio.run(run())
+
+
+def test_cache_control():
+    cache = ResponseCache(ttl=10, clock=Clock())
+    key = cache_key("/granules.atom", {})
+
+    async def run():
+        assert not await cache.store_response(key, {"Cache-Control": "no-store"}, b"")
+        assert await cache.get(key) is None
+
+        await cache.store_response(key, {"Cache-Control": "public, max-age=100"}, b"")
+        return await cache.get(key)
+
+    entry = asyncio.run(run())
+    assert entry.expires == 1100
+
+
+def test_historical_ttl():
+    now = dt.datetime(2022, 1, 10, tzinfo=dt.timezone.utc)
+    policy = HistoricalTTL("timeEnd", ttl=3600, clock=lambda: now)
+
+    assert policy("/granules.atom", {"timeEnd": "2022-01-01T00:00:00Z"}) == 3600
+    assert policy("/granules.atom", {"timeEnd": "2022-01-09T12:00:00Z"}) is None
+    assert policy("/granules.atom", {"timeEnd": "2200-01-01T23:59:59Z"}) is None
+    assert policy("/granules.atom", {}) is None
+
+
+def test_sqlite_store(tmp_path):
+    path = tmp_path / "responses.sqlite"
+    key = cache_key("/granules.atom", {"page": 1})
+    entry = CachedResponse(body=b"body", expires=10.0, last_modified="yesterday")
+
+    store = SqliteStore(path, max_entries=1)
+    store.put(key, entry)
+    store.put(cache_key("/granules.atom", {"page": 2}), entry)
+    store.close()
+
+    # the entries survive reopening, and the oldest one was evicted
+    store = SqliteStore(path)
+    assert store.get(key) is None
+    assert store.get(cache_key("/granules.atom", {"page": 2})) == entry
+    store.close()
+
+
+class LockedStore:
+    def get(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    put = get
+
+
+def test_sqlite_store_errors(tmp_path):
+    cache = ResponseCache(store=LockedStore())
+    key = cache_key("/granules.atom", {"page": 1})
+
+    async def run():
+        # failed writes are skipped, but the response is still cached in memory
+        assert await cache.store_response(key, {}, b"body")
+        assert (await cache.get(key)).body == b"body"
+
+        # failed reads are misses
+        cache.memory.clear()
+        assert await cache.get(key) is None
+
+    asyncio.run(run())
+
+    # several workers can share the database
+    store = SqliteStore(tmp_path / "responses.sqlite")
+    assert store.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    store.close()
+
+
+class Response:
+    def __init__(self, status, body, headers):
+        self.status = status
+        self.body = body
+        self.headers = headers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def read(self):
+        return self.body
+
+
+class Session:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, params, headers):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+def test_client_revalidation():
+    clock = Clock()
+    client = OpensearxApiClient(
+        format="json", response_cache=ResponseCache(ttl=10, clock=clock)
+    )
+    client.session = Session(
+        [
+            Response(200, b'{"a": 1}', {"ETag": '"v1"'}),
+            Response(304, b"", {}),
+        ]
+    )
+
+    async def run():
+        first = await client.query_api("/collections.json")
+        cached = await client.query_api("/collections.json")
+        clock.now += 10
+        revalidated = await client.query_api("/collections.json")
+
+        return first, cached, revalidated
+
+    assert asyncio.run(run()) == ({"a": 1},) * 3
+    assert client.session.requests == [{}, {"If-None-Match": '"v1"'}]
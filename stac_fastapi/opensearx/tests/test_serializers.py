@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from stac_fastapi.opensearx import serializers
+
+
+def available_backends():
+    for name in serializers.backends:
+        try:
+            yield serializers.get_backend(name)
+        except ImportError:
+            pass
+
+
+@pytest.mark.parametrize("backend", available_backends(), ids=lambda b: b.name)
+def test_roundtrip(backend):
+    obj = {"type": "Feature", "bbox": [0.5, -1, 2, 3], "properties": {"a": None}}
+
+    encoded = backend.dumps(obj)
+
+    assert isinstance(encoded, bytes)
+    assert b" " not in encoded
+    assert backend.loads(encoded) == obj
+    assert backend.loads(bytearray(encoded)) == obj
+    assert backend.loads(encoded.decode()) == obj
+
+
+def test_numpy_floats():
+    bbox = [np.float64(1.5), np.float64(2.0)]
+
+    assert serializers.loads(serializers.dumps({"bbox": bbox})) == {"bbox": [1.5, 2.0]}
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        serializers.get_backend("yaml")
+
+
+def test_response():
+    response = serializers.JSONResponse({"id": "a", "links": []})
+
+    assert response.body == b'{"id":"a","links":[]}'
+    assert response.media_type == "application/json"
@@ -0,0 +1,89 @@
+import sys
+import types
+
+import uvicorn
+
+from stac_fastapi.opensearx import serve
+from stac_fastapi.opensearx.elasticsearch.settings import Settings as EsSettings
+from stac_fastapi.opensearx.webapi import __main__ as webapi_main
+from stac_fastapi.opensearx.webapi.settings import Settings
+
+
+def test_export(monkeypatch):
+    monkeypatch.setattr(serve.os, "environ", {})
+
+    serve.export(
+        {
+            "url": "https://opensearch.example.com",
+            "app_port": 8000,
+            "stream_responses": True,
+            "compression": False,
+            "prefetch_depth": None,
+        }
+    )
+    assert serve.os.environ == {
+        "OPENSEARX_URL": "https://opensearch.example.com",
+        "OPENSEARX_APP_PORT": "8000",
+        "OPENSEARX_STREAM_RESPONSES": "true",
+        "OPENSEARX_COMPRESSION": "false",
+    }
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("OPENSEARX_URL", "https://opensearch.example.com")
+    monkeypatch.setenv("OPENSEARX_WORKERS", "4")
+    monkeypatch.setenv("OPENSEARX_COMPRESSION", "false")
+
+    settings = Settings()
+
+    assert settings.url == "https://opensearch.example.com"
+    assert settings.workers == 4
+    assert settings.app_port == 9588
+    assert settings.session_config().compression is False
+
+
+def test_database_credentials(monkeypatch):
+    monkeypatch.setenv("OPENSEARX_BACKEND_URL", "https://es.example.com:9200")
+    monkeypatch.setenv("OPENSEARX_BACKEND_USER", "user")
+    monkeypatch.setenv("OPENSEARX_BACKEND_PASSWORD", "password")
+
+    credentials = EsSettings().database_credentials()
+
+    assert credentials["host"] == "es.example.com" and credentials["port"] == 9200
+    assert credentials["http_auth"] == "user:password"
+
+
+def test_main(monkeypatch):
+    monkeypatch.setattr(serve.os, "environ", {})
+    # the arguments are only parsed by main
+    monkeypatch.setattr(sys, "argv", ["opensearx", "--invalid"])
+
+    calls = []
+    monkeypatch.setattr(uvicorn, "run", lambda app, **kwargs: calls.append(kwargs))
+
+    webapi_main.main(["https://opensearch.example.com", "--workers", "2"])
+
+    [options] = calls
+    assert options["factory"] and options["workers"] == 2
+    assert options["port"] == 9588 and not options["reload"]
+    assert serve.os.environ["OPENSEARX_URL"] == "https://opensearch.example.com"
+    # workers have to share the secret of the pagination tokens
+    assert serve.os.environ["OPENSEARX_TOKEN_SECRET"]
+
+
+def test_create_app_without_token_secret(monkeypatch):
+    from stac_fastapi.opensearx.elasticsearch import app
+
+    warnings = []
+    monkeypatch.setattr(app.logger, "warning", warnings.append)
+    monkeypatch.setattr(
+        app, "create_api", lambda **kwargs: types.SimpleNamespace(app=None)
+    )
+    settings = EsSettings(backend_url="https://es.example.com:9200")
+
+    app.create_app(settings)
+    assert "OPENSEARX_TOKEN_SECRET" in warnings[0]
+
+    warnings.clear()
+    app.create_app(settings.copy(update={"token_secret": "secret"}))
+    assert not warnings
@@ -0,0 +1,72 @@
+import asyncio
+
+from stac_fastapi.opensearx.singleflight import SingleFlight
+
+
+class Backend:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    async def call(self):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ValueError("upstream failed")
+
+        return {"call": call}
+
+
+def test_coalesce():
+    flight = SingleFlight()
+    backend = Backend()
+
+    async def run():
+        results = await asyncio.gather(
+            *(flight.do("key", backend.call) for _ in range(5)),
+            flight.do("other", backend.call),
+        )
+        # finished calls are not reused
+        results.append(await flight.do("key", backend.call))
+
+        return results
+
+    results = asyncio.run(run())
+
+    assert backend.calls == 3
+    assert results[:5] == [{"call": 1}] * 5 and results[6] == {"call": 3}
+    assert flight.calls == 3 and flight.saved == 4
+    assert not flight.inflight
+
+
+def test_cancel_waiter():
+    flight = SingleFlight()
+    backend = Backend()
+
+    async def run():
+        first = asyncio.create_task(flight.do("key", backend.call))
+        second = asyncio.create_task(flight.do("key", backend.call))
+        await asyncio.sleep(0)
+
+        first.cancel()
+
+        return await second
+
+    assert asyncio.run(run()) == {"call": 1}
+
+
+def test_errors():
+    flight = SingleFlight()
+    backend = Backend(fail=True)
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.do("key", backend.call) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    assert backend.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
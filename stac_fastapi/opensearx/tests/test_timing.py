@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+
+from starlette.responses import PlainTextResponse
+
+from stac_fastapi.opensearx import log, timing
+
+
+async def app(scope, receive, send):
+    with timing.stage("upstream"):
+        pass
+    timing.record("parse", 0.5)
+    timing.label(collections=["a"])
+
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def get(path, metrics=None):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(timing.TimingMiddleware(app, metrics=metrics)(scope, receive, send))
+
+    return messages
+
+
+def test_stage_outside_request():
+    with timing.stage("upstream"):
+        pass
+
+    assert timing.current_timings() is None
+
+
+def test_timing_middleware(caplog):
+    with caplog.at_level(logging.DEBUG, logger=log.logger.name):
+        messages = get("/search")
+
+    assert messages[0]["status"] == 200
+
+    [record] = [r for r in caplog.records if r.name == log.logger.name]
+    assert record.getMessage() == "GET /search"
+    assert set(record.fields) == {"total", "upstream", "parse"}
+    assert record.fields["parse"] == 0.5
+
+
+def test_timing_middleware_debug_disabled(caplog):
+    with caplog.at_level(logging.INFO, logger=log.logger.name):
+        get("/search")
+
+    assert not [r for r in caplog.records if r.name == log.logger.name]
+
+
+def test_structured_formatter():
+    formatter = log.StructuredFormatter("%(message)s")
+    record = logging.LogRecord(
+        "test", logging.DEBUG, __file__, 1, "GET %s", ("/search",), None
+    )
+    record.fields = {"total": 0.25, "n": 3}
+
+    assert formatter.format(record) == "GET /search total=0.250000 n=3"
+
+
+def test_stage_exclude():
+    timings = timing.Timings()
+    with timings.stage("upstream", exclude=["parse"]):
+        with timings.stage("parse"):
+            time.sleep(0.05)
+
+    assert timings.stages["parse"] >= 0.05
+    assert 0 <= timings.stages["upstream"] < 0.05
+
+
+def test_timed():
+    @timing.timed("links")
+    def links():
+        return []
+
+    timings = timing.Timings()
+    token = timing.current.set(timings)
+    try:
+        assert links() == []
+    finally:
+        timing.current.reset(token)
+
+    assert set(timings.stages) == {"links"}
+
+
+class Metrics:
+    def __init__(self):
+        self.events = []
+
+    def request_started(self, scope):
+        self.events.append(("started", scope["path"]))
+
+    def request_finished(self, scope, status, total, timings):
+        self.events.append(("finished", status, set(timings.stages), timings.labels))
+
+
+def test_timing_middleware_metrics():
+    metrics = Metrics()
+    get("/search", metrics=metrics)
+
+    assert metrics.events == [
+        ("started", "/search"),
+        ("finished", 200, {"upstream", "parse"}, {"collections": ["a"]}),
+    ]
@@ -0,0 +1,56 @@
+import pytest
+from stac_fastapi.types import errors
+
+from stac_fastapi.opensearx.elasticsearch.tokens import TokenCodec
+
+
+@pytest.mark.parametrize(
+    ["search_after", "pit_id"],
+    [
+        ([1577836800000, 1577840400000, "granule-1"], None),
+        ([1577836800000, 1577840400000, "granule-1", 42], "pit-id=="),
+        ([1.5, None, "ü"], None),
+        ([], None),
+    ],
+)
+def test_roundtrip(search_after, pit_id):
+    codec = TokenCodec("secret")
+
+    token = codec.encode(search_after, pit_id=pit_id)
+
+    assert codec.decode(token) == (search_after, pit_id)
+    assert "=" not in token
+
+
+def test_decode_none():
+    assert TokenCodec("secret").decode(None) == (None, None)
+
+
+def test_wrong_secret():
+    token = TokenCodec("secret").encode([1, "a"])
+
+    with pytest.raises(errors.InvalidQueryParameter):
+        TokenCodec("other").decode(token)
+
+
+@pytest.mark.parametrize("token", ["not a token", "", "AAAA", "ä"])
+def test_malformed(token):
+    with pytest.raises(errors.InvalidQueryParameter):
+        TokenCodec("secret").decode(token)
+
+
+def test_tampered():
+    codec = TokenCodec("secret")
+    token = codec.encode([1, "a"])
+    tampered = ("B" if token[0] != "B" else "C") + token[1:]
+
+    with pytest.raises(errors.InvalidQueryParameter):
+        codec.decode(tampered)
+
+
+def test_secret_from_environment(monkeypatch):
+    monkeypatch.setenv("OPENSEARX_TOKEN_SECRET", "from-env")
+
+    token = TokenCodec().encode([1])
+
+    assert TokenCodec("from-env").decode(token) == ([1], None)
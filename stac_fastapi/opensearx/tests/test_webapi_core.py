@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+import pytest
+from stac_fastapi.types import errors
+from stac_fastapi.types.search import BaseSearchPostRequest
+from starlette.requests import Request
+
+from stac_fastapi.opensearx.cache import CollectionCache
+from stac_fastapi.opensearx.webapi.core import OpensearxApiClient
+
+
+def entry(name, day):
+    return {
+        "id": f"https://opensearch.example.com/granules.atom?uid={name}.nc",
+        "updated": f"2020-01-{day:02d}T00:00:00Z/2020-01-{day:02d}T01:00:00Z",
+        "where": {"type": "Point", "coordinates": [0.0, 0.0]},
+        "links": [],
+    }
+
+
+granules = {
+    "granule-1": entry("granule-1", 3),
+    "granule-2": entry("granule-2", 1),
+    "granule-3": entry("granule-3", 2),
+}
+
+
+class FakeClient(OpensearxApiClient):
+    async def query_api(self, path, params={}, parser=None):
+        self.requests.append(params)
+
+        uid = params.get("uid", "").removesuffix(".nc")
+        entries = [granules[uid]] if uid in granules else []
+
+        return {"feed": {"opensearch_totalresults": len(entries)}, "entries": entries}
+
+
+def search(ids, *, page, limit):
+    client = FakeClient()
+    client.requests = []
+    request = BaseSearchPostRequest(collections=["a"], ids=ids, limit=limit)
+
+    n_results, items = asyncio.run(client.search(request, page=page))
+
+    return n_results, [item["id"] for item in items], client.requests
+
+
+def test_search_ids():
+    n_results, ids, requests = search(
+        ["granule-1", "granule-2", "missing", "granule-3", "granule-1"], page=1, limit=2
+    )
+
+    assert n_results == 3
+    assert ids == ["granule-2", "granule-3"]
+    assert sorted(params["uid"] for params in requests) == [
+        "granule-1.nc",
+        "granule-2.nc",
+        "granule-3.nc",
+        "missing.nc",
+    ]
+
+
+def test_search_ids_page():
+    n_results, ids, _ = search(["granule-1", "granule-2", "granule-3"], page=2, limit=2)
+
+    assert n_results == 3
+    assert ids == ["granule-1"]
+
+
+def test_get_item():
+    client = FakeClient()
+    client.requests = []
+
+    item = asyncio.run(client.get_item("granule-1", "a"))
+    assert item["id"] == "granule-1"
+    assert len(client.requests) == 1
+
+    with pytest.raises(errors.NotFoundError):
+        asyncio.run(client.get_item("missing", "a"))
+
+
+def test_get_item_cached():
+    client = FakeClient()
+    client.requests = []
+
+    request = BaseSearchPostRequest(collections=["a"], ids=["granule-2"])
+    _, items = asyncio.run(client.search(request, page=1))
+    assert [item["id"] for item in items] == ["granule-2"]
+
+    item = asyncio.run(client.get_item("granule-2", "a"))
+    assert item["id"] == "granule-2"
+    assert len(client.requests) == 1
+
+
+def make_request(query_string):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "path": "/collections/a/items",
+        "query_string": query_string.encode(),
+        "headers": [],
+    }
+    return Request(scope)
+
+
+def test_item_collection():
+    client = FakeClient()
+    client.requests = []
+
+    response = asyncio.run(
+        client.item_collection("a", limit=2, request=make_request("limit=2&page=1"))
+    )
+    content = json.loads(response.body)
+
+    assert content["type"] == "FeatureCollection"
+    assert content["features"] == []
+    assert client.requests[0]["datasetId"] == "a"
+    assert client.requests[0]["count"] == 2
+
+
+def test_stats():
+    client = FakeClient()
+    client.requests = []
+
+    asyncio.run(client.get_item("granule-1", "a"))
+    asyncio.run(client.get_item("granule-1", "a"))
+
+    stats = client.stats()
+    assert stats["pool"] == {}
+    assert stats["caches"]["items"] == {"hits": 1, "misses": 1}
+    assert stats["single_flight"] == {"calls": 0, "saved": 0}
+
+
+def test_search_all_collections():
+    client = FakeClient()
+    client.requests = []
+
+    async def collections():
+        return [{"id": "a"}, {"id": "b"}]
+
+    client.collection_cache = CollectionCache(fetch=collections)
+
+    request = make_request("limit=2")
+    asyncio.run(client.get_search(limit=2, request=request))
+
+    assert sorted(params["datasetId"] for params in client.requests) == ["a", "b"]
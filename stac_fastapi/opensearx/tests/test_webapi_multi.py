@@ -0,0 +1,39 @@
+import pytest
+from stac_fastapi.types import errors
+
+from stac_fastapi.opensearx.webapi import multi
+
+
+def item(id, start):
+    return {"id": id, "properties": {"start_datetime": start}}
+
+
+def test_merge_by_time():
+    items_by_collection = {
+        "a": [item("a1", "2020-01-01T00:00:00Z"), item("a2", "2020-01-03T00:00:00Z")],
+        "b": [item("b1", "2020-01-02T00:00:00Z"), item("b2", "2020-01-04T00:00:00Z")],
+        "c": [],
+    }
+
+    items, consumed = multi.merge_by_time(items_by_collection, limit=3)
+
+    assert [item["id"] for item in items] == ["a1", "b1", "a2"]
+    assert consumed == {"a": 2, "b": 1, "c": 0}
+
+
+def test_token_roundtrip():
+    offsets = {"a": 10, "b": 3}
+    token = multi.encode_token(offsets)
+
+    assert multi.decode_token(token, ["a", "b", "c"]) == offsets
+    assert multi.decode_token(None, ["a", "b"]) == {"a": 0, "b": 0}
+    assert multi.encode_token({}) is None
+
+
+@pytest.mark.parametrize(
+    "token",
+    ["not a token", multi.encode_token({"x": 1}), multi.encode_token({"a": -1})],
+)
+def test_decode_token_invalid(token):
+    with pytest.raises(errors.InvalidQueryParameter):
+        multi.decode_token(token, ["a", "b"])
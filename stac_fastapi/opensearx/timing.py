@@ -0,0 +1,161 @@
+import contextlib
+import contextvars
+import functools
+import logging
+import time
+
+import attrs
+
+from .log import logger
+
+current = contextvars.ContextVar("opensearx_timings", default=None)
+
+
+@attrs.define
+class Timings:
+    """time spent in the stages of a request, in seconds
+
+    ``labels`` describe the request, for example the searched collections.
+    """
+
+    stages = attrs.field(factory=dict)
+    labels = attrs.field(factory=dict)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, name, exclude=()):
+        """record the time spent in the block
+
+        Time recorded for the stages in ``exclude`` while in the block is not
+        counted, for example to separate decoding from waiting for a response.
+        """
+        start = time.perf_counter()
+        nested = sum(self.stages.get(stage, 0) for stage in exclude)
+        try:
+            yield
+        finally:
+            nested = sum(self.stages.get(stage, 0) for stage in exclude) - nested
+            self.add(name, time.perf_counter() - start - nested)
+
+
+def record(name, seconds):
+    """add ``seconds`` to the stage ``name`` of the current request"""
+    timings = current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextlib.contextmanager
+def stage(name, exclude=()):
+    """record the time spent in the block as ``name`` for the current request
+
+    Does nothing outside of requests. See `Timings.stage` for ``exclude``.
+    """
+    timings = current.get()
+    if timings is None:
+        yield
+        return
+
+    with timings.stage(name, exclude=exclude):
+        yield
+
+
+def timed(name):
+    """record the time spent in the decorated function as the stage ``name``"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def label(**labels):
+    """add labels to the current request"""
+    timings = current.get()
+    if timings is not None:
+        timings.labels.update(labels)
+
+
+def current_timings():
+    """the timings of the current request, or ``None``
+
+    Can be used to record stages from places where the context variable is not
+    available, like iterators consumed in a thread pool.
+    """
+    return current.get()
+
+
+@attrs.define
+class TimingMiddleware:
+    """record the duration of each request and log its stages
+
+    The timings are only logged if debug logging is enabled for this package. If
+    given, ``metrics`` is notified when a request starts and when it finishes (see
+    `metrics.Metrics`).
+    """
+
+    app = attrs.field()
+    metrics = attrs.field(default=None)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = Timings()
+        token = current.set(timings)
+        start = time.perf_counter()
+        status = None
+        finished = False
+
+        def finish():
+            nonlocal finished
+
+            finished = True
+            total = time.perf_counter() - start
+            log_timings(scope, timings, total)
+            if self.metrics is not None:
+                self.metrics.request_finished(scope, status, total, timings)
+
+        async def send_wrapper(message):
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+            await send(message)
+
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                finish()
+
+        if self.metrics is not None:
+            self.metrics.request_started(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not finished and self.metrics is not None:
+                # failed or disconnected before the response was complete
+                self.metrics.request_finished(
+                    scope, status, time.perf_counter() - start, timings
+                )
+            current.reset(token)
+
+
+def log_timings(scope, timings, total):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
+    logger.debug(
+        "%s %s",
+        scope["method"],
+        scope["path"],
+        extra={"fields": {"total": total, **timings.stages}},
+    )
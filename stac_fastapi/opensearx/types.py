@@ -1,10 +1,11 @@
-import itertools
 from typing import Any, Dict, List, Optional
 from urllib.parse import parse_qs, urlsplit
 
 import attrs
 from stac_fastapi.types import stac as stac_types
 
+from . import geometry
+
 stac_version = "1.0.0"
 
 
@@ -69,10 +70,7 @@ class Collections:
 
 
 def geometry_to_bbox(where):
-    polygons = where["coordinates"]
-    lat, lon = zip(*itertools.chain.from_iterable(polygons))
-
-    return min(lon), min(lat), max(lon), max(lat)
+    return geometry.bbox(where)
 
 
 def extract_uid(url):
@@ -83,26 +81,33 @@ def extract_uid(url):
 
 @attrs.define
 class Item:
-    title: str
-    title_detail: dict[str, Any]
     id: str
-    guidislink: bool
-    link: str
     updated: str
-    updated_parsed: Any
     where: dict
 
     links: list[dict[str, str]]
 
-    summary: str
-    summary_detail: dict[str, Any]
+    title: str = ""
+    title_detail: dict[str, Any] = attrs.field(factory=dict)
+    guidislink: bool = False
+    link: str = ""
+    updated_parsed: Any = None
+
+    summary: str = ""
+    summary_detail: dict[str, Any] = attrs.field(factory=dict)
 
     gml_outerboundaryis: Optional[str] = ""
     gml_polygonmember: Optional[str] = ""
     gml_multipolygon: Optional[str] = ""
 
-    def to_stac(self):
-        stac_links = {link.pop("rel"): link for link in self.links}
+    def to_stac(self, bbox=None):
+        if bbox is None:
+            bbox = geometry_to_bbox(self.where)
+
+        stac_links = {
+            link["rel"]: {key: value for key, value in link.items() if key != "rel"}
+            for link in self.links
+        }
         start_datetime, end_datetime = self.updated.split("/")
         id = extract_uid(self.id)
         return stac_types.Item(
@@ -110,7 +115,7 @@ class Item:
             stac_version=stac_version,
             stac_extensions=[],
             geometry=self.where,
-            bbox=geometry_to_bbox(self.where),
+            bbox=bbox,
             id=id,
             assets=stac_links,
             datetime=None,
@@ -1,44 +1,179 @@
 import argparse
+import pathlib
 
-from .app import create_api
+from .. import serializers, serve
 from .core import format_parsers
 from .dialects import dialects
+from .settings import Settings
 
-parser = argparse.ArgumentParser()
-parser.add_argument("url", help="base url of the opensearch api")
+parser = argparse.ArgumentParser(
+    description=(
+        "Serve a stac api for an opensearch api. Options that are not given are read"
+        " from OPENSEARX_* environment variables."
+    )
+)
+parser.add_argument(
+    "url", nargs="?", default=None, help="base url of the opensearch api"
+)
 parser.add_argument(
     "--format",
     choices=sorted(format_parsers),
-    default="atom",
+    default=None,
     help="format of the opensearch responses",
 )
 parser.add_argument(
     "--dialect",
     choices=sorted(dialects),
-    default="ifremer",
+    default=None,
     help="dialect of the opensearch api",
 )
 parser.add_argument(
-    "--host", default="127.0.0.1", help="address of the new stac server"
+    "--collection-cache-ttl",
+    default=None,
+    type=int,
+    help="number of seconds to cache the list of collections for (0 to disable)",
+)
+parser.add_argument(
+    "--stream-responses",
+    action="store_const",
+    const=True,
+    default=None,
+    help="stream search results instead of building the full response in memory",
+)
+parser.add_argument(
+    "--max-concurrency",
+    default=None,
+    type=int,
+    help="maximum number of concurrent requests for multi-collection searches",
+)
+parser.add_argument(
+    "--item-cache-size",
+    default=None,
+    type=int,
+    help="number of recently seen items to keep for item lookups (0 to disable)",
+)
+parser.add_argument(
+    "--item-cache-ttl",
+    default=None,
+    type=int,
+    help="number of seconds to keep recently seen items for",
+)
+parser.add_argument(
+    "--response-cache-size",
+    default=None,
+    type=int,
+    help="number of opensearch responses to cache in memory (0 to disable)",
+)
+parser.add_argument(
+    "--response-cache-ttl",
+    default=None,
+    type=int,
+    help="number of seconds cached opensearch responses are considered fresh",
+)
+parser.add_argument(
+    "--response-cache-path",
+    default=None,
+    type=pathlib.Path,
+    help="path to a sqlite database to persist cached opensearch responses in",
+)
+parser.add_argument(
+    "--historical-cache-ttl",
+    default=None,
+    type=int,
+    help="number of seconds to cache responses for time windows in the past",
+)
+parser.add_argument(
+    "--no-request-coalescing",
+    dest="coalesce_requests",
+    action="store_const",
+    const=False,
+    default=None,
+    help="don't coalesce identical concurrent searches into a single request",
+)
+parser.add_argument(
+    "--prefetch-depth",
+    default=None,
+    type=int,
+    help=(
+        "maximum number of pages to fetch ahead of clients paging through"
+        " searches (0 to disable)"
+    ),
+)
+parser.add_argument(
+    "--prefetch-ttl",
+    default=None,
+    type=float,
+    help="number of seconds to keep pages fetched ahead",
+)
+parser.add_argument(
+    "--pool-limit",
+    default=None,
+    type=int,
+    help="maximum number of connections to the opensearch api (0 for no limit)",
+)
+parser.add_argument(
+    "--pool-limit-per-host",
+    default=None,
+    type=int,
+    help="maximum number of connections per host (0 for no limit)",
+)
+parser.add_argument(
+    "--keepalive-timeout",
+    default=None,
+    type=float,
+    help="number of seconds to keep idle connections open",
 )
 parser.add_argument(
-    "--port", default=9588, type=int, help="port of the new stac server"
+    "--dns-cache-ttl",
+    default=None,
+    type=float,
+    help="number of seconds to cache dns lookups",
 )
-parser.add_argument("--log-level", default="info", help="verbosity of the server")
+parser.add_argument(
+    "--timeout",
+    default=None,
+    type=float,
+    help="total timeout of requests to the opensearch api, in seconds",
+)
+parser.add_argument(
+    "--connect-timeout",
+    default=None,
+    type=float,
+    help="timeout for connecting to the opensearch api, in seconds",
+)
+parser.add_argument(
+    "--read-timeout",
+    default=None,
+    type=float,
+    help="timeout for reading a chunk of a response, in seconds",
+)
+parser.add_argument(
+    "--no-compression",
+    dest="compression",
+    action="store_const",
+    const=False,
+    default=None,
+    help="don't ask the opensearch api for compressed responses",
+)
+parser.add_argument(
+    "--json-backend",
+    choices=sorted(serializers.backends),
+    default=None,
+    help="json implementation to use (default: the fastest one installed)",
+)
+
+serve.add_server_arguments(parser)
+
 
-args = parser.parse_args()
+def main(argv=None):
+    options = vars(parser.parse_args(argv))
+    options["app_host"] = options.pop("host")
+    options["app_port"] = options.pop("port")
+
+    # every worker reads the settings from the environment
+    serve.export(options)
+    serve.run("stac_fastapi.opensearx.webapi.app:create_app", Settings())
 
-api = create_api(args.url, format=args.format, host=args.host, port=args.port)
-# app is used by uvicorn
-app = api.app
 
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(
-        "stac_fastapi.opensearx.webapi.__main__:app",
-        host=args.host,
-        port=args.port,
-        log_level=args.log_level,
-        reload=True,
-    )
+    main()
@@ -2,13 +2,76 @@ from stac_fastapi.api.app import StacApi
 from stac_fastapi.extensions.core import PaginationExtension
 from stac_fastapi.types import config
 
+from .. import log, serializers, timing
+from . import dialects
 from .core import OpensearxApiClient
+from .response_cache import HistoricalTTL, ResponseCache, SqliteStore
+from .session import SessionConfig
+from .settings import Settings
 
 
-def create_api(url, *, dialect="ifremer", format="atom", host="127.0.0.1", port=9588):
+def create_api(
+    url,
+    *,
+    dialect="ifremer",
+    format="atom",
+    host="127.0.0.1",
+    port=9588,
+    collection_cache_ttl=300,
+    stream_responses=False,
+    max_concurrency=8,
+    session_config=None,
+    item_cache_size=1024,
+    item_cache_ttl=300,
+    json_backend=None,
+    response_cache_size=0,
+    response_cache_ttl=60,
+    response_cache_path=None,
+    historical_cache_ttl=24 * 3600,
+    prefetch_depth=0,
+    prefetch_ttl=30,
+    coalesce_requests=True,
+    metrics=False,
+    log_level="info",
+):
     settings = config.ApiSettings(app_host=host, app_port=port)
 
-    client = OpensearxApiClient(url=url, format=format, dialect=dialect)
+    if json_backend is not None:
+        serializers.use(json_backend)
+
+    if response_cache_size > 0 or response_cache_path is not None:
+        response_cache = ResponseCache(
+            maxsize=response_cache_size,
+            ttl=response_cache_ttl,
+            ttl_policy=HistoricalTTL(
+                dialects.time_end_parameters[dialect], ttl=historical_cache_ttl
+            ),
+            store=(
+                SqliteStore(response_cache_path)
+                if response_cache_path is not None
+                else None
+            ),
+        )
+    else:
+        response_cache = None
+
+    client = OpensearxApiClient(
+        url=url,
+        format=format,
+        dialect=dialect,
+        collection_cache_ttl=collection_cache_ttl,
+        stream_responses=stream_responses,
+        max_concurrency=max_concurrency,
+        session_config=(
+            session_config if session_config is not None else SessionConfig()
+        ),
+        item_cache_size=item_cache_size,
+        item_cache_ttl=item_cache_ttl,
+        response_cache=response_cache,
+        prefetch_depth=prefetch_depth,
+        prefetch_ttl=prefetch_ttl,
+        coalesce_requests=coalesce_requests,
+    )
     extensions = [
         PaginationExtension(),
     ]
@@ -18,8 +81,29 @@ def create_api(url, *, dialect="ifremer", format="atom", host="127.0.0.1", port=
         client=client,
         extensions=extensions,
         pagination_extension=PaginationExtension,
+        response_class=serializers.JSONResponse,
     )
 
+    if metrics:
+        from ..metrics import Metrics
+
+        recorder = Metrics(backend="webapi", stats=client.stats)
+        recorder.mount(api.app)
+    else:
+        recorder = None
+
+    api.app.add_middleware(timing.TimingMiddleware, metrics=recorder)
+
+    listener = None
+
+    @api.app.on_event("startup")
+    async def app_startup():
+        """configure logging and create the connection pool of the client"""
+        nonlocal listener
+
+        listener = log.setup_logging(log_level)
+        await client.open()
+
     @api.app.on_event("shutdown")
     async def app_shutdown():
         """shutdown the client to close the session
@@ -28,4 +112,43 @@ def create_api(url, *, dialect="ifremer", format="atom", host="127.0.0.1", port=
         """
         await client.close()
 
+        if listener is not None:
+            listener.stop()
+
     return api
+
+
+def create_app(settings=None):
+    """create the app from settings
+
+    If not given, the settings are read from the environment. Used as the app
+    factory of the server.
+    """
+    if settings is None:
+        settings = Settings()
+
+    api = create_api(
+        settings.url,
+        format=settings.format,
+        dialect=settings.dialect,
+        host=settings.app_host,
+        port=settings.app_port,
+        collection_cache_ttl=settings.collection_cache_ttl,
+        stream_responses=settings.stream_responses,
+        max_concurrency=settings.max_concurrency,
+        session_config=settings.session_config(),
+        item_cache_size=settings.item_cache_size,
+        item_cache_ttl=settings.item_cache_ttl,
+        json_backend=settings.json_backend,
+        response_cache_size=settings.response_cache_size,
+        response_cache_ttl=settings.response_cache_ttl,
+        response_cache_path=settings.response_cache_path,
+        historical_cache_ttl=settings.historical_cache_ttl,
+        prefetch_depth=settings.prefetch_depth,
+        prefetch_ttl=settings.prefetch_ttl,
+        coalesce_requests=settings.coalesce_requests,
+        metrics=settings.metrics,
+        log_level=settings.log_level,
+    )
+
+    return api.app
@@ -1,4 +1,182 @@
+from xml.etree import ElementTree
+
+import attrs
+from stac_fastapi.types import errors
+
+
 def parse(document):
     import feedparser
 
     return feedparser.parse(document)
+
+
+def local_name(tag):
+    return tag.rpartition("}")[2]
+
+
+def parse_coordinates(text, dims=2):
+    # georss and gml coordinates are latitude / longitude pairs, geojson wants
+    # longitude / latitude
+    values = [float(v) for v in text.replace(",", " ").split()]
+    if dims == 3:
+        return list(zip(values[1::3], values[0::3], values[2::3]))
+
+    return list(zip(values[1::2], values[0::2]))
+
+
+def georss_geometry(name, text):
+    coordinates = parse_coordinates(text)
+    if name == "point":
+        return {"type": "Point", "coordinates": coordinates[0]}
+    elif name == "line":
+        return {"type": "LineString", "coordinates": coordinates}
+    elif name == "polygon":
+        return {"type": "Polygon", "coordinates": (coordinates,)}
+    elif name == "box":
+        return {"type": "Box", "coordinates": tuple(coordinates)}
+    else:
+        return None
+
+
+def gml_geometry(elem, dims):
+    geometry_types = {
+        "LinearRing": "Polygon",
+        "LineString": "LineString",
+    }
+
+    pos = elem.find(".//{*}pos")
+    if pos is not None:
+        return {"type": "Point", "coordinates": parse_coordinates(pos.text, dims)[0]}
+
+    for container, type_ in geometry_types.items():
+        poslist = elem.find(f".//{{*}}{container}/{{*}}posList")
+        if poslist is None:
+            continue
+
+        coordinates = parse_coordinates(poslist.text, dims)
+        if type_ == "Polygon":
+            coordinates = (coordinates,)
+
+        return {"type": type_, "coordinates": coordinates}
+
+    return None
+
+
+def entry_geometry(entry):
+    for child in entry:
+        name = local_name(child.tag)
+        if name in ("point", "line", "polygon", "box") and child.text:
+            return georss_geometry(name, child.text)
+        elif name == "where":
+            dims = next(
+                (
+                    int(elem.get("srsDimension"))
+                    for elem in child.iter()
+                    if elem.get("srsDimension") is not None
+                ),
+                2,
+            )
+            return gml_geometry(child, dims)
+
+    return None
+
+
+def parse_entry(entry):
+    parsed = {"links": []}
+    for child in entry:
+        name = local_name(child.tag)
+        if name in ("id", "updated", "title"):
+            parsed[name] = child.text
+        elif name == "link":
+            # same defaults as feedparser
+            link = dict(child.attrib)
+            link.setdefault("rel", "alternate")
+            link.setdefault(
+                "type", "application/atom+xml" if link["rel"] == "self" else "text/html"
+            )
+            parsed["links"].append(link)
+
+    parsed["where"] = entry_geometry(entry)
+
+    return parsed
+
+
+@attrs.define
+class GranuleParser:
+    """Incremental parser for opensearch atom granule feeds.
+
+    Only extracts what is needed to construct STAC items: the id, the time range, the
+    footprint and the links of each entry, plus the total number of results.
+
+    Feed it chunks of the document using `feed`, which returns the entries completed by
+    that chunk, then call `close` to get the full result. The result is structured like
+    the result of `feedparser.parse`.
+    """
+
+    parser = attrs.field(
+        factory=lambda: ElementTree.XMLPullParser(events=("start", "end")),
+        init=False,
+    )
+    root = attrs.field(default=None, init=False)
+    depth = attrs.field(default=0, init=False)
+    feed_info = attrs.field(factory=dict, init=False)
+    entries = attrs.field(factory=list, init=False)
+
+    def _process(self):
+        new_entries = []
+        for event, elem in self.parser.read_events():
+            if event == "start":
+                if self.root is None:
+                    self.root = elem
+                self.depth += 1
+                continue
+
+            self.depth -= 1
+            if self.depth != 1:
+                # only look at direct children of the feed
+                continue
+
+            name = local_name(elem.tag)
+            if name == "entry":
+                new_entries.append(parse_entry(elem))
+                # free the entry's subtree
+                self.root.remove(elem)
+            elif name == "totalResults":
+                self.feed_info["opensearch_totalresults"] = elem.text
+
+        self.entries.extend(new_entries)
+        return new_entries
+
+    def feed(self, data):
+        """feed a chunk of the document to the parser"""
+        try:
+            self.parser.feed(data)
+            return self._process()
+        except ElementTree.ParseError as e:
+            raise errors.StacApiError(
+                f"backend server returned invalid feed: {e}"
+            ) from e
+
+    def close(self):
+        """finish parsing and return the parsed feed"""
+        try:
+            self.parser.close()
+            self._process()
+        except ElementTree.ParseError as e:
+            raise errors.StacApiError(
+                f"backend server returned invalid feed: {e}"
+            ) from e
+
+        if self.root is None or local_name(self.root.tag) != "feed":
+            raise errors.StacApiError("backend server returned invalid feed")
+
+        return {"feed": self.feed_info, "entries": self.entries}
+
+
+def parse_granules(document):
+    if isinstance(document, str):
+        document = document.encode()
+
+    parser = GranuleParser()
+    parser.feed(document)
+    return parser.close()
@@ -1,24 +1,40 @@
 from __future__ import annotations
 
+import asyncio
+import itertools
+import time
 from datetime import datetime
 from typing import List, Optional
 
-import aiohttp
 import attrs
-import rich.console
+from stac_fastapi.types import errors
 from stac_fastapi.types import stac as stac_types
 from stac_fastapi.types.core import AsyncBaseCoreClient, NumType
-from stac_fastapi.types.search import BaseSearchGetRequest, BaseSearchPostRequest, Union
+from stac_fastapi.types.search import BaseSearchPostRequest, Union
 
-from .. import pagination, types
-from . import atom, dialects, json
+from .. import pagination, prefetch, singleflight, streaming, timing, types
+from ..cache import CollectionCache, LRUCache
+from ..log import logger
+from ..pools import connector_stats
+from . import atom, dialects, json, multi
+from .response_cache import cache_key
+from .session import SessionConfig
 
-console = rich.console.Console()
+chunk_size = 64 * 1024
 
 format_parsers = {
     "json": json.parse,
     "atom": atom.parse,
 }
+granule_parsers = {
+    "json": json.GranuleParser,
+    "atom": atom.GranuleParser,
+}
+
+
+def search_key(search_request):
+    """identify a search, independent of the requested page"""
+    return search_request.json(exclude={"page", "token"})
 
 
 @attrs.define
@@ -34,7 +50,37 @@ class OpensearxApiClient(AsyncBaseCoreClient):
     url = attrs.field(default="https://opensearch.ifremer.fr")
     dialect = attrs.field(default="ifremer")
     format = attrs.field(default="atom")
+    collection_cache_ttl = attrs.field(
+        default=300,
+        validator=[attrs.validators.instance_of(int), attrs.validators.ge(0)],
+    )
+    stream_responses = attrs.field(default=False)
+    max_concurrency = attrs.field(
+        default=8,
+        validator=[attrs.validators.instance_of(int), attrs.validators.ge(1)],
+    )
+    session_config = attrs.field(factory=SessionConfig)
+    item_cache_size = attrs.field(
+        default=1024,
+        validator=[attrs.validators.instance_of(int), attrs.validators.ge(0)],
+    )
+    item_cache_ttl = attrs.field(
+        default=300,
+        validator=[attrs.validators.instance_of(int), attrs.validators.gt(0)],
+    )
+    response_cache = attrs.field(default=None)
+    prefetch_depth = attrs.field(
+        default=0,
+        validator=[attrs.validators.instance_of(int), attrs.validators.ge(0)],
+    )
+    prefetch_ttl = attrs.field(default=30, validator=attrs.validators.gt(0))
+    coalesce_requests = attrs.field(default=True)
     session = attrs.field(default=None, init=False)
+    session_lock = attrs.field(factory=asyncio.Lock, init=False)
+    collection_cache = attrs.field(default=None, init=False)
+    item_cache = attrs.field(default=None, init=False)
+    prefetcher = attrs.field(default=None, init=False)
+    single_flight = attrs.field(default=None, init=False)
 
     @format.validator
     def _valid_format(self, attribute, value):
@@ -47,138 +93,505 @@ class OpensearxApiClient(AsyncBaseCoreClient):
     def __attrs_post_init__(self):
         self.url = self.url.format(format=self.format)
         self.parse = format_parsers.get(self.format)
+        self.granule_parser = granule_parsers.get(self.format)
+        self.collection_cache = CollectionCache(
+            fetch=self.fetch_collections,
+            ttl=self.collection_cache_ttl,
+            refresh_margin=self.collection_cache_ttl // 10,
+        )
+        self.item_cache = LRUCache(
+            maxsize=self.item_cache_size, ttl=self.item_cache_ttl
+        )
+        if self.prefetch_depth > 0:
+            self.prefetcher = prefetch.Prefetcher(
+                max_depth=self.prefetch_depth, ttl=self.prefetch_ttl
+            )
+        if self.coalesce_requests:
+            self.single_flight = singleflight.SingleFlight()
+
+    async def open(self):
+        """create the connection pool
+
+        Called on startup of the app, but can also be called lazily.
+        """
+        async with self.session_lock:
+            if self.session is None:
+                self.session = self.session_config.create_session()
+
+        return self.session
 
     async def close(self):
+        await self.collection_cache.close()
+        if self.prefetcher is not None:
+            await self.prefetcher.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
         if self.session is None:
             return
 
         await self.session.close()
-        del self.session
+        self.session = None
+
+    def stats(self):
+        """statistics of the connection pool and the caches"""
+        caches = {"items": self.item_cache}
+        if self.response_cache is not None:
+            caches["responses"] = self.response_cache
+        if self.prefetcher is not None:
+            caches["prefetch"] = self.prefetcher
+
+        stats = {
+            "pool": connector_stats(
+                self.session.connector if self.session is not None else None
+            ),
+            "caches": {
+                name: {"hits": cache.hits, "misses": cache.misses}
+                for name, cache in caches.items()
+            },
+        }
+        if self.single_flight is not None:
+            stats["single_flight"] = {
+                "calls": self.single_flight.calls,
+                "saved": self.single_flight.saved,
+            }
+
+        return stats
+
+    def parse_body(self, body, parser=None):
+        if parser is None:
+            return self.parse(body)
+
+        incremental_parser = parser()
+        incremental_parser.feed(body)
+        return incremental_parser.close()
+
+    async def query_api(self, path, params={}, parser=None):
+        """query the opensearch api
+
+        Identical concurrent queries are coalesced into a single request, unless
+        disabled. See `request` for the parameters.
+        """
+        if self.single_flight is None:
+            return await self.request(path, params, parser)
+
+        return await self.single_flight.do(
+            (cache_key(path, params), parser),
+            lambda: self.request(path, params, parser),
+        )
 
-    async def query_api(self, path, params={}):
-        from urllib.parse import urlencode
+    async def request(self, path, params={}, parser=None):
+        """send a query to the opensearch api
 
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
-        url = f"{self.url}{path}"
-        console.print("requesting from:", url)
-        console.print("with params:", urlencode(params))
-        async with self.session.get(url, params=params) as r:
-            return self.parse(await r.text())
+        If given, ``parser`` is a factory of incremental parsers (see
+        `atom.GranuleParser`), which are fed the response body while it is being
+        received. Otherwise, the body is parsed at once using the format's parser.
 
-    async def all_collections(self, **kwargs) -> stac_types.Collections:
+        If the client has a response cache, fresh cached responses are used without
+        contacting the opensearch api, and stale ones are revalidated.
+        """
+        session = self.session if self.session is not None else await self.open()
+
+        cached = None
+        if self.response_cache is not None:
+            key = cache_key(path, params)
+            cached = await self.response_cache.get(key)
+            if cached is not None and cached.is_fresh(self.response_cache.clock()):
+                logger.debug("cache hit for %s with params %s", path, params)
+                with timing.stage("parse"):
+                    return self.parse_body(cached.body, parser)
+
+        headers = cached.conditional_headers() if cached is not None else {}
+
+        url = f"{self.url}{path}"
+        logger.debug("requesting %s with params %s", url, params)
+
+        body = None
+        parse_time = 0
+        start = time.perf_counter()
+        async with session.get(url, params=params, headers=headers) as r:
+            if r.status == 304 and cached is not None:
+                await self.response_cache.revalidated(key, cached, r.headers)
+
+                parse_start = time.perf_counter()
+                result = self.parse_body(cached.body, parser)
+                parse_time += time.perf_counter() - parse_start
+            elif parser is None:
+                body = await r.read()
+                parse_start = time.perf_counter()
+                result = self.parse(body)
+                parse_time += time.perf_counter() - parse_start
+            else:
+                # only keep the chunks if the body might be cached
+                chunks = [] if self.response_cache is not None else None
+                incremental_parser = parser()
+                async for chunk in r.content.iter_chunked(chunk_size):
+                    parse_start = time.perf_counter()
+                    incremental_parser.feed(chunk)
+                    parse_time += time.perf_counter() - parse_start
+                    if chunks is not None:
+                        chunks.append(chunk)
+                result = incremental_parser.close()
+
+                if chunks is not None:
+                    body = b"".join(chunks)
+
+        # concurrent requests add up, so this can be longer than the request
+        timing.record("upstream", time.perf_counter() - start - parse_time)
+        timing.record("parse", parse_time)
+
+        if self.response_cache is not None and r.status == 200 and body is not None:
+            await self.response_cache.store_response(key, r.headers, body)
+
+        return result
+
+    async def fetch_collections(self):
         content = await self.query_api(f"/collections.{self.format}")
         entries = [types.Collection(**entry) for entry in content["entries"]]
 
-        return types.Collections(entries=entries).to_stac()
+        return types.Collections(entries=entries).to_stac()["collections"]
+
+    async def all_collections(self, **kwargs) -> stac_types.Collections:
+        return stac_types.Collections(
+            collections=await self.collection_cache.all(),
+            links=[],
+        )
 
     async def get_collection(
         self, collection_id: str, **kwargs
     ) -> stac_types.Collection:
-        all_collections = await self.all_collections(**kwargs)
-        for col in all_collections["collections"]:
-            if col["id"] == collection_id:
-                return col
-        return stac_types.Collection({})
+        col = await self.collection_cache.get(collection_id)
+        if col is None:
+            return stac_types.Collection({})
 
-    async def get_item(self, item_id: str, collection_id: str, **kwargs):
-        pass
+        return col
 
-    async def item_collection(
-        self, collection_id: str, limit: int = 10, token: str = None, **kwargs
-    ) -> stac_types.ItemCollection:
-        pass
+    async def get_item(
+        self, item_id: str, collection_id: str, **kwargs
+    ) -> stac_types.Item:
+        timing.label(collections=[collection_id])
 
-    async def get_search(
+        item = self.item_cache.get((collection_id, item_id))
+        if item is not None:
+            return item
+
+        search_request = BaseSearchPostRequest(
+            collections=[collection_id], ids=[item_id], limit=1
+        )
+        items = await self.fetch_ids(search_request, semaphore=asyncio.Semaphore(1))
+        if not items:
+            raise errors.NotFoundError(
+                f"could not find item {item_id!r} in collection {collection_id!r}"
+            )
+
+        return items[0]
+
+    async def item_collection(
         self,
-        collections: Optional[List[str]] = None,
-        ids: Optional[List[str]] = None,
+        collection_id: str,
         bbox: Optional[List[NumType]] = None,
         datetime: Optional[Union[str, datetime]] = None,
-        limit: Optional[int] = 10,
-        query: Optional[str] = None,
-        token: Optional[str] = None,
-        fields: Optional[List[str]] = None,
-        sortby: Optional[str] = None,
+        limit: int = 10,
+        token: str = None,
         **kwargs,
     ):
         request = kwargs["request"]
-        request_params = request.query_params
 
-        console.print("request params:", request_params)
+        options = {
+            "collections": [collection_id],
+            "bbox": bbox,
+            "datetime": datetime,
+            "limit": limit,
+        }
+        clean = {key: value for key, value in options.items() if value is not None}
+        search_request = BaseSearchPostRequest(**clean)
+        timing.label(collections=search_request.collections)
+
+        current_page = int(request.query_params.get("page", 1))
+        n_results, items = await self.search_page(
+            request, search_request, page=current_page
+        )
 
-        search_request = BaseSearchGetRequest(
-            collections=collections,
-            ids=ids,
-            bbox=bbox,
-            datetime=datetime,
-            limit=limit,
+        links = pagination.generate_get_pagination_links(
+            request,
+            page=current_page,
+            n_results=n_results,
+            limit=search_request.limit,
         )
 
-        console.print(search_request)
+        return streaming.item_collection(items, links, stream=self.stream_responses)
+
+    async def fetch_page(self, search_request, *, page, params=None):
+        """fetch a page of results from the opensearch api
 
-        current_page = int(request_params.get("page", 1))
-        params = dialects.translate_request(
+        Returns the total number of results and the items of the requested page. The
+        items are translated lazily, and remembered for `get_item` while they are
+        consumed. ``params`` are added to the translated request.
+        """
+        request_params = dialects.translate_request(
             search_request,
-            additional={"page": current_page},
+            additional={"page": page},
             opensearch_dialect=self.dialect,
         )
+        if params is not None:
+            request_params.update(params)
 
-        response = await self.query_api(f"/granules.{self.format}", params=params)
+        response = await self.query_api(
+            f"/granules.{self.format}",
+            params=request_params,
+            parser=self.granule_parser,
+        )
 
-        n_results, items = dialects.translate_response(response)
+        with timing.stage("translate"):
+            n_results, items = dialects.translate_response(response)
 
-        links = pagination.generate_get_pagination_links(
-            request,
-            page=current_page,
-            n_results=n_results,
-            limit=search_request.limit,
-        )
+        return n_results, self.remember(search_request.collections[0], items)
+
+    def remember(self, collection, items):
+        for item in items:
+            self.item_cache.put((collection, item["id"]), item)
+            yield item
+
+    async def fetch_ids(self, search_request, *, semaphore):
+        """look up the requested items of a single collection
+
+        The items are requested concurrently, one request per id. Items that don't
+        match the other criteria of the search are not returned.
+
+        Returns the items, sorted by start time.
+        """
+        item_ids = dict.fromkeys(search_request.ids)
+
+        async def fetch(item_id):
+            params = dialects.translate_id(item_id, opensearch_dialect=self.dialect)
+            async with semaphore:
+                _, items = await self.fetch_page(search_request, page=1, params=params)
+                return list(items)
 
-        item_ids = search_request.ids or []
-        if item_ids:
-            console.print("filtering:", items, "with:", item_ids)
-            items = [item for item in items if item["id"] in item_ids]
+        results = await asyncio.gather(*(fetch(item_id) for item_id in item_ids))
+        logger.debug("looked up %d ids", len(item_ids))
 
-        return stac_types.ItemCollection(
-            type="FeatureCollection",
-            features=items,
-            links=links,
+        # the upstream might not match ids exactly
+        items = {
+            item["id"]: item
+            for item in itertools.chain.from_iterable(results)
+            if item["id"] in item_ids
+        }
+
+        return sorted(items.values(), key=multi.item_time)
+
+    async def search(self, search_request, *, page):
+        """search a single collection"""
+        if not search_request.ids:
+            return await self.fetch_page(search_request, page=page)
+
+        items = await self.fetch_ids(
+            search_request, semaphore=asyncio.Semaphore(self.max_concurrency)
         )
+        start = (page - 1) * search_request.limit
 
-    async def post_search(self, search_request: BaseSearchPostRequest, **kwargs):
-        request = kwargs["request"]
-        request_params = await request.json()
+        return len(items), items[start : start + search_request.limit]
 
-        console.print("request body:", request_params)
+    async def search_collections(self, search_request, *, token):
+        """search multiple collections concurrently
 
-        console.print(search_request)
+        Each collection is queried separately, with at most ``max_concurrency``
+        requests in flight. Assuming the opensearch api returns the items of a
+        collection sorted by time, the results are merged by start time.
 
-        current_page = request_params.get("page", 1)
-        params = dialects.translate_request(
-            search_request,
-            additional={"page": current_page},
-            opensearch_dialect=self.dialect,
+        Returns the total number of results, the items, and the token of the next
+        page (or ``None`` if this is the last page).
+        """
+        limit = search_request.limit
+        offsets = multi.decode_token(token, search_request.collections)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(collection, page):
+            request = search_request.copy(update={"collections": [collection]})
+            async with semaphore:
+                n_results, items = await self.fetch_page(request, page=page)
+                return n_results, list(items)
+
+        async def fetch_collection(collection):
+            if search_request.ids:
+                request = search_request.copy(update={"collections": [collection]})
+                items = await self.fetch_ids(request, semaphore=semaphore)
+                offset = offsets[collection]
+
+                return len(items), items[offset : offset + limit]
+
+            # the next `limit` items after `offset`, which might span two pages
+            page, skip = divmod(offsets[collection], limit)
+            pages = [page + 1] if skip == 0 else [page + 1, page + 2]
+
+            results = await asyncio.gather(*(fetch(collection, p) for p in pages))
+            n_results = results[0][0]
+            items = list(itertools.chain.from_iterable(items for _, items in results))
+
+            return n_results, items[skip : skip + limit]
+
+        results = dict(
+            zip(
+                offsets,
+                await asyncio.gather(*(fetch_collection(col) for col in offsets)),
+            )
+        )
+        items, consumed = multi.merge_by_time(
+            {collection: items for collection, (_, items) in results.items()}, limit
         )
 
-        response = await self.query_api(f"/granules.{self.format}", params=params)
+        new_offsets = {
+            collection: offsets[collection] + consumed[collection]
+            for collection, (n_results, _) in results.items()
+            if offsets[collection] + consumed[collection] < n_results
+        }
+        n_results = sum(n for n, _ in results.values())
 
-        n_results, items = dialects.translate_response(response)
+        return n_results, items, multi.encode_token(new_offsets)
 
-        links = pagination.generate_post_pagination_links(
-            request,
-            page=current_page,
-            n_results=n_results,
-            limit=search_request.limit,
+    async def search_page(self, request, search_request, *, page):
+        """search a single collection, reading ahead the next page if enabled"""
+        if self.prefetcher is None:
+            return await self.search(search_request, page=page)
+
+        key = search_key(search_request)
+
+        def step(page):
+            async def fetch():
+                n_results, items = await self.search(search_request, page=page)
+                return page, n_results, list(items)
+
+            return (key, page), fetch
+
+        def follow(result):
+            page, n_results, _ = result
+            if page * search_request.limit >= n_results:
+                return None
+
+            return step(page + 1)
+
+        _, n_results, items = await self.prefetcher.page(
+            prefetch.walk_id(request, key), *step(page), follow
         )
 
-        item_ids = search_request.ids or []
-        if item_ids:
-            console.print("filtering:", items, "with:", item_ids)
-            items = [item for item in items if item["id"] in item_ids]
+        return n_results, items
+
+    async def resolve_collections(self, search_request):
+        """search all collections if none are given
+
+        The opensearch api can only search a single collection at a time, so
+        searches over all collections are fanned out over the cached collections.
+        """
+        if search_request.collections is not None:
+            return search_request
+
+        collections = [col["id"] for col in await self.collection_cache.all()]
+        return search_request.copy(update={"collections": collections})
+
+    async def search_collections_page(self, request, search_request, *, token):
+        """search multiple collections, reading ahead the next page if enabled"""
+        if self.prefetcher is None:
+            return await self.search_collections(search_request, token=token)
+
+        key = search_key(search_request)
 
-        return stac_types.ItemCollection(
-            type="FeatureCollection",
-            features=items,
-            links=links,
+        def step(token):
+            async def fetch():
+                return await self.search_collections(search_request, token=token)
+
+            return (key, token), fetch
+
+        def follow(result):
+            _, _, new_token = result
+            if new_token is None:
+                return None
+
+            return step(new_token)
+
+        return await self.prefetcher.page(
+            prefetch.walk_id(request, key), *step(token), follow
         )
+
+    async def get_search(
+        self,
+        collections: Optional[List[str]] = None,
+        ids: Optional[List[str]] = None,
+        bbox: Optional[List[NumType]] = None,
+        datetime: Optional[Union[str, datetime]] = None,
+        limit: Optional[int] = 10,
+        query: Optional[str] = None,
+        token: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        sortby: Optional[str] = None,
+        **kwargs,
+    ):
+        request = kwargs["request"]
+        request_params = request.query_params
+
+        # the arguments have already been converted, so we can't pass them to
+        # `BaseSearchGetRequest` again
+        options = {
+            "collections": collections,
+            "ids": ids,
+            "bbox": bbox,
+            "datetime": datetime,
+            "limit": limit,
+        }
+        clean = {key: value for key, value in options.items() if value is not None}
+        search_request = BaseSearchPostRequest(**clean)
+        timing.label(collections=search_request.collections)
+
+        logger.debug("search request: %s", search_request)
+        search_request = await self.resolve_collections(search_request)
+
+        if search_request.collections and len(search_request.collections) > 1:
+            n_results, items, new_token = await self.search_collections_page(
+                request, search_request, token=request_params.get("token")
+            )
+            links = pagination.generate_get_token_pagination_links(
+                request, token=new_token
+            )
+        else:
+            current_page = int(request_params.get("page", 1))
+            n_results, items = await self.search_page(
+                request, search_request, page=current_page
+            )
+
+            links = pagination.generate_get_pagination_links(
+                request,
+                page=current_page,
+                n_results=n_results,
+                limit=search_request.limit,
+            )
+
+        return streaming.item_collection(items, links, stream=self.stream_responses)
+
+    async def post_search(self, search_request: BaseSearchPostRequest, **kwargs):
+        request = kwargs["request"]
+        request_params = await request.json()
+        timing.label(collections=search_request.collections)
+
+        logger.debug("search request: %s", search_request)
+        search_request = await self.resolve_collections(search_request)
+
+        if search_request.collections and len(search_request.collections) > 1:
+            n_results, items, new_token = await self.search_collections_page(
+                request, search_request, token=request_params.get("token")
+            )
+            links = pagination.generate_post_token_pagination_links(
+                request, token=new_token
+            )
+        else:
+            current_page = request_params.get("page", 1)
+            n_results, items = await self.search_page(
+                request, search_request, page=current_page
+            )
+
+            links = pagination.generate_post_pagination_links(
+                request,
+                page=current_page,
+                n_results=n_results,
+                limit=search_request.limit,
+            )
+
+        return streaming.item_collection(items, links, stream=self.stream_responses)
@@ -1,6 +1,6 @@
 from stac_fastapi.types import errors
 
-from .. import types
+from .. import geometry, types
 
 
 def translate_request_ifremer(search_request, additional):
@@ -53,6 +53,21 @@ dialects = {
 }
 
 
+def translate_id_ifremer(item_id):
+    # item ids are the granule uids without the file extension (see `types.extract_uid`)
+    return {"uid": f"{item_id}.nc"}
+
+
+id_dialects = {
+    "ifremer": translate_id_ifremer,
+}
+
+# the parameter containing the end of the searched time window
+time_end_parameters = {
+    "ifremer": "timeEnd",
+}
+
+
 def translate_request(request, additional, opensearch_dialect):
     translate = dialects.get(opensearch_dialect)
     if translate is None:
@@ -61,13 +76,23 @@ def translate_request(request, additional, opensearch_dialect):
     return translate(request, additional)
 
 
+def translate_id(item_id, opensearch_dialect):
+    """translate a item id to the parameters selecting that item"""
+    translate = id_dialects.get(opensearch_dialect)
+    if translate is None:
+        raise ValueError(f"unknown opensearch dialect: {opensearch_dialect}")
+
+    return translate(item_id)
+
+
 def translate_response(response):
     feed = response.get("feed")
     if feed is None:
         raise errors.StacApiError("backend server returned invalid feed")
     n_results = int(feed.get("opensearch_totalresults", "0"))
 
-    entries = response.get("entries", [])
-    items = [types.Item(**entry).to_stac() for entry in entries]
+    entries = [types.Item(**entry) for entry in response.get("entries", [])]
+    bboxes = geometry.bboxes(entry.where for entry in entries)
+    items = (entry.to_stac(bbox=bbox) for entry, bbox in zip(entries, bboxes))
 
     return n_results, items
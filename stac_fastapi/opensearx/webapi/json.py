@@ -1,4 +1,25 @@
+import attrs
+
+from .. import serializers
+
+
 def parse(document):
-    import json
+    return serializers.loads(document)
+
+
+@attrs.define
+class GranuleParser:
+    """Buffering parser for json granule feeds
+
+    Has the same interface as `atom.GranuleParser`, but only parses the document once
+    it has been received completely.
+    """
+
+    buffer = attrs.field(factory=bytearray, init=False)
+
+    def feed(self, data):
+        self.buffer += data
+        return []
 
-    return json.loads(document)
+    def close(self):
+        return parse(self.buffer)
@@ -0,0 +1,76 @@
+import base64
+import binascii
+import heapq
+import itertools
+import json
+
+from stac_fastapi.types import errors
+
+
+def encode_token(offsets):
+    """encode the cursors of a multi-collection search
+
+    ``offsets`` maps collection names to the number of items of that collection that
+    were already returned.
+    """
+    if not offsets:
+        return None
+
+    encoded = json.dumps(offsets, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(encoded).decode()
+
+
+def decode_token(token, collections):
+    if token is None:
+        return {collection: 0 for collection in collections}
+
+    try:
+        offsets = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise errors.InvalidQueryParameter(f"invalid token: {token}") from e
+
+    if not isinstance(offsets, dict) or not all(
+        collection in collections and isinstance(offset, int) and offset >= 0
+        for collection, offset in offsets.items()
+    ):
+        raise errors.InvalidQueryParameter(
+            "token does not match the requested collections"
+        )
+
+    return offsets
+
+
+def item_time(item):
+    return item["properties"]["start_datetime"]
+
+
+def merge_by_time(items_by_collection, limit):
+    """k-way merge of items sorted by start time
+
+    Parameters
+    ----------
+    items_by_collection : dict of list of dict
+        The items of each collection, each sorted by start time.
+    limit : int
+        The maximum number of items to return.
+
+    Returns
+    -------
+    items : list of dict
+        The merged items.
+    consumed : dict of int
+        The number of items taken from each collection.
+    """
+    tagged = [
+        zip(itertools.repeat(collection), items)
+        for collection, items in items_by_collection.items()
+    ]
+    merged = list(
+        itertools.islice(heapq.merge(*tagged, key=lambda t: item_time(t[1])), limit)
+    )
+
+    consumed = {collection: 0 for collection in items_by_collection}
+    for collection, _ in merged:
+        consumed[collection] += 1
+
+    return [item for _, item in merged], consumed
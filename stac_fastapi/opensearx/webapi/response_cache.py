@@ -0,0 +1,312 @@
+import asyncio
+import datetime as dt
+import json
+import sqlite3
+import threading
+import time
+
+import attrs
+from attrs import validators
+
+from ..cache import LRUCache
+from ..log import logger
+
+
+def cache_key(path, params):
+    """normalize a request to a hashable key"""
+    return (path, tuple(sorted((str(k), str(v)) for k, v in params.items())))
+
+
+def parse_cache_control(header):
+    directives = {}
+    for directive in header.split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+
+    return directives
+
+
+def parse_timestamp(value):
+    try:
+        timestamp = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=dt.timezone.utc)
+
+    return timestamp
+
+
+@attrs.frozen
+class CachedResponse:
+    body = attrs.field()
+    expires = attrs.field()
+    etag = attrs.field(default=None)
+    last_modified = attrs.field(default=None)
+
+    def is_fresh(self, now):
+        return now < self.expires
+
+    @property
+    def revalidatable(self):
+        return self.etag is not None or self.last_modified is not None
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+@attrs.define
+class HistoricalTTL:
+    """Cache responses for time windows in the past for longer.
+
+    Results for a time window that ended more than ``settle`` seconds ago are not
+    expected to change anymore.
+
+    Parameters
+    ----------
+    parameter : str
+        The query parameter containing the end of the time window.
+    ttl : float
+        Number of seconds to cache historical responses for.
+    settle : float, default: 2 days
+        Number of seconds after which a time window is considered historical.
+    clock : callable
+        Returns the current time as a timezone-aware datetime.
+    """
+
+    parameter = attrs.field()
+    ttl = attrs.field(validator=validators.gt(0))
+    settle = attrs.field(default=2 * 24 * 3600)
+    clock = attrs.field(default=lambda: dt.datetime.now(dt.timezone.utc))
+
+    def __call__(self, path, params):
+        value = params.get(self.parameter)
+        if value is None:
+            return None
+
+        end = parse_timestamp(str(value))
+        if end is None:
+            return None
+
+        if (self.clock() - end).total_seconds() < self.settle:
+            return None
+
+        return self.ttl
+
+
+@attrs.define
+class SqliteStore:
+    """Persist cached responses in a sqlite database.
+
+    The database is opened in WAL mode, such that several worker processes can
+    share it.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path to the database.
+    max_entries : int, default: 10000
+        Maximum number of stored responses. The oldest ones are removed first.
+    busy_timeout : float, default: 5
+        Number of seconds to wait for a lock held by another connection.
+    """
+
+    path = attrs.field()
+    max_entries = attrs.field(default=10000, validator=validators.gt(0))
+    busy_timeout = attrs.field(default=5, validator=validators.ge(0))
+
+    connection = attrs.field(init=False)
+    lock = attrs.field(factory=threading.Lock, init=False)
+
+    def __attrs_post_init__(self):
+        self.connection = sqlite3.connect(
+            str(self.path), timeout=self.busy_timeout, check_same_thread=False
+        )
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " body BLOB NOT NULL,"
+                " expires REAL NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " stored REAL NOT NULL"
+                ")"
+            )
+
+    @staticmethod
+    def encode_key(key):
+        return json.dumps(key, separators=(",", ":"))
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT body, expires, etag, last_modified FROM responses WHERE key = ?",
+                (self.encode_key(key),),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        body, expires, etag, last_modified = row
+        return CachedResponse(
+            body=bytes(body), expires=expires, etag=etag, last_modified=last_modified
+        )
+
+    def put(self, key, entry):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.encode_key(key),
+                    entry.body,
+                    entry.expires,
+                    entry.etag,
+                    entry.last_modified,
+                    time.time(),
+                ),
+            )
+            self.connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY stored DESC, rowid DESC"
+                " LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+@attrs.define
+class ResponseCache:
+    """Cache upstream responses following HTTP semantics.
+
+    Responses are kept in a bounded in-memory LRU, and optionally in a persistent
+    store. Responses with ``Cache-Control: no-store`` are never cached, and
+    ``max-age`` overrides the default ttl. Expired responses with an ``ETag`` or
+    ``Last-Modified`` header are revalidated using conditional requests.
+
+    Parameters
+    ----------
+    maxsize : int, default: 256
+        Maximum number of responses kept in memory.
+    ttl : float, default: 60
+        Default number of seconds a response is considered fresh.
+    ttl_policy : callable, optional
+        Called with the path and the params of the request. Can return a ttl that
+        takes precedence over both ``ttl`` and ``max-age``, or ``None``.
+    store : SqliteStore, optional
+        Persistent store for responses.
+    clock : callable
+        Returns the current wall time in seconds. Wall time is used since entries
+        may outlive the process.
+    """
+
+    maxsize = attrs.field(default=256)
+    ttl = attrs.field(default=60, validator=validators.ge(0))
+    ttl_policy = attrs.field(default=None)
+    store = attrs.field(default=None)
+    clock = attrs.field(default=time.time)
+
+    memory = attrs.field(init=False)
+    hits = attrs.field(default=0, init=False)
+    misses = attrs.field(default=0, init=False)
+    revalidations = attrs.field(default=0, init=False)
+
+    @memory.default
+    def _create_memory(self):
+        return LRUCache(maxsize=self.maxsize)
+
+    async def get(self, key):
+        """look up a response, including stale ones that can be revalidated"""
+        entry = self.memory.get(key)
+        if entry is None and self.store is not None:
+            try:
+                entry = await asyncio.to_thread(self.store.get, key)
+            except sqlite3.Error as e:
+                # treat failures of the store as a miss
+                logger.warning("failed to read from the response store: %s", e)
+            if entry is not None:
+                self.memory.put(key, entry)
+
+        if entry is not None and entry.is_fresh(self.clock()):
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        return entry
+
+    def entry_ttl(self, key, headers):
+        path, params = key
+        if self.ttl_policy is not None:
+            ttl = self.ttl_policy(path, dict(params))
+            if ttl is not None:
+                return ttl
+
+        max_age = parse_cache_control(headers.get("Cache-Control", "")).get("max-age")
+        if max_age is not None and max_age.isdecimal():
+            return int(max_age)
+
+        return self.ttl
+
+    async def put(self, key, entry):
+        self.memory.put(key, entry)
+        if self.store is None:
+            return
+
+        try:
+            await asyncio.to_thread(self.store.put, key, entry)
+        except sqlite3.Error as e:
+            # the response is still cached in memory
+            logger.warning("failed to write to the response store: %s", e)
+
+    async def store_response(self, key, headers, body):
+        """cache a successful response
+
+        Returns ``False`` if the response must not be cached.
+        """
+        if "no-store" in parse_cache_control(headers.get("Cache-Control", "")):
+            return False
+
+        ttl = self.entry_ttl(key, headers)
+        entry = CachedResponse(
+            body=body,
+            expires=self.clock() + ttl,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+        if not ttl and not entry.revalidatable:
+            return False
+
+        await self.put(key, entry)
+        return True
+
+    async def revalidated(self, key, entry, headers):
+        """extend the lifetime of a response after a ``304 Not Modified``"""
+        self.revalidations += 1
+        ttl = self.entry_ttl(key, headers)
+        refreshed = attrs.evolve(
+            entry,
+            expires=self.clock() + ttl,
+            etag=headers.get("ETag", entry.etag),
+            last_modified=headers.get("Last-Modified", entry.last_modified),
+        )
+        await self.put(key, refreshed)
+
+        return refreshed
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
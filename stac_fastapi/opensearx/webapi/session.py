@@ -0,0 +1,66 @@
+import aiohttp
+import attrs
+from attrs import validators
+
+optional_positive = validators.optional(
+    [validators.instance_of((int, float)), validators.gt(0)]
+)
+
+
+@attrs.define
+class SessionConfig:
+    """Configuration of the connection pool used to query the opensearch api.
+
+    Parameters
+    ----------
+    limit : int, default: 100
+        Maximum number of simultaneous connections. ``0`` means no limit.
+    limit_per_host : int, default: 20
+        Maximum number of simultaneous connections to the same host. ``0`` means no
+        limit.
+    keepalive_timeout : float, default: 30
+        Number of seconds idle connections are kept open.
+    dns_cache_ttl : float, optional
+        Number of seconds to cache DNS lookups for. If ``None``, cache forever.
+    total_timeout : float, optional
+        Timeout of a request in seconds, including reading the response.
+    connect_timeout : float, optional
+        Timeout for acquiring and establishing a connection, in seconds.
+    read_timeout : float, optional
+        Timeout for reading a chunk of the response, in seconds.
+    compression : bool, default: True
+        Ask the server for compressed responses.
+    """
+
+    limit = attrs.field(default=100, validator=validators.ge(0))
+    limit_per_host = attrs.field(default=20, validator=validators.ge(0))
+    keepalive_timeout = attrs.field(default=30, validator=optional_positive)
+    dns_cache_ttl = attrs.field(default=300, validator=optional_positive)
+    total_timeout = attrs.field(default=60, validator=optional_positive)
+    connect_timeout = attrs.field(default=10, validator=optional_positive)
+    read_timeout = attrs.field(default=30, validator=optional_positive)
+    compression = attrs.field(default=True)
+
+    def create_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            enable_cleanup_closed=True,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.total_timeout,
+            connect=self.connect_timeout,
+            sock_read=self.read_timeout,
+        )
+        # by default, aiohttp asks for every encoding it can decode
+        headers = {} if self.compression else {"Accept-Encoding": "identity"}
+
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers=headers,
+            auto_decompress=True,
+        )
@@ -0,0 +1,41 @@
+import pathlib
+from typing import Optional
+
+from ..settings import ServerSettings
+from .session import SessionConfig
+
+
+class Settings(ServerSettings):
+    """settings of the opensearch api shim, see `create_api`"""
+
+    url: str = "https://opensearch.ifremer.fr"
+    dialect: str = "ifremer"
+    format: str = "atom"
+    max_concurrency: int = 8
+    item_cache_size: int = 1024
+    item_cache_ttl: int = 300
+    response_cache_size: int = 0
+    response_cache_ttl: float = 60
+    response_cache_path: Optional[pathlib.Path] = None
+    historical_cache_ttl: float = 24 * 3600
+
+    pool_limit: int = 100
+    pool_limit_per_host: int = 20
+    keepalive_timeout: float = 30
+    dns_cache_ttl: float = 300
+    timeout: float = 60
+    connect_timeout: float = 10
+    read_timeout: float = 30
+    compression: bool = True
+
+    def session_config(self):
+        return SessionConfig(
+            limit=self.pool_limit,
+            limit_per_host=self.pool_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            dns_cache_ttl=self.dns_cache_ttl,
+            total_timeout=self.timeout,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            compression=self.compression,
+        )